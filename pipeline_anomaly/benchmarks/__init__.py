@@ -0,0 +1 @@
+"""Benchmarks of pipeline hot paths: `python -m benchmarks run` / `python -m benchmarks compare`."""
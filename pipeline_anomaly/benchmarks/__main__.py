@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import typer
+from loguru import logger
+
+from benchmarks.measure import Measurement, measure
+from benchmarks.stages import STAGES, AgreementRun, Workload
+
+app = typer.Typer(add_completion=False, help="Benchmarks of pipeline_anomaly hot paths.")
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+
+def _parse_sizes(sizes: str) -> list[int]:
+    parsed = []
+    for size in sizes.split(","):
+        size = size.strip().lower()
+        parsed.append(SIZES[size] if size in SIZES else int(size))
+    return parsed
+
+
+@app.command()
+def run(
+    sizes: str = typer.Option("10k,100k,1m", help="Row counts: 10k, 100k, 1m, 10m or integers, comma separated"),
+    stages: str = typer.Option("", help="Stage names to run, comma separated (default: all)"),
+    repeat: int = typer.Option(3, min=1, help="Runs per stage; the fastest one is recorded"),
+    output: Path = typer.Option(Path("benchmarks/results/latest.json"), help="Where to write results JSON"),
+) -> None:
+    """Прогоняет стадии на синтетике заданных размеров и пишет пропускную способность и пик памяти."""
+
+    selected = [stage for stage in STAGES if not stages or stage.name in stages.split(",")]
+    results = []
+    for rows in _parse_sizes(sizes):
+        workload = Workload(rows)
+        for stage in selected:
+            if stage.max_rows is not None and rows > stage.max_rows:
+                logger.info("{} @ {} rows: skipped, stage is limited to {} rows", stage.name, rows, stage.max_rows)
+                continue
+            runner = stage.prepare(workload)
+            runs = [measure(runner) for _ in range(repeat)]
+            best = min(runs, key=lambda measurement: measurement.seconds)
+            peak = max(measurement.peak_memory_bytes for measurement in runs)
+            result = _result(stage.name, rows, best, peak)
+            logger.info(
+                "{} @ {} rows: {:.3f}s, {:.0f} rows/s, peak +{:.1f} MiB",
+                stage.name,
+                rows,
+                best.seconds,
+                best.rows_per_second,
+                peak / 2**20,
+            )
+            if isinstance(runner, AgreementRun):
+                report = runner.report()
+                result["agreement"] = {
+                    "exact_outliers": report.exact_outliers,
+                    "sampled_outliers": report.sampled_outliers,
+                    "agreement": round(report.agreement, 6),
+                    "precision": round(report.precision, 6),
+                    "recall": round(report.recall, 6),
+                    "jaccard": round(report.jaccard, 6),
+                }
+                logger.info(
+                    "{} @ {} rows: sampled vs exact agreement {:.4f}, recall {:.3f}, jaccard {:.3f}",
+                    stage.name,
+                    rows,
+                    report.agreement,
+                    report.recall,
+                    report.jaccard,
+                )
+            results.append(result)
+        del workload
+    payload = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    logger.info("benchmark results written to {}", output)
+
+
+@app.command()
+def compare(
+    baseline: Path = typer.Argument(..., help="Baseline results JSON"),
+    current: Path = typer.Argument(..., help="Fresh results JSON"),
+    threshold: float = typer.Option(0.2, help="Allowed relative drop of rows/s"),
+    memory_threshold: float = typer.Option(0.5, help="Allowed relative growth of peak memory"),
+    min_seconds: float = typer.Option(0.05, help="Skip stages whose baseline run is shorter (timer noise)"),
+    memory_slack_mib: float = typer.Option(16.0, help="Peak memory growth below this is never a regression"),
+) -> None:
+    """Сравнивает результаты с базовыми; код выхода 1, если хоть одна стадия регрессировала."""
+
+    regressions = compare_results(
+        json.loads(baseline.read_text(encoding="utf-8")),
+        json.loads(current.read_text(encoding="utf-8")),
+        threshold=threshold,
+        memory_threshold=memory_threshold,
+        min_seconds=min_seconds,
+        memory_slack_bytes=int(memory_slack_mib * 2**20),
+    )
+    for line in regressions:
+        typer.echo(f"REGRESSION {line}")
+    if regressions:
+        raise typer.Exit(code=1)
+    typer.echo("no regressions")
+
+
+def compare_results(
+    baseline: dict,
+    current: dict,
+    threshold: float = 0.2,
+    memory_threshold: float = 0.5,
+    min_seconds: float = 0.05,
+    memory_slack_bytes: int = 16 * 2**20,
+) -> list[str]:
+    """Стадии, у которых rows/s упал больше чем на `threshold` или пик памяти вырос больше
+    чем на `memory_threshold` относительно базовых; сопоставление по (стадия, строки).
+
+    Замеры короче `min_seconds` в базовых результатах не сравниваются — это шум таймера,
+    рост пика меньше `memory_slack_bytes` тоже не считается регрессией.
+    """
+
+    reference = {(item["stage"], item["rows"]): item for item in baseline["results"]}
+    regressions = []
+    for item in current["results"]:
+        base = reference.get((item["stage"], item["rows"]))
+        if base is None or base["seconds"] < min_seconds:
+            continue
+        label = f"{item['stage']} @ {item['rows']} rows"
+        if item["rows_per_second"] < base["rows_per_second"] * (1 - threshold):
+            regressions.append(
+                f"{label}: {item['rows_per_second']:.0f} rows/s vs baseline {base['rows_per_second']:.0f}"
+            )
+        growth = item["peak_memory_bytes"] - base["peak_memory_bytes"]
+        if growth > memory_slack_bytes and item["peak_memory_bytes"] > base["peak_memory_bytes"] * (1 + memory_threshold):
+            regressions.append(
+                f"{label}: peak +{item['peak_memory_bytes'] / 2**20:.1f} MiB "
+                f"vs baseline +{base['peak_memory_bytes'] / 2**20:.1f} MiB"
+            )
+    return regressions
+
+
+def _result(stage: str, rows: int, best: Measurement, peak_memory_bytes: int) -> dict:
+    return {
+        "stage": stage,
+        "rows": rows,
+        "seconds": round(best.seconds, 6),
+        "rows_per_second": round(best.rows_per_second, 1),
+        "peak_memory_bytes": peak_memory_bytes,
+    }
+
+
+if __name__ == "__main__":
+    logger.remove()
+    logger.add(sys.stderr, level="INFO", filter=lambda record: record["name"] == "__main__" or record["level"].no >= 40)
+    app()
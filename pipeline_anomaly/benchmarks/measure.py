@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import gc
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from pipeline_anomaly.infrastructure.observability.memory import peak_rss_bytes, reset_peak_rss
+
+
+@dataclass(frozen=True, slots=True)
+class Measurement:
+    seconds: float
+    rows: int
+    peak_memory_bytes: int
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.seconds <= 0:
+            return 0.0
+        return self.rows / self.seconds
+
+
+def measure(run: Callable[[], int]) -> Measurement:
+    """Время и пик памяти одного вызова `run` (он возвращает число обработанных строк).
+
+    Пик — прирост RSS над уровнем до вызова. В Linux счётчик пика (`VmHWM`) сбрасывается
+    перед вызовом, поэтому память подготовки входных данных не маскирует пик стадии;
+    без `/proc` берётся прирост `ru_maxrss`, который виден, только если стадия подняла
+    пик процесса.
+    """
+
+    gc.collect()
+    reset_peak_rss()
+    rss_before = peak_rss_bytes()
+    started = time.perf_counter()
+    rows = run()
+    seconds = time.perf_counter() - started
+    return Measurement(seconds=seconds, rows=rows, peak_memory_bytes=max(peak_rss_bytes() - rss_before, 0))
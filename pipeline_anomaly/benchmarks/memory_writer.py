@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import pandas as pd
+
+from pipeline_anomaly.domain.models.aggregate import AggregateCollection
+from pipeline_anomaly.domain.models.anomaly import AnomalyReport
+from pipeline_anomaly.domain.models.batch import AnyRecordBatch
+
+
+class InMemoryClickHouseWriter:
+    """`ClickHouseWriter` без сети: вставки только считаются, окно отдаётся готовым фреймом."""
+
+    def __init__(self, window: pd.DataFrame | None = None) -> None:
+        self._window = window
+        self.ingested_rows = 0
+        self.aggregates: AggregateCollection | None = None
+        self.report: AnomalyReport | None = None
+
+    def ensure_schema(self) -> None:
+        return None
+
+    def ingest_batch(self, batch: AnyRecordBatch) -> None:
+        self.ingested_rows += batch.size
+
+    def persist_aggregates(self, aggregates: AggregateCollection) -> None:
+        self.aggregates = aggregates
+
+    def persist_report(self, report: AnomalyReport) -> None:
+        self.report = report
+
+    def read_latest_window(self) -> pd.DataFrame:
+        if self._window is None:
+            raise RuntimeError("events table is empty")
+        return self._window
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.memory_writer import InMemoryClickHouseWriter
+from pipeline_anomaly.application.use_cases.compute_aggregates import ComputeAggregates
+from pipeline_anomaly.application.use_cases.load_dataset import LoadSyntheticDataset
+from pipeline_anomaly.domain.models.batch import AnyRecordBatch
+from pipeline_anomaly.domain.models.feature_matrix import FeatureMatrix
+from pipeline_anomaly.domain.services.interfaces import AnomalyDetector
+from pipeline_anomaly.infrastructure.aggregation.windowing import MultiWindowEngine
+from pipeline_anomaly.infrastructure.data_quality.pandas_checker import PandasDataQualityChecker
+from pipeline_anomaly.infrastructure.detectors.sampling import DensitySample, DetectorAgreement, agreement
+from pipeline_anomaly.infrastructure.generators.synthetic_generator import (
+    SyntheticDatasetConfig,
+    SyntheticDatasetGenerator,
+)
+from pipeline_anomaly.infrastructure.plugins import DETECTORS
+
+BATCH_SIZE = 100_000
+DENSITY_SAMPLE_SIZE = 50_000
+
+
+class Workload:
+    """Входные данные стадий одного размера: батчи, окно и матрица признаков строятся один раз."""
+
+    def __init__(self, rows: int, seed: int = 42) -> None:
+        self.rows = rows
+        self.config = SyntheticDatasetConfig(
+            row_count=rows,
+            batch_size=min(rows, BATCH_SIZE),
+            anomaly_ratio=0.001,
+            seed=seed,
+            mode="vectorized",
+        )
+
+    @cached_property
+    def batches(self) -> list[AnyRecordBatch]:
+        return list(SyntheticDatasetGenerator(config=self.config).batches())
+
+    @cached_property
+    def frame(self) -> pd.DataFrame:
+        frame = pd.concat([batch.dataframe for batch in self.batches], ignore_index=True)
+        self.__dict__.pop("batches", None)
+        return frame
+
+    @cached_property
+    def features(self) -> FeatureMatrix:
+        return FeatureMatrix.from_frame(self.frame)
+
+
+class _ReplayedSource:
+    def __init__(self, batches: list[AnyRecordBatch]) -> None:
+        self._batches = batches
+
+    def batches(self) -> Iterator[AnyRecordBatch]:
+        return iter(self._batches)
+
+
+def _quality_checker() -> PandasDataQualityChecker:
+    return PandasDataQualityChecker(dedup_keys=("tx_hash",), required_columns=("event_time", "tx_hash", "value"))
+
+
+def _generate(workload: Workload) -> Callable[[], int]:
+    def run() -> int:
+        return sum(batch.size for batch in SyntheticDatasetGenerator(config=workload.config).batches())
+
+    return run
+
+
+def _quality(workload: Workload) -> Callable[[], int]:
+    batches = workload.batches
+    checker = _quality_checker()
+
+    def run() -> int:
+        return sum(checker.validate(batch).size for batch in batches)
+
+    return run
+
+
+def _ingest(workload: Workload) -> Callable[[], int]:
+    batches = workload.batches
+
+    def run() -> int:
+        writer = InMemoryClickHouseWriter()
+        LoadSyntheticDataset(
+            generator=_ReplayedSource(batches), writer=writer, quality_checker=_quality_checker()
+        ).execute()
+        return writer.ingested_rows
+
+    return run
+
+
+def _aggregates(workload: Workload) -> Callable[[], int]:
+    writer = InMemoryClickHouseWriter(window=workload.frame)
+    use_case = ComputeAggregates(
+        writer=writer, windows=("5m", "1h"), series_engine=MultiWindowEngine(("5m", "1h/5m"))
+    )
+
+    def run() -> int:
+        use_case.execute()
+        return workload.rows
+
+    return run
+
+
+def _feature_matrix(workload: Workload) -> Callable[[], int]:
+    frame = workload.frame
+
+    def run() -> int:
+        return len(FeatureMatrix.from_frame(frame))
+
+    return run
+
+
+def _detector(name: str, **options: object) -> Callable[[Workload], Callable[[], int]]:
+    def prepare(workload: Workload) -> Callable[[], int]:
+        detector = DETECTORS.resolve(name)(**options)
+        features = workload.features
+
+        def run() -> int:
+            detector.fit_predict(features)
+            return len(features)
+
+        return run
+
+    return prepare
+
+
+class AgreementRun:
+    """Точный прогон плотностного детектора; `report` сверяет его разметку с выборочной."""
+
+    def __init__(self, exact: AnomalyDetector, sampled: AnomalyDetector, features: FeatureMatrix) -> None:
+        self._exact = exact
+        self._sampled = sampled
+        self._features = features
+        self._labels: np.ndarray | None = None
+
+    def __call__(self) -> int:
+        self._labels = self._exact.fit_predict(self._features).to_numpy()
+        return len(self._features)
+
+    def report(self) -> DetectorAgreement:
+        if self._labels is None:
+            self()
+        return agreement(self._labels, self._sampled.fit_predict(self._features).to_numpy())
+
+
+def _agreement(name: str, **options: object) -> Callable[[Workload], Callable[[], int]]:
+    def prepare(workload: Workload) -> Callable[[], int]:
+        detector = DETECTORS.resolve(name)
+        return AgreementRun(
+            exact=detector(**options),
+            sampled=detector(**options, sample=DensitySample(size=DENSITY_SAMPLE_SIZE)),
+            features=workload.features,
+        )
+
+    return prepare
+
+
+@dataclass(frozen=True, slots=True)
+class BenchmarkStage:
+    """Стадия бенчмарка; на окнах больше `max_rows` она пропускается (не хватает памяти или времени)."""
+
+    name: str
+    prepare: Callable[[Workload], Callable[[], int]]
+    max_rows: int | None = None
+
+
+STAGES: tuple[BenchmarkStage, ...] = (
+    BenchmarkStage("generate", _generate),
+    BenchmarkStage("quality", _quality),
+    BenchmarkStage("ingest", _ingest),
+    BenchmarkStage("aggregates", _aggregates),
+    BenchmarkStage("feature_matrix", _feature_matrix),
+    BenchmarkStage("detector.zscore", _detector("zscore", threshold=3.0)),
+    BenchmarkStage("detector.iqr", _detector("iqr")),
+    BenchmarkStage(
+        "detector.isolation_forest", _detector("isolation_forest", contamination=0.001, random_state=42)
+    ),
+    BenchmarkStage(
+        "detector.dbscan",
+        _detector("dbscan", eps=0.2, min_samples=15, sample=DensitySample(size=DENSITY_SAMPLE_SIZE)),
+    ),
+    BenchmarkStage(
+        "detector.hdbscan",
+        _detector("hdbscan", min_cluster_size=30, min_samples=5, sample=DensitySample(size=DENSITY_SAMPLE_SIZE)),
+    ),
+    # точный DBSCAN на 100k строк занимает +1.5 GiB, на 1M не помещается в 5 ГБ
+    BenchmarkStage("detector.dbscan.exact", _agreement("dbscan", eps=0.2, min_samples=15), max_rows=100_000),
+    # точный HDBSCAN на 1M строк идёт ~6.5 минут на прогон
+    BenchmarkStage(
+        "detector.hdbscan.exact", _agreement("hdbscan", min_cluster_size=30, min_samples=5), max_rows=1_000_000
+    ),
+)
+"""Стадии в порядке запуска: сначала потребители батчей, потом — окна и матрицы признаков."""
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from pipeline_anomaly.domain.models.anomaly import AnomalousEvent
+
+
+class RowScoreAccumulator:
+    """Совокупный скор строк окна по всем детекторам (и партициям).
+
+    Каждый детектор голосует флагом строки; скор строки — доля отметивших её детекторов
+    среди тех, что её оценили. Топ-k выбирается кучей только среди отмеченных строк.
+    """
+
+    def __init__(self, rows: int) -> None:
+        self._votes = np.zeros(rows, dtype=np.float64)
+        self._runs = np.zeros(rows, dtype=np.int32)
+        self._flags: dict[str, np.ndarray] = {}
+
+    def add(self, detector: str, scores: pd.Series, rows: np.ndarray | None = None) -> None:
+        flags = np.asarray(scores) > 0
+        positions = slice(None) if rows is None else rows
+        self._votes[positions] += flags
+        self._runs[positions] += 1
+        detector_flags = self._flags.setdefault(detector, np.zeros(len(self._votes), dtype=bool))
+        detector_flags[positions] |= flags
+
+    def scores(self) -> np.ndarray:
+        return np.divide(self._votes, self._runs, out=np.zeros_like(self._votes), where=self._runs > 0)
+
+    def top_k(self, k: int, mask: np.ndarray | None = None) -> list[int]:
+        if k <= 0:
+            return []
+        scores = self.scores()
+        flagged = scores > 0 if mask is None else (scores > 0) & mask
+        candidates = np.flatnonzero(flagged)
+        return heapq.nlargest(k, candidates.tolist(), key=scores.__getitem__)
+
+    def events(
+        self,
+        dataframe: pd.DataFrame,
+        k: int,
+        partition_by: str | None = None,
+        mask: np.ndarray | None = None,
+    ) -> tuple[AnomalousEvent, ...]:
+        positions = self.top_k(k, mask)
+        if not positions:
+            return ()
+        scores = self.scores()
+        events = []
+        for position in positions:
+            row = dataframe.iloc[position]
+            events.append(
+                AnomalousEvent(
+                    tx_hash=str(row["tx_hash"]),
+                    event_time=pd.Timestamp(row["event_time"]).to_pydatetime(),
+                    chain_id=int(row["chain_id"]),
+                    score=float(scores[position]),
+                    detectors=tuple(name for name, flags in self._flags.items() if flags[position]),
+                    partition=f"{partition_by}={row[partition_by]}" if partition_by else None,
+                )
+            )
+        return tuple(events)
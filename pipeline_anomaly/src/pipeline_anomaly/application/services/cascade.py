@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+
+from loguru import logger
+
+from pipeline_anomaly.domain.models.anomaly import DetectorOutcome
+from pipeline_anomaly.domain.services.interfaces import AnomalyDetector, StateStore
+
+
+class DetectionCascade:
+    """Каскад детекторов: дешёвые (`triggers`) идут первыми, дорогие — только по сигналу.
+
+    Дорогие детекторы запускаются на партиции, если severity любого дешёвого детектора
+    достигла его порога в `triggers`, и на всём окне — раз в `safety_every_runs` запусков
+    без полного прогона (страховка от пропусков). Счётчик хранится в `state`.
+    """
+
+    def __init__(
+        self,
+        triggers: Mapping[str, float],
+        safety_every_runs: int = 24,
+        state: StateStore | None = None,
+    ) -> None:
+        self._triggers = dict(triggers)
+        self._safety_every_runs = safety_every_runs
+        self._state = state
+        saved = state.load() if state is not None else {}
+        self._runs_since_full = int(saved.get("runs_since_full", 0))
+
+    def split(self, detectors: Sequence[AnomalyDetector]) -> tuple[list[AnomalyDetector], list[AnomalyDetector]]:
+        cheap = [detector for detector in detectors if detector.name in self._triggers]
+        expensive = [detector for detector in detectors if detector.name not in self._triggers]
+        return cheap, expensive
+
+    def escalate(self, stage: Sequence[Sequence[DetectorOutcome]]) -> list[bool]:
+        """По результатам дешёвых детекторов на каждой партиции решает, звать ли дорогие."""
+        if self._safety_every_runs and self._runs_since_full + 1 >= self._safety_every_runs:
+            logger.info("cascade safety run after {} quiet runs", self._runs_since_full)
+            decisions = [True] * len(stage)
+        else:
+            decisions = [any(self._fired(outcome) for outcome in outcomes) for outcomes in stage]
+        self._runs_since_full = 0 if decisions and all(decisions) else self._runs_since_full + 1
+        if self._state is not None:
+            self._state.save({"runs_since_full": self._runs_since_full})
+        return decisions
+
+    def _fired(self, outcome: DetectorOutcome) -> bool:
+        threshold = self._triggers.get(outcome.detector)
+        if threshold is None or outcome.scores is None:
+            return False
+        return outcome.severity >= threshold
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from datetime import datetime
+
+from loguru import logger
+
+from pipeline_anomaly.domain.models.anomaly import Anomaly, AnomalyReport
+from pipeline_anomaly.domain.models.batch import AnyRecordBatch
+from pipeline_anomaly.domain.services.interfaces import AlertSink, ClickHouseWriter, OnlineDetector, StateStore
+
+
+class StreamingAnomalyMonitor:
+    """Оценивает каждый вставленный батч онлайн-детекторами прямо во время загрузки.
+
+    Подключается к `LoadSyntheticDataset` как наблюдатель: стоимость пропорциональна
+    только новым строкам. Алерт поднимается, когда у любого детектора доля аномальных строк
+    батча достигает `alert_threshold` или одно событие отклоняется на `event_threshold`
+    порогов детектора и больше — одиночный экстремальный выброс не размывается размером батча.
+    Отчёт пишется в `writer` и уходит в `alert_sink` (если заданы). Состояние детекторов
+    восстанавливается из `state` и сохраняется в `flush()`.
+    """
+
+    def __init__(
+        self,
+        detectors: Sequence[OnlineDetector],
+        alert_sink: AlertSink | None,
+        alert_threshold: float,
+        event_threshold: float | None = None,
+        state: StateStore | None = None,
+        writer: ClickHouseWriter | None = None,
+        column: str = "value",
+    ) -> None:
+        self._detectors = list(detectors)
+        self._alert_sink = alert_sink
+        self._alert_threshold = alert_threshold
+        self._event_threshold = event_threshold
+        self._state = state
+        self._writer = writer
+        self._column = column
+        self._alerts = 0
+        if state is not None:
+            saved = state.load()
+            for detector in self._detectors:
+                if detector.name in saved:
+                    detector.restore(saved[detector.name])
+
+    @property
+    def alerts(self) -> int:
+        return self._alerts
+
+    def observe(self, batch: AnyRecordBatch) -> None:
+        if not batch.size:
+            return
+        values = batch.column(self._column)
+        anomalies = []
+        alert = False
+        for detector in self._detectors:
+            deviations = detector.score_update(values)
+            flagged = int((deviations >= 1.0).sum())
+            share = flagged / len(deviations) if len(deviations) else 0.0
+            peak = int(deviations.argmax()) if len(deviations) else 0
+            peak_deviation = float(deviations[peak]) if len(deviations) else 0.0
+            alert = alert or share >= self._alert_threshold
+            alert = alert or (self._event_threshold is not None and peak_deviation >= self._event_threshold)
+            anomalies.append(
+                Anomaly(
+                    detector=detector.name,
+                    score=peak_deviation,
+                    severity=share,
+                    description=(
+                        f"{detector.name} flagged {flagged}/{len(deviations)} rows of ingested batch, "
+                        f"worst {self._column}={values[peak]} at {peak_deviation:.1f}x threshold"
+                    ),
+                )
+            )
+        if not alert:
+            return
+
+        seconds = batch.epoch_seconds()
+        report = AnomalyReport(
+            generated_at=datetime.utcnow(),
+            window_start=datetime.utcfromtimestamp(int(seconds.min())),
+            window_end=datetime.utcfromtimestamp(int(seconds.max())),
+            anomalies=tuple(anomalies),
+        )
+        self._alerts += 1
+        logger.warning("streaming alert on ingested batch: {}", report)
+        if self._writer is not None:
+            self._writer.persist_report(report)
+        if self._alert_sink is not None:
+            self._alert_sink.send(report)
+
+    def flush(self) -> None:
+        if self._state is None:
+            return
+        self._state.save({detector.name: detector.state() for detector in self._detectors})
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+from loguru import logger
+
+from pipeline_anomaly.domain.services.interfaces import WindowReader
+
+
+@dataclass(frozen=True, slots=True)
+class WindowSnapshotStats:
+    """Сколько чтений окна сделано и сколько сэкономлено повторным использованием снимка."""
+
+    reads: int
+    hits: int
+    rows: int
+    bytes_read: int
+    read_seconds: float
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.bytes_read * self.hits
+
+    @property
+    def seconds_saved(self) -> float:
+        return self.read_seconds * self.hits
+
+
+class WindowSnapshot:
+    """Последнее окно событий, прочитанное из хранилища один раз за запуск.
+
+    Фрейм при загрузке упорядочивается по `sort_column` (сортировка пропускается, если
+    хранилище уже отдало его упорядоченным) и дальше раздаётся всем стадиям как
+    поверхностная копия общих данных: потребители читают его, но не изменяют.
+    `reset()` сбрасывает снимок перед следующим запуском.
+    """
+
+    def __init__(self, reader: WindowReader, sort_column: str = "event_time") -> None:
+        self._reader = reader
+        self._sort_column = sort_column
+        self._lock = threading.Lock()
+        self._frame: pd.DataFrame | None = None
+        self._reads = 0
+        self._hits = 0
+        self._bytes_read = 0
+        self._read_seconds = 0.0
+
+    def frame(self) -> pd.DataFrame:
+        with self._lock:
+            if self._frame is None:
+                self._frame = self._load()
+            else:
+                self._hits += 1
+            return self._frame.copy(deep=False)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._frame = None
+            self._reads = 0
+            self._hits = 0
+            self._bytes_read = 0
+            self._read_seconds = 0.0
+
+    def stats(self) -> WindowSnapshotStats:
+        with self._lock:
+            return WindowSnapshotStats(
+                reads=self._reads,
+                hits=self._hits,
+                rows=0 if self._frame is None else len(self._frame),
+                bytes_read=self._bytes_read,
+                read_seconds=self._read_seconds,
+            )
+
+    def _load(self) -> pd.DataFrame:
+        started = time.perf_counter()
+        dataframe = sorted_by(self._reader.read_latest_window(), self._sort_column)
+        self._read_seconds = time.perf_counter() - started
+        self._bytes_read = int(dataframe.memory_usage(deep=True).sum())
+        self._reads += 1
+        logger.info(
+            "window snapshot loaded: {} rows / {:.1f} MiB in {:.2f}s",
+            len(dataframe),
+            self._bytes_read / 2**20,
+            self._read_seconds,
+        )
+        return dataframe
+
+
+def sorted_by(dataframe: pd.DataFrame, column: str) -> pd.DataFrame:
+    """Сортирует фрейм по колонке, только если он ещё не упорядочен."""
+
+    if dataframe[column].is_monotonic_increasing:
+        return dataframe
+    return dataframe.sort_values(column, kind="stable", ignore_index=True)
@@ -2,33 +2,91 @@ from __future__ import annotations
 
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
+from pipeline_anomaly.application.services.window_snapshot import sorted_by
 from pipeline_anomaly.domain.models.aggregate import Aggregate, AggregateCollection
-from pipeline_anomaly.domain.services.interfaces import ClickHouseWriter
+from pipeline_anomaly.domain.services.interfaces import (
+    AggregationEngine,
+    ClickHouseWriter,
+    WindowDelta,
+    WindowSeriesEngine,
+    WindowSource,
+)
 
 
 class ComputeAggregates:
-    def __init__(self, writer: ClickHouseWriter, windows: tuple[str, ...]) -> None:
+    """Считает агрегаты по последнему окну.
+
+    По умолчанию метрики считаются в pandas по сырому окну; с `engine` набор метрик
+    отдаёт внешний движок (например, инкрементальный), и сырые события не читаются.
+    `series_engine` дополнительно выдаёт временные ряды оконных метрик по сырому окну.
+    С `delta` окно содержит новые строки и контекст: сводные и посетевые метрики
+    считаются только по новым строкам (то есть описывают строки с прошлого запуска, а не
+    сутки), скользящие окна — по всему фрейму (контекст покрывает их начало), из рядов
+    выдаются окна, закрывшиеся после водяного знака.
+    """
+
+    def __init__(
+        self,
+        writer: ClickHouseWriter,
+        windows: tuple[str, ...],
+        window_source: WindowSource | None = None,
+        engine: AggregationEngine | None = None,
+        series_engine: WindowSeriesEngine | None = None,
+        delta: WindowDelta | None = None,
+    ) -> None:
         self._writer = writer
         self._windows = windows
+        self._window_source = window_source
+        self._engine = engine
+        self._series_engine = series_engine
+        self._delta = delta
 
     def execute(self) -> AggregateCollection:
-        dataframe = self._writer.read_latest_window()
-        dataframe = dataframe.sort_values("event_time")
-        window_start = dataframe["event_time"].min()
-        window_end = dataframe["event_time"].max()
+        if self._engine is not None:
+            aggregates = list(self._engine.compute(self._windows).aggregates)
+            if self._series_engine is not None:
+                aggregates.extend(self._series_aggregates(self._read_window()))
+            collection = AggregateCollection(aggregates=tuple(aggregates))
+            self._writer.persist_aggregates(collection)
+            return collection
+
+        dataframe = self._read_window()
+        fresh = dataframe if self._delta is None else dataframe[self._delta.is_new(dataframe)]
+        if fresh.empty:
+            raise RuntimeError("no new events since watermark")
+        window_start = fresh["event_time"].min()
+        window_end = fresh["event_time"].max()
 
         aggregates = []
-        aggregates.extend(self._base_metrics(dataframe, window_start, window_end))
-        aggregates.extend(self._chain_metrics(dataframe, window_start, window_end))
+        aggregates.extend(self._base_metrics(fresh, window_start, window_end))
+        aggregates.extend(self._chain_metrics(fresh, window_start, window_end))
         aggregates.extend(self._window_metrics(dataframe, window_end))
+        if self._series_engine is not None:
+            aggregates.extend(self._series_aggregates(dataframe))
 
         collection = AggregateCollection(aggregates=tuple(aggregates))
 
         self._writer.persist_aggregates(collection)
         return collection
 
+    def _read_window(self) -> pd.DataFrame:
+        if self._window_source is not None:
+            return self._window_source.frame()
+        return sorted_by(self._writer.read_latest_window(), "event_time")
+
+    def _series_aggregates(self, dataframe: pd.DataFrame) -> list[Aggregate]:
+        aggregates = self._series_engine.aggregates(dataframe)
+        watermark = None if self._delta is None else self._delta.new_since()
+        if watermark is None:
+            return aggregates
+        mark = pd.Timestamp(watermark.event_time)
+        if mark.tzinfo is not None:
+            mark = mark.tz_convert(None)
+        return [aggregate for aggregate in aggregates if pd.Timestamp(aggregate.window_end) > mark]
+
     def _base_metrics(self, dataframe: pd.DataFrame, window_start: datetime, window_end: datetime) -> list[Aggregate]:
         metrics = [
             Aggregate("count", float(len(dataframe)), window_start, window_end),
@@ -68,22 +126,26 @@ class ComputeAggregates:
         metrics: list[Aggregate] = []
         if not self._windows:
             return metrics
+        event_time = dataframe["event_time"]
+        prefix = np.concatenate(([0.0], np.cumsum(dataframe["value"].to_numpy(dtype=np.float64))))
+        total = len(dataframe)
         for window in self._windows:
             try:
                 delta = pd.to_timedelta(window)
             except ValueError as exc:
                 raise ValueError(f"invalid window {window}") from exc
-            window_df = dataframe[dataframe["event_time"] >= (window_end - delta)]
-            if window_df.empty:
+            first = int(event_time.searchsorted(window_end - delta, side="left"))
+            count = total - first
+            if count == 0:
                 continue
-            window_start = window_df["event_time"].min()
+            window_start = event_time.iloc[first]
             metrics.append(
-                Aggregate(f"count_last_{window}", float(len(window_df)), window_start, window_end)
+                Aggregate(f"count_last_{window}", float(count), window_start, window_end)
             )
             metrics.append(
                 Aggregate(
                     f"mean_value_last_{window}",
-                    float(window_df["value"].mean()),
+                    float((prefix[total] - prefix[first]) / count),
                     window_start,
                     window_end,
                 )
@@ -1,45 +1,178 @@
 from __future__ import annotations
 
+import time
+from collections.abc import Sequence
 from datetime import datetime
 
 import pandas as pd
+from loguru import logger
 
-from pipeline_anomaly.domain.models.anomaly import Anomaly, AnomalyReport
-from pipeline_anomaly.domain.services.interfaces import AnomalyDetector, ClickHouseWriter
+from pipeline_anomaly.application.services.anomalous_events import RowScoreAccumulator
+from pipeline_anomaly.application.services.cascade import DetectionCascade
+from pipeline_anomaly.domain.models.anomaly import Anomaly, AnomalyReport, DetectorOutcome
+from pipeline_anomaly.domain.models.feature_matrix import FeatureMatrix
+from pipeline_anomaly.domain.services.interfaces import (
+    AnomalyDetector,
+    ClickHouseWriter,
+    DetectorRunner,
+    WindowDelta,
+    WindowSource,
+)
 
 
 class DetectAnomalies:
-    def __init__(self, writer: ClickHouseWriter, detectors: list[AnomalyDetector], threshold: float) -> None:
+    """Прогоняет детекторы по окну и собирает отчёт."""
+
+    def __init__(
+        self,
+        writer: ClickHouseWriter,
+        detectors: list[AnomalyDetector],
+        threshold: float,
+        window_source: WindowSource | None = None,
+        runner: DetectorRunner | None = None,
+        partition_by: str | None = None,
+        min_partition_rows: int = 1,
+        top_k: int = 0,
+        cascade: DetectionCascade | None = None,
+        delta: WindowDelta | None = None,
+    ) -> None:
         self._writer = writer
         self._detectors = detectors
         self._threshold = threshold
+        self._window_source = window_source
+        self._runner = runner
+        self._partition_by = partition_by
+        self._min_partition_rows = min_partition_rows
+        self._top_k = top_k
+        self._cascade = cascade
+        self._delta = delta
+        self._detectors_by_name = {detector.name: detector for detector in detectors}
 
     def execute(self) -> AnomalyReport:
-        dataframe = self._writer.read_latest_window()
-        window_start = dataframe["event_time"].min()
-        window_end = dataframe["event_time"].max()
+        """Строит отчёт по окну; `top_k` самых аномальных событий попадают в `events`.
+
+        С `delta` детекторы обучаются на новых строках вместе с контекстом, а отчёт
+        и `events` строятся только по новым строкам.
+        """
+
+        if self._window_source is not None:
+            dataframe = self._window_source.frame()
+        else:
+            dataframe = self._writer.read_latest_window()
+        new_rows = None if self._delta is None else self._delta.is_new(dataframe)
+        reported = dataframe if new_rows is None else dataframe[new_rows]
+        window_start = reported["event_time"].min()
+        window_end = reported["event_time"].max()
 
         anomalies: list[Anomaly] = []
-        for detector in self._detectors:
-            scores = detector.fit_predict(dataframe)
-            severity = detector.severity(scores)
-            anomalies.append(
-                Anomaly(
-                    detector=detector.name,
-                    score=float(scores.mean()),
-                    severity=float(severity),
-                    description=f"{detector.name} severity={severity:.3f}",
+        timings: dict[str, float] = {}
+        skipped: list[str] = []
+        row_scores = RowScoreAccumulator(len(dataframe))
+        for features, outcomes in self._detect(dataframe):
+            partition = features.partition
+            for outcome in outcomes:
+                name = outcome.detector if partition is None else f"{outcome.detector}[{partition}]"
+                timings[name] = outcome.seconds
+                if outcome.scores is None:
+                    skipped.append(name)
+                    continue
+                row_scores.add(outcome.detector, outcome.scores, features.rows)
+                scores, severity = outcome.scores, outcome.severity
+                if new_rows is not None:
+                    mask = new_rows if features.rows is None else new_rows[features.rows]
+                    scores = scores[mask].reset_index(drop=True)
+                    if scores.empty:
+                        continue
+                    severity = self._detectors_by_name[outcome.detector].severity(scores)
+                anomalies.append(
+                    Anomaly(
+                        detector=outcome.detector,
+                        score=float(scores.mean()),
+                        severity=float(severity),
+                        description=f"{name} severity={severity:.3f}",
+                        partition=partition,
+                    )
                 )
-            )
 
         report = AnomalyReport(
             generated_at=datetime.utcnow(),
             window_start=window_start,
             window_end=window_end,
             anomalies=tuple(anomalies),
+            timings=timings,
+            skipped=tuple(skipped),
+            events=row_scores.events(dataframe, self._top_k, self._partition_by, mask=new_rows),
         )
         self._writer.persist_report(report)
         return report
 
+    def _detect(self, dataframe: pd.DataFrame) -> list[tuple[FeatureMatrix, list[DetectorOutcome]]]:
+        """С `cascade` дорогие детекторы идут только на сработавших партициях, остальные — в `skipped`."""
+
+        partitions = self._partitions(dataframe)
+        if self._cascade is None:
+            return list(zip(partitions, self._run(self._detectors, partitions)))
+
+        cheap, expensive = self._cascade.split(self._detectors)
+        first_stage = self._run(cheap, partitions)
+        escalated = self._cascade.escalate(first_stage)
+        targets = [features for features, escalate in zip(partitions, escalated) if escalate]
+        second_stage = iter(self._run(expensive, targets))
+        results = []
+        for features, outcomes, escalate in zip(partitions, first_stage, escalated):
+            if escalate:
+                outcomes = outcomes + next(second_stage)
+            else:
+                outcomes = outcomes + [
+                    DetectorOutcome(detector.name, scores=None, severity=0.0, seconds=0.0, skip_reason="cascade")
+                    for detector in expensive
+                ]
+            results.append((features, outcomes))
+        if expensive:
+            logger.info("cascade escalated {}/{} partitions", len(targets), len(partitions))
+        return results
+
+    def _partitions(self, dataframe: pd.DataFrame) -> list[FeatureMatrix]:
+        """Стандартизованные float32-матрицы окна: одна или по партиции на значение `partition_by`."""
+
+        if self._partition_by is None:
+            return [FeatureMatrix.from_frame(dataframe)]
+        partitions = FeatureMatrix.split_by(dataframe, self._partition_by, min_rows=self._min_partition_rows)
+        dropped = dataframe[self._partition_by].nunique() - len(partitions)
+        if dropped:
+            logger.info("skipping {} partitions smaller than {} rows", dropped, self._min_partition_rows)
+        return list(partitions.values())
+
+    def _run(
+        self, detectors: Sequence[AnomalyDetector], partitions: Sequence[FeatureMatrix]
+    ) -> list[list[DetectorOutcome]]:
+        """Без `runner` детекторы идут по очереди в текущем процессе."""
+
+        if not detectors or not partitions:
+            return [[] for _ in partitions]
+        if self._runner is None:
+            return [[self._run_inline(detector, features) for detector in detectors] for features in partitions]
+        if self._partition_by is None:
+            return [self._runner.run(detectors, features) for features in partitions]
+        outcomes = self._runner.run_partitioned(detectors, {features.partition: features for features in partitions})
+        return [outcomes[features.partition] for features in partitions]
+
+    @staticmethod
+    def _run_inline(detector: AnomalyDetector, features: FeatureMatrix) -> DetectorOutcome:
+        started = time.perf_counter()
+        scores = detector.fit_predict(features)
+        severity = detector.severity(scores)
+        return DetectorOutcome(
+            detector=detector.name,
+            scores=scores,
+            severity=float(severity),
+            seconds=time.perf_counter() - started,
+        )
+
     def is_alert(self, report: AnomalyReport) -> bool:
         return report.highest_severity() >= self._threshold
+
+    def close(self) -> None:
+        """Освобождает ресурсы `runner` (например, пул процессов)."""
+        if self._runner is not None:
+            self._runner.close()
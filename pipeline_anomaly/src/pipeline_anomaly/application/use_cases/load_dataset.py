@@ -1,26 +1,227 @@
 from __future__ import annotations
 
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Generator, Iterable, Iterator, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+
 from loguru import logger
 
-from pipeline_anomaly.domain.services.interfaces import ClickHouseWriter, DatasetGenerator, DataQualityChecker
+from pipeline_anomaly.domain.models.batch import AnyRecordBatch
+from pipeline_anomaly.domain.models.ingestion import IngestionReport
+from pipeline_anomaly.domain.services.interfaces import (
+    BatchObserver,
+    CheckpointedSource,
+    ClickHouseWriter,
+    DatasetGenerator,
+    DataQualityChecker,
+    StatefulComponent,
+)
+from pipeline_anomaly.domain.services.tracing import Tracer
+
+_END_OF_STREAM = object()
+
+
+@dataclass(frozen=True, slots=True)
+class _StreamFailure:
+    error: BaseException
 
 
 class LoadSyntheticDataset:
+    """Загрузка конвейером: генерация → проверка качества → вставка.
+
+    Стадии связаны очередями глубиной `max_in_flight_batches` и работают в своих потоках,
+    вставки выполняют `insert_workers` параллельных воркеров. Результаты вставок
+    разбираются в порядке батчей, поэтому чекпоинт источника фиксируется строго по порядку;
+    первая ошибка любой стадии останавливает конвейер и пробрасывается из `execute`.
+    Наблюдатели (`observers`) получают каждый вставленный батч в том же порядке до фиксации
+    чекпоинта. Состояние проверки качества и наблюдателей сохраняется только после успешного прогона.
+    Пустой после проверки батч (всё уже загружено раньше) не вставляется, но чекпоинт по нему фиксируется.
+    """
+
     def __init__(
         self,
         generator: DatasetGenerator,
         writer: ClickHouseWriter,
         quality_checker: DataQualityChecker | None = None,
+        max_in_flight_batches: int = 2,
+        insert_workers: int = 1,
+        observers: Sequence[BatchObserver] = (),
+        tracer: Tracer | None = None,
     ) -> None:
+        if max_in_flight_batches < 0:
+            raise ValueError("max_in_flight_batches must be non-negative")
+        if insert_workers < 1:
+            raise ValueError("insert_workers must be positive")
         self._generator = generator
         self._writer = writer
         self._quality_checker = quality_checker
+        self._max_in_flight_batches = max_in_flight_batches
+        self._insert_workers = insert_workers
+        self._observers = tuple(observers)
+        self._tracer = tracer if tracer is not None else Tracer(enabled=False)
+        self._validation_seconds = 0.0
 
-    def execute(self) -> None:
+    @property
+    def resumable(self) -> bool:
+        """Источник продолжает с чекпоинта; иначе каждый `execute` читает его заново целиком."""
+
+        return isinstance(self._generator, CheckpointedSource)
+
+    def execute(self) -> IngestionReport:
         logger.info("ensure schema")
         self._writer.ensure_schema()
-        for idx, batch in enumerate(self._generator.batches(), start=1):
-            if self._quality_checker:
-                batch = self._quality_checker.validate(batch)
-            logger.info("ingesting batch {}/{} rows", idx, batch.size)
-            self._writer.ingest_batch(batch)
+        started = time.perf_counter()
+        self._validation_seconds = 0.0
+        batches_done = 0
+        rows_done = 0
+        insert_seconds = 0.0
+
+        batches = self._stream()
+        pending: deque[tuple[AnyRecordBatch, Future[float]]] = deque()
+        with ThreadPoolExecutor(max_workers=self._insert_workers, thread_name_prefix="clickhouse-insert") as executor:
+            try:
+                for idx, batch in enumerate(batches, start=1):
+                    pending.append((batch, executor.submit(self._insert, idx, batch)))
+                    if len(pending) < self._insert_workers:
+                        continue
+                    done, future = pending.popleft()
+                    insert_seconds += self._complete(done, future)
+                    batches_done += 1 if done.size else 0
+                    rows_done += done.size
+                while pending:
+                    done, future = pending.popleft()
+                    insert_seconds += self._complete(done, future)
+                    batches_done += 1 if done.size else 0
+                    rows_done += done.size
+            except BaseException:
+                for _, future in pending:
+                    future.cancel()
+                raise
+            finally:
+                batches.close()
+
+        for component in (self._quality_checker, *self._observers):
+            if isinstance(component, StatefulComponent):
+                component.flush()
+
+        report = IngestionReport(
+            batches=batches_done,
+            rows=rows_done,
+            elapsed_seconds=time.perf_counter() - started,
+            validation_seconds=self._validation_seconds,
+            insert_seconds=insert_seconds,
+        )
+        logger.info(
+            "ingested {} batches / {} rows in {:.2f}s ({:.0f} rows/s)",
+            report.batches,
+            report.rows,
+            report.elapsed_seconds,
+            report.rows_per_second,
+        )
+        return report
+
+    def _stream(self) -> Generator[AnyRecordBatch, None, None]:
+        batches = self._generated(self._generator.batches())
+        if self._max_in_flight_batches == 0:
+            return self._validated(iter(batches))
+        generated = _prefetch(batches, self._max_in_flight_batches)
+        return _prefetch(self._validated(generated), self._max_in_flight_batches)
+
+    def _validated(self, batches: Iterator[AnyRecordBatch]) -> Generator[AnyRecordBatch, None, None]:
+        try:
+            for batch in batches:
+                if self._quality_checker:
+                    with self._tracer.span("validate") as span:
+                        started = time.perf_counter()
+                        batch = self._quality_checker.validate(batch)
+                        self._validation_seconds += time.perf_counter() - started
+                        span.rows = batch.size
+                yield batch
+        finally:
+            close = getattr(batches, "close", None)
+            if close is not None:
+                close()
+
+    def _generated(self, batches: Iterable[AnyRecordBatch]) -> Generator[AnyRecordBatch, None, None]:
+        """Источник с замером времени генерации каждого батча (спан `generate`)."""
+
+        iterator = iter(batches)
+        try:
+            while True:
+                with self._tracer.span("generate") as span:
+                    batch = next(iterator, None)
+                    if batch is not None:
+                        span.rows = batch.size
+                if batch is None:
+                    return
+                yield batch
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    def _insert(self, idx: int, batch: AnyRecordBatch) -> float:
+        if not batch.size:
+            logger.info("skipping batch {}: all rows were loaded before", idx)
+            return 0.0
+        logger.info("ingesting batch {}/{} rows", idx, batch.size)
+        started = time.perf_counter()
+        self._writer.ingest_batch(batch)
+        return time.perf_counter() - started
+
+    def _complete(self, batch: AnyRecordBatch, future: Future[float]) -> float:
+        elapsed = future.result()
+        if batch.size:
+            for observer in self._observers:
+                observer.observe(batch)
+        if isinstance(self._generator, CheckpointedSource):
+            self._generator.commit(batch)
+        return elapsed
+
+
+def _prefetch(batches: Iterable[AnyRecordBatch], max_in_flight: int) -> Generator[AnyRecordBatch, None, None]:
+    """Читает источник в фоновом потоке, держа в очереди не больше `max_in_flight` батчей."""
+
+    buffer: queue.Queue[object] = queue.Queue(maxsize=max_in_flight)
+    stopped = threading.Event()
+
+    def produce() -> None:
+        try:
+            for batch in batches:
+                if not _offer(buffer, batch, stopped):
+                    return
+            _offer(buffer, _END_OF_STREAM, stopped)
+        except BaseException as exc:  # noqa: BLE001 - re-raised in consumer thread
+            _offer(buffer, _StreamFailure(exc), stopped)
+        finally:
+            close = getattr(batches, "close", None)
+            if close is not None:
+                close()
+
+    producer = threading.Thread(target=produce, name="dataset-prefetch", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _END_OF_STREAM:
+                return
+            if isinstance(item, _StreamFailure):
+                raise item.error
+            yield item
+    finally:
+        stopped.set()
+        producer.join()
+
+
+def _offer(buffer: queue.Queue[object], item: object, stopped: threading.Event) -> bool:
+    while not stopped.is_set():
+        try:
+            buffer.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
@@ -1,8 +1,16 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+from contextlib import contextmanager
+
 from loguru import logger
 
+from pipeline_anomaly.application.services.watermark_window import WatermarkWindowReader
+from pipeline_anomaly.application.services.window_snapshot import WindowSnapshot
+from pipeline_anomaly.domain.models.ingestion import IngestionReport
+from pipeline_anomaly.domain.models.span import Span
 from pipeline_anomaly.domain.services.interfaces import AlertSink
+from pipeline_anomaly.domain.services.tracing import Tracer
 from pipeline_anomaly.application.use_cases.compute_aggregates import ComputeAggregates
 from pipeline_anomaly.application.use_cases.detect_anomalies import DetectAnomalies
 from pipeline_anomaly.application.use_cases.load_dataset import LoadSyntheticDataset
@@ -16,21 +24,90 @@ class RunPipeline:
         detector: DetectAnomalies,
         alert_sink: AlertSink,
         alerts_enabled: bool,
+        window_snapshot: WindowSnapshot | None = None,
+        watermarks: WatermarkWindowReader | None = None,
+        tracer: Tracer | None = None,
     ) -> None:
         self._loader = loader
         self._aggregator = aggregator
         self._detector = detector
         self._alert_sink = alert_sink
         self._alerts_enabled = alerts_enabled
+        self._window_snapshot = window_snapshot
+        self._watermarks = watermarks
+        self._tracer = tracer if tracer is not None else Tracer(enabled=False)
+
+    @property
+    def resumable_source(self) -> bool:
+        return self._loader.resumable
 
     def execute(self) -> None:
         logger.info("starting pipeline")
-        self._loader.execute()
-        aggregates = self._aggregator.execute()
+        with self._stage("pipeline"):
+            self.ingest()
+            self.analyze()
+
+    def close(self) -> None:
+        self._detector.close()
+
+    def ingest(self) -> IngestionReport:
+        with self._stage("ingest") as span:
+            ingestion = self._loader.execute()
+            span.rows = ingestion.rows
+        logger.info("ingestion report: {}", ingestion)
+        return ingestion
+
+    def analyze(self) -> None:
+        """Стадии после загрузки: чтение окна, агрегаты, детекция, алерты, сдвиг водяного знака."""
+        with self._stage("analyze"):
+            self._analyze()
+
+    def _analyze(self) -> None:
+        if self._window_snapshot is not None:
+            self._window_snapshot.reset()
+            with self._tracer.span("window_read") as span:
+                span.rows = len(self._window_snapshot.frame())
+        if self._watermarks is not None and not self._has_new_events():
+            logger.info("no new events since watermark {}, skipping", self._watermarks.new_since())
+            return
+        with self._tracer.span("aggregates"):
+            aggregates = self._aggregator.execute()
         logger.info("aggregates persisted: {}", aggregates.as_dict())
-        report = self._detector.execute()
+        with self._tracer.span("detect"):
+            report = self._detector.execute()
+            for detector, seconds in report.timings.items():
+                self._tracer.record(f"detector.{detector}", seconds)
         logger.info("anomaly report generated: {}", report)
         if self._alerts_enabled and self._detector.is_alert(report):
             logger.warning("alert threshold exceeded")
-            self._alert_sink.send(report)
+            with self._tracer.span("alert"):
+                self._alert_sink.send(report)
+        if self._window_snapshot is not None:
+            stats = self._window_snapshot.stats()
+            logger.info(
+                "window snapshot: {} reads, {} reuses, saved {:.1f} MiB / {:.2f}s",
+                stats.reads,
+                stats.hits,
+                stats.bytes_saved / 2**20,
+                stats.seconds_saved,
+            )
+        if self._watermarks is not None:
+            self._watermarks.commit()
         logger.info("pipeline finished")
+
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[Span]:
+        """Спан стадии; если он корневой, после закрытия в лог пишется дерево вложенных замеров."""
+        with self._tracer.span(name) as span:
+            yield span
+        if span.depth == 0 and span.path == name:
+            tree = self._tracer.tree()
+            if tree:
+                logger.info("stage timings:\n{}", "\n".join(tree))
+
+    def _has_new_events(self) -> bool:
+        if self._window_snapshot is not None:
+            frame = self._window_snapshot.frame()
+        else:
+            frame = self._watermarks.read_latest_window()
+        return bool(self._watermarks.is_new(frame).any())
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Sequence
+from typing import Mapping, Sequence
+
+import pandas as pd
 
 
 @dataclass(frozen=True, slots=True)
@@ -11,6 +13,19 @@ class Anomaly:
     score: float
     severity: float
     description: str
+    partition: str | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class AnomalousEvent:
+    """Событие окна с наибольшим совокупным скором; `score` — доля детекторов, отметивших строку."""
+
+    tx_hash: str
+    event_time: datetime
+    chain_id: int
+    score: float
+    detectors: tuple[str, ...]
+    partition: str | None = None
 
 
 @dataclass(frozen=True, slots=True)
@@ -19,8 +34,22 @@ class AnomalyReport:
     window_start: datetime
     window_end: datetime
     anomalies: Sequence[Anomaly]
+    timings: Mapping[str, float] = field(default_factory=dict)
+    skipped: Sequence[str] = ()
+    events: Sequence[AnomalousEvent] = ()
 
     def highest_severity(self) -> float:
         if not self.anomalies:
             return 0.0
         return max(item.severity for item in self.anomalies)
+
+
+@dataclass(frozen=True, slots=True)
+class DetectorOutcome:
+    """Результат одного детектора; `scores is None`, если детектор пропущен (`skip_reason`)."""
+
+    detector: str
+    scores: pd.Series | None
+    severity: float
+    seconds: float
+    skip_reason: str | None = None
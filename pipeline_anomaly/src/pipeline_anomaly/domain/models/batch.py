@@ -1,16 +1,39 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Iterable
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Mapping, Union
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+
+EVENTS_SCHEMA = pa.schema(
+    [
+        pa.field("event_time", pa.timestamp("s")),
+        pa.field("entity_id", pa.uint64()),
+        pa.field("chain_id", pa.uint16()),
+        pa.field("block_number", pa.uint64()),
+        pa.field("contract_address", pa.string()),
+        pa.field("tx_hash", pa.string()),
+        pa.field("value", pa.float64()),
+        pa.field("attribute", pa.float64()),
+        pa.field("gas_used", pa.float64()),
+        pa.field("calldata_size", pa.uint32()),
+    ]
+)
+"""Arrow-схема строки `events`, совпадает с DDL в `ClickHouseRepository.ensure_schema`."""
 
 
 @dataclass(frozen=True, slots=True)
 class RecordBatch:
-    """Пакет строк для загрузки в ClickHouse."""
+    """Пакет строк для загрузки в ClickHouse.
+
+    `source_offset` — позиция в источнике сразу после последней строки батча;
+    источник с чекпоинтами фиксирует её после успешной вставки.
+    """
 
     dataframe: pd.DataFrame
+    source_offset: int | None = None
 
     def __iter__(self) -> Iterable[pd.Series]:
         return (row for _, row in self.dataframe.iterrows())
@@ -18,3 +41,77 @@ class RecordBatch:
     @property
     def size(self) -> int:
         return len(self.dataframe)
+
+    def column(self, name: str) -> np.ndarray:
+        return self.dataframe[name].to_numpy()
+
+    def epoch_seconds(self, name: str = "event_time") -> np.ndarray:
+        """Секунды Unix-времени колонки; наивные метки считаются UTC."""
+
+        return pd.DatetimeIndex(self.dataframe[name]).as_unit("s").asi8
+
+
+@dataclass(frozen=True, slots=True)
+class ArrowRecordBatch:
+    """Пакет строк в колонковом Arrow-представлении.
+
+    Срезы не копируют буферы, а вставка в ClickHouse идёт через Arrow без pandas.
+    `dataframe` строится по требованию — для кода, которому нужен pandas.
+    """
+
+    table: pa.Table
+    source_offset: int | None = None
+    _dataframe: pd.DataFrame | None = field(default=None, init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_columns(
+        cls,
+        columns: Mapping[str, Any],
+        schema: pa.Schema = EVENTS_SCHEMA,
+        source_offset: int | None = None,
+    ) -> "ArrowRecordBatch":
+        arrays = [pa.array(columns[field.name]).cast(field.type, safe=False) for field in schema]
+        return cls(table=pa.Table.from_arrays(arrays, schema=schema), source_offset=source_offset)
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        dataframe: pd.DataFrame,
+        schema: pa.Schema = EVENTS_SCHEMA,
+        source_offset: int | None = None,
+    ) -> "ArrowRecordBatch":
+        table = pa.Table.from_pandas(dataframe[schema.names], preserve_index=False)
+        return cls(table=table.cast(schema, safe=False), source_offset=source_offset)
+
+    def __iter__(self) -> Iterable[dict[str, Any]]:
+        return iter(self.table.to_pylist())
+
+    @property
+    def size(self) -> int:
+        return self.table.num_rows
+
+    @property
+    def dataframe(self) -> pd.DataFrame:
+        """pandas-копия таблицы; строится один раз на батч, менять её на месте нельзя."""
+
+        if self._dataframe is None:
+            object.__setattr__(self, "_dataframe", self.table.to_pandas())
+        return self._dataframe
+
+    def column(self, name: str) -> np.ndarray:
+        return self.table.column(name).to_numpy()
+
+    def epoch_seconds(self, name: str = "event_time") -> np.ndarray:
+        """Секунды Unix-времени колонки; наивные метки считаются UTC."""
+
+        return self.table.column(name).cast(pa.timestamp("s")).cast(pa.int64()).to_numpy()
+
+    def slice(self, offset: int, length: int | None = None) -> "ArrowRecordBatch":
+        reaches_end = length is None or offset + length >= self.size
+        return ArrowRecordBatch(
+            table=self.table.slice(offset, length),
+            source_offset=self.source_offset if reaches_end else None,
+        )
+
+
+AnyRecordBatch = Union[RecordBatch, ArrowRecordBatch]
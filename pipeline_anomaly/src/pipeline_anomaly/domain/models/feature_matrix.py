@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+DETECTOR_FEATURES = ("value", "attribute", "gas_used", "calldata_size")
+
+
+@dataclass(frozen=True, slots=True)
+class FeatureMatrix:
+    """Признаки окна для детекторов: один непрерывный float32-массив, стандартизованный по колонкам.
+
+    `mean`/`std` — статистики исходных колонок (std с ddof=1, нулевой std заменён на 1),
+    считаются один раз при сборке и переиспользуются детекторами. `strata` — метка
+    страты строки (`chain_id`) для выборочных режимов, `partition` — метка партиции
+    (`chain_id=137`) в партиционированном режиме, `rows` — позиции её строк в окне.
+    """
+
+    values: np.ndarray
+    columns: tuple[str, ...]
+    mean: np.ndarray
+    std: np.ndarray
+    strata: np.ndarray | None = None
+    partition: str | None = None
+    rows: np.ndarray | None = None
+
+    @classmethod
+    def from_frame(
+        cls,
+        dataframe: pd.DataFrame,
+        columns: Sequence[str] = DETECTOR_FEATURES,
+        strata_column: str | None = "chain_id",
+        partition: str | None = None,
+        rows: np.ndarray | None = None,
+    ) -> "FeatureMatrix":
+        present = tuple(column for column in columns if column in dataframe.columns)
+        values = np.empty((len(dataframe), len(present)), dtype=np.float32)
+        mean = np.zeros(len(present))
+        std = np.ones(len(present))
+        for position, column in enumerate(present):
+            raw = dataframe[column].to_numpy(dtype=np.float64)
+            if len(raw):
+                mean[position] = raw.mean()
+            if len(raw) > 1:
+                deviation = raw.std(ddof=1)
+                std[position] = deviation if deviation > 0 else 1.0
+            values[:, position] = (raw - mean[position]) / std[position]
+        strata = None
+        if strata_column is not None and strata_column in dataframe.columns:
+            strata = dataframe[strata_column].to_numpy(dtype=np.int64)
+        return cls(values=values, columns=present, mean=mean, std=std, strata=strata, partition=partition, rows=rows)
+
+    @classmethod
+    def split_by(
+        cls,
+        dataframe: pd.DataFrame,
+        key: str,
+        columns: Sequence[str] = DETECTOR_FEATURES,
+        min_rows: int = 1,
+    ) -> dict[str, "FeatureMatrix"]:
+        """Матрица на каждое значение `key`, стандартизованная по своей партиции.
+
+        Партиции меньше `min_rows` строк пропускаются.
+        """
+        partitions = {}
+        for value, rows in sorted(dataframe.groupby(key).indices.items()):
+            if len(rows) < min_rows:
+                continue
+            label = f"{key}={value}"
+            partitions[label] = cls.from_frame(dataframe.iloc[rows], columns=columns, partition=label, rows=rows)
+        return partitions
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def positions(self, columns: Sequence[str]) -> list[int]:
+        try:
+            return [self.columns.index(column) for column in columns]
+        except ValueError as exc:
+            raise KeyError(f"feature matrix has no column {exc}") from exc
+
+    def column(self, name: str) -> np.ndarray:
+        return self.values[:, self.positions([name])[0]]
+
+    def select(self, columns: Sequence[str]) -> np.ndarray:
+        """Подматрица колонок; срез без копии, если колонки идут подряд в том же порядке."""
+        positions = self.positions(columns)
+        first = positions[0]
+        if positions == list(range(first, first + len(positions))):
+            return self.values[:, first : first + len(positions)]
+        return self.values[:, positions]
+
+    def restandardized(self, columns: Sequence[str], mean: np.ndarray, std: np.ndarray) -> "FeatureMatrix":
+        """Те же строки в масштабе чужих статистик — например, эталона закэшированной модели."""
+        positions = self.positions(columns)
+        raw = self.values[:, positions] * self.std[positions] + self.mean[positions]
+        values = np.ascontiguousarray((raw - mean) / std, dtype=np.float32)
+        return FeatureMatrix(
+            values=values,
+            columns=tuple(columns),
+            mean=np.asarray(mean, dtype=np.float64),
+            std=np.asarray(std, dtype=np.float64),
+            strata=self.strata,
+            partition=self.partition,
+            rows=self.rows,
+        )
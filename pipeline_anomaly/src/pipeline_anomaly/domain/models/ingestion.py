@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True, slots=True)
+class IngestionReport:
+    """Итог загрузки: объём, общее время и суммарная занятость стадий."""
+
+    batches: int
+    rows: int
+    elapsed_seconds: float
+    validation_seconds: float
+    insert_seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.rows / self.elapsed_seconds
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class Span:
+    """Замер одного вызова стадии: время, объём данных и прирост пикового RSS процесса.
+
+    `path` — цепочка имён от корневого спана (`pipeline/analyze/detect`), `depth` — её длина
+    без корня. Строки и байты заполняет сам вызов или декоратор `traced`.
+    """
+
+    name: str
+    path: str
+    depth: int = 0
+    seconds: float = 0.0
+    rows: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    peak_memory_delta: int = 0
+
+    @property
+    def rows_per_second(self) -> float:
+        if self.seconds <= 0:
+            return 0.0
+        return self.rows / self.seconds
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Mapping
+
+
+@dataclass(frozen=True, slots=True, order=True)
+class Watermark:
+    """Последнее обработанное событие пайплайна: `(event_time, block_number)`."""
+
+    event_time: datetime
+    block_number: int
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"event_time": self.event_time.isoformat(), "block_number": self.block_number}
+
+    @classmethod
+    def from_dict(cls, payload: Mapping[str, Any]) -> "Watermark":
+        return cls(
+            event_time=datetime.fromisoformat(payload["event_time"]),
+            block_number=int(payload["block_number"]),
+        )
@@ -1,16 +1,58 @@
 from __future__ import annotations
 
-from typing import Protocol
+from collections.abc import Iterator, Mapping, Sequence
+from datetime import datetime
+from typing import Any, Protocol, runtime_checkable
 
+import numpy as np
 import pandas as pd
 
-from pipeline_anomaly.domain.models.aggregate import AggregateCollection
-from pipeline_anomaly.domain.models.anomaly import AnomalyReport
-from pipeline_anomaly.domain.models.batch import RecordBatch
+from pipeline_anomaly.domain.models.aggregate import Aggregate, AggregateCollection
+from pipeline_anomaly.domain.models.anomaly import AnomalyReport, DetectorOutcome
+from pipeline_anomaly.domain.models.batch import AnyRecordBatch
+from pipeline_anomaly.domain.models.feature_matrix import FeatureMatrix
+from pipeline_anomaly.domain.models.span import Span
+from pipeline_anomaly.domain.models.watermark import Watermark
 
 
 class DatasetGenerator(Protocol):
-    def batches(self) -> list[RecordBatch]:
+    def batches(self) -> Iterator[AnyRecordBatch]:
+        ...
+
+
+@runtime_checkable
+class CheckpointedSource(Protocol):
+    def commit(self, batch: AnyRecordBatch) -> None:
+        ...
+
+
+@runtime_checkable
+class StatefulComponent(Protocol):
+    """Компонент с состоянием между запусками; `flush` сохраняет его после успешной загрузки."""
+
+    def flush(self) -> None:
+        ...
+
+
+class BatchObserver(Protocol):
+    """Получает каждый успешно вставленный батч в порядке источника."""
+
+    def observe(self, batch: AnyRecordBatch) -> None:
+        ...
+
+
+class QueryExecutor(Protocol):
+    def query_rows(self, query: str) -> list[tuple]:
+        ...
+
+
+class AggregationEngine(Protocol):
+    def compute(self, windows: tuple[str, ...]) -> AggregateCollection:
+        ...
+
+
+class WindowSeriesEngine(Protocol):
+    def aggregates(self, dataframe: pd.DataFrame) -> list[Aggregate]:
         ...
 
 
@@ -18,7 +60,7 @@ class ClickHouseWriter(Protocol):
     def ensure_schema(self) -> None:
         ...
 
-    def ingest_batch(self, batch: RecordBatch) -> None:
+    def ingest_batch(self, batch: AnyRecordBatch) -> None:
         ...
 
     def persist_aggregates(self, aggregates: AggregateCollection) -> None:
@@ -31,21 +73,110 @@ class ClickHouseWriter(Protocol):
         ...
 
 
+class WindowReader(Protocol):
+    def read_latest_window(self) -> pd.DataFrame:
+        ...
+
+
+class WindowSource(Protocol):
+    def frame(self) -> pd.DataFrame:
+        ...
+
+
+class IncrementalEventReader(Protocol):
+    def read_events_since(self, since: datetime | None) -> pd.DataFrame:
+        ...
+
+
+class WatermarkStore(Protocol):
+    def load(self, pipeline: str) -> Watermark | None:
+        ...
+
+    def save(self, pipeline: str, watermark: Watermark) -> None:
+        ...
+
+
+class WindowDelta(Protocol):
+    """Какие строки окна новые с прошлого успешного запуска (остальные — контекст)."""
+
+    def new_since(self) -> Watermark | None:
+        ...
+
+    def is_new(self, dataframe: pd.DataFrame) -> np.ndarray:
+        ...
+
+
 class AnomalyDetector(Protocol):
     name: str
 
-    def fit_predict(self, dataframe: pd.DataFrame) -> pd.Series:
+    def fit_predict(self, features: FeatureMatrix) -> pd.Series:
         ...
 
     def severity(self, scores: pd.Series) -> float:
         ...
 
 
+class FittableDetector(AnomalyDetector, Protocol):
+    """Детектор с раздельными фазами: `fit` возвращает модель, `score` оценивает ей окно."""
+
+    columns: Sequence[str]
+
+    def fit(self, features: FeatureMatrix) -> Any:
+        ...
+
+    def score(self, model: Any, features: FeatureMatrix) -> pd.Series:
+        ...
+
+
+class OnlineDetector(Protocol):
+    """Детектор с накопленным состоянием: оценивает новые значения и дообучается на них."""
+
+    name: str
+
+    def score_update(self, values: np.ndarray) -> np.ndarray:
+        """Отклонение каждого значения в единицах порога детектора: выброс от 1."""
+        ...
+
+    def state(self) -> dict[str, Any]:
+        ...
+
+    def restore(self, state: Mapping[str, Any]) -> None:
+        ...
+
+
+class StateStore(Protocol):
+    def load(self) -> dict[str, Any]:
+        ...
+
+    def save(self, payload: Mapping[str, Any]) -> None:
+        ...
+
+
+class DetectorRunner(Protocol):
+    def run(self, detectors: Sequence[AnomalyDetector], features: FeatureMatrix) -> list[DetectorOutcome]:
+        ...
+
+    def run_partitioned(
+        self, detectors: Sequence[AnomalyDetector], partitions: Mapping[str, FeatureMatrix]
+    ) -> dict[str, list[DetectorOutcome]]:
+        ...
+
+    def close(self) -> None:
+        ...
+
+
 class AlertSink(Protocol):
     def send(self, report: AnomalyReport) -> None:
         ...
 
 
 class DataQualityChecker(Protocol):
-    def validate(self, batch: RecordBatch) -> RecordBatch:
+    def validate(self, batch: AnyRecordBatch) -> AnyRecordBatch:
+        ...
+
+
+class SpanExporter(Protocol):
+    """Получает каждый завершённый спан трейсера (например, для метрик Prometheus)."""
+
+    def export(self, span: Span) -> None:
         ...
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any, TypeVar
+
+import pandas as pd
+
+from pipeline_anomaly.domain.models.batch import ArrowRecordBatch, RecordBatch
+from pipeline_anomaly.domain.models.span import Span
+from pipeline_anomaly.domain.services.interfaces import SpanExporter
+
+_Method = TypeVar("_Method", bound=Callable[..., Any])
+
+
+def data_volume(value: Any) -> tuple[int, int]:
+    """Строки и байты данных, если `value` — фрейм или батч; иначе нули.
+
+    Размер берётся без обхода Python-объектов (у строковых колонок pandas — размер указателей),
+    чтобы замер на горячем пути вставки оставался O(числа колонок).
+    """
+
+    if isinstance(value, pd.DataFrame):
+        return len(value), int(value.memory_usage(index=False, deep=False).sum())
+    if isinstance(value, RecordBatch):
+        return data_volume(value.dataframe)
+    if isinstance(value, ArrowRecordBatch):
+        return value.table.num_rows, value.table.nbytes
+    return 0, 0
+
+
+class Tracer:
+    """Вложенные спаны стадий пайплайна.
+
+    Спан, открытый без родителя, — корневой: с него начинается новая сводка. Спаны из
+    других потоков (вставки, префетч) вкладываются в самый глубокий открытый спан потока,
+    открывшего корень. Завершённые спаны уходят в `exporters`, `tree()` сворачивает
+    последний корень в строки «путь → вызовы, время, объём» для лога запуска.
+    Пик памяти спана замеряется, только если заданы `peak_rss` и `reset_peak` (их дают
+    инфраструктура и бенчмарки): это прирост пикового RSS над уровнем на открытии спана —
+    перед каждым открытием пик процесса сбрасывается, а накопленный до сброса пик
+    засчитывается всем открытым спанам, поэтому замер не обнуляется после первой тяжёлой
+    стадии. С `enabled=False` спаны ничего не замеряют.
+    """
+
+    def __init__(
+        self,
+        exporters: Sequence[SpanExporter] = (),
+        enabled: bool = True,
+        peak_rss: Callable[[], int] | None = None,
+        reset_peak: Callable[[], bool] | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        self._exporters = tuple(exporters)
+        self._enabled = enabled
+        self._peak_rss = peak_rss
+        self._reset_peak = reset_peak
+        self._memory: dict[int, list[int]] = {}
+        self._clock = clock
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._root_stack: list[Span] | None = None
+        self._calls: dict[str, int] = {}
+        self._totals: dict[str, Span] = {}
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[Span]:
+        if not self._enabled:
+            yield Span(name=name, path=name)
+            return
+        stack = self._stack()
+        parent = stack[-1] if stack else self._root_parent()
+        if parent is None:
+            self._start_root(stack)
+        span = self._child(name, parent)
+        self._register(span)
+        stack.append(span)
+        self._open_memory(span)
+        started = self._clock()
+        try:
+            yield span
+        finally:
+            span.seconds = self._clock() - started
+            span.peak_memory_delta = self._close_memory(span)
+            stack.pop()
+            if parent is None:
+                with self._lock:
+                    self._root_stack = None
+            self._finish(span)
+
+    def record(self, name: str, seconds: float, rows: int = 0) -> None:
+        """Спан, замеренный снаружи (например, детектор в воркере пула процессов)."""
+
+        if not self._enabled:
+            return
+        stack = self._stack()
+        span = self._child(name, stack[-1] if stack else self._root_parent())
+        span.seconds = seconds
+        span.rows = rows
+        self._finish(span)
+
+    def tree(self) -> list[str]:
+        with self._lock:
+            lines = []
+            for path, total in self._totals.items():
+                parts = [f"{'  ' * total.depth}{total.name}", f"{total.seconds:.3f}s"]
+                calls = self._calls[path]
+                if calls > 1:
+                    parts.append(f"x{calls}")
+                if total.rows:
+                    parts.append(f"{total.rows} rows ({total.rows_per_second:.0f}/s)")
+                if total.bytes_read:
+                    parts.append(f"read {total.bytes_read / 2**20:.1f} MiB")
+                if total.bytes_written:
+                    parts.append(f"written {total.bytes_written / 2**20:.1f} MiB")
+                if total.peak_memory_delta:
+                    parts.append(f"peak rss +{total.peak_memory_delta / 2**20:.1f} MiB")
+                lines.append(" ".join(parts))
+            return lines
+
+    def _stack(self) -> list[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @staticmethod
+    def _child(name: str, parent: Span | None) -> Span:
+        if parent is None:
+            return Span(name=name, path=name)
+        return Span(name=name, path=f"{parent.path}/{name}", depth=parent.depth + 1)
+
+    def _root_parent(self) -> Span | None:
+        with self._lock:
+            if not self._root_stack:
+                return None
+            return self._root_stack[-1]
+
+    def _start_root(self, stack: list[Span]) -> None:
+        with self._lock:
+            self._root_stack = stack
+            self._calls = {}
+            self._totals = {}
+
+    def _open_memory(self, span: Span) -> None:
+        if self._peak_rss is None or self._reset_peak is None:
+            return
+        with self._lock:
+            self._observe_peak()
+            self._reset_peak()
+            baseline = self._peak_rss()
+            self._memory[id(span)] = [baseline, baseline]
+
+    def _close_memory(self, span: Span) -> int:
+        if id(span) not in self._memory:
+            return 0
+        with self._lock:
+            self._observe_peak()
+            baseline, peak = self._memory.pop(id(span))
+        return max(peak - baseline, 0)
+
+    def _observe_peak(self) -> None:
+        """Засчитывает текущий пик процесса всем открытым спанам (вызывается под `_lock`)."""
+        peak = self._peak_rss()
+        for memory in self._memory.values():
+            memory[1] = max(memory[1], peak)
+
+    def _register(self, span: Span) -> Span:
+        """Строка сводки заводится при открытии спана, чтобы дерево шло сверху вниз."""
+        with self._lock:
+            return self._totals.setdefault(span.path, Span(name=span.name, path=span.path, depth=span.depth))
+
+    def _finish(self, span: Span) -> None:
+        total = self._register(span)
+        with self._lock:
+            self._calls[span.path] = self._calls.get(span.path, 0) + 1
+            total.seconds += span.seconds
+            total.rows += span.rows
+            total.bytes_read += span.bytes_read
+            total.bytes_written += span.bytes_written
+            total.peak_memory_delta = max(total.peak_memory_delta, span.peak_memory_delta)
+        for exporter in self._exporters:
+            exporter.export(span)
+
+
+def traced(name: str) -> Callable[[_Method], _Method]:
+    """Оборачивает метод в спан трейсера `self._tracer` (если он задан).
+
+    Фреймы и батчи среди аргументов считаются записанными, в результате — прочитанными.
+    """
+
+    def decorate(method: _Method) -> _Method:
+        @functools.wraps(method)
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            tracer: Tracer | None = getattr(self, "_tracer", None)
+            if tracer is None:
+                return method(self, *args, **kwargs)
+            with tracer.span(name) as span:
+                for argument in (*args, *kwargs.values()):
+                    rows, size = data_volume(argument)
+                    span.rows += rows
+                    span.bytes_written += size
+                result = method(self, *args, **kwargs)
+                rows, size = data_volume(result)
+                span.rows += rows
+                span.bytes_read += size
+            return result
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorate
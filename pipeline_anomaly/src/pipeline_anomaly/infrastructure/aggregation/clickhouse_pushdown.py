@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+import pandas as pd
+
+from pipeline_anomaly.domain.models.aggregate import Aggregate, AggregateCollection
+from pipeline_anomaly.domain.services.interfaces import QueryExecutor
+
+_HIGH_CALLDATA_BYTES = 1024
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledAggregates:
+    """SQL, в который скомпилирован набор метрик: сводка по окну и разрез по `chain_id`."""
+
+    summary: str
+    chains: str
+    windows: tuple[tuple[str, int], ...]
+
+
+class ClickHousePushdownEngine:
+    """Считает тот же набор метрик, что и `ComputeAggregates`, внутри ClickHouse.
+
+    Базовые и оконные метрики собираются одним запросом (`countIf`/`avgIf`/`minIf` на окно),
+    разрез по сетям — вторым (`GROUP BY chain_id`); по сети передаются только итоговые числа.
+    Квантили считаются `quantile_function` (по умолчанию `quantilesTDigest`) и поэтому
+    приближённые, остальные метрики совпадают с pandas-расчётом.
+    """
+
+    def __init__(
+        self,
+        executor: QueryExecutor,
+        table: str = "events",
+        horizon: str = "1 DAY",
+        quantile_function: str = "quantilesTDigest",
+    ) -> None:
+        self._executor = executor
+        self._table = table
+        self._horizon = horizon
+        self._quantile_function = quantile_function
+
+    def compile(self, windows: tuple[str, ...]) -> CompiledAggregates:
+        resolved = self._resolve(windows)
+        source = f"FROM {self._table} WHERE event_time >= now() - INTERVAL {self._horizon}"
+        columns = [
+            "count() AS total",
+            "min(event_time) AS first_event",
+            "max(event_time) AS last_event",
+            "avg(value)",
+            "stddevSamp(value)",
+            f"{self._quantile_function}(0.95, 0.05)(value)",
+            "avg(gas_used)",
+            f"{self._quantile_function}(0.5)(calldata_size)",
+            f"countIf(calldata_size > {_HIGH_CALLDATA_BYTES}) / count()",
+        ]
+        for _, seconds in resolved:
+            condition = f"event_time >= window_end - INTERVAL {seconds} SECOND"
+            columns.extend(
+                [
+                    f"countIf({condition})",
+                    f"avgIf(value, {condition})",
+                    f"minIf(event_time, {condition})",
+                ]
+            )
+        summary = (
+            f"WITH (SELECT max(event_time) {source}) AS window_end\n"
+            f"SELECT\n    " + ",\n    ".join(columns) + f"\n{source}"
+        )
+        chains = f"SELECT chain_id, count(), avg(value)\n{source}\nGROUP BY chain_id\nORDER BY chain_id"
+        return CompiledAggregates(summary=summary, chains=chains, windows=resolved)
+
+    @staticmethod
+    def _resolve(windows: tuple[str, ...]) -> tuple[tuple[str, int], ...]:
+        resolved = []
+        for window in windows:
+            try:
+                resolved.append((window, int(pd.to_timedelta(window).total_seconds())))
+            except ValueError as exc:
+                raise ValueError(f"invalid window {window}") from exc
+        return tuple(resolved)
+
+    def compute(self, windows: tuple[str, ...]) -> AggregateCollection:
+        compiled = self.compile(windows)
+        summary = self._executor.query_rows(compiled.summary)[0]
+        total = int(summary[0])
+        if total == 0:
+            raise RuntimeError("events table is empty")
+        window_start = _to_datetime(summary[1])
+        window_end = _to_datetime(summary[2])
+        value_quantiles = summary[5]
+        calldata_median = summary[7]
+
+        aggregates = [
+            Aggregate("count", float(total), window_start, window_end),
+            Aggregate("mean_value", float(summary[3]), window_start, window_end),
+            Aggregate("std_value", float(summary[4]), window_start, window_end),
+            Aggregate("p95_value", float(value_quantiles[0]), window_start, window_end),
+            Aggregate("p05_value", float(value_quantiles[1]), window_start, window_end),
+            Aggregate("mean_gas_used", float(summary[6]), window_start, window_end),
+            Aggregate("median_calldata", float(calldata_median[0]), window_start, window_end),
+            Aggregate("high_calldata_ratio", float(summary[8]), window_start, window_end),
+        ]
+        for chain_id, count, mean_value in self._executor.query_rows(compiled.chains):
+            aggregates.append(Aggregate(f"count_chain_{int(chain_id)}", float(count), window_start, window_end))
+            aggregates.append(Aggregate(f"mean_value_chain_{int(chain_id)}", float(mean_value), window_start, window_end))
+
+        for position, (window, _) in enumerate(compiled.windows):
+            count, mean_value, first_event = summary[9 + 3 * position : 12 + 3 * position]
+            if int(count) == 0:
+                continue
+            start = _to_datetime(first_event)
+            aggregates.append(Aggregate(f"count_last_{window}", float(count), start, window_end))
+            aggregates.append(Aggregate(f"mean_value_last_{window}", float(mean_value), start, window_end))
+        return AggregateCollection(aggregates=tuple(aggregates))
+
+
+def _to_datetime(value: object) -> datetime:
+    return pd.Timestamp(value).to_pydatetime()
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import math
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from pipeline_anomaly.domain.models.aggregate import Aggregate, AggregateCollection
+from pipeline_anomaly.domain.models.batch import AnyRecordBatch
+from pipeline_anomaly.infrastructure.aggregation.sketch import QuantileSketch, add_grouped
+from pipeline_anomaly.infrastructure.state.json_file import JsonStateFile
+
+_HIGH_CALLDATA_BYTES = 1024
+_MAX_SECONDS = 2**63 - 1
+
+
+@dataclass(slots=True)
+class _BucketState:
+    """Мёрджируемое состояние одного временного бакета."""
+
+    start: int
+    relative_accuracy: float
+    first_seen: int = _MAX_SECONDS
+    last_seen: int = -_MAX_SECONDS
+    count: int = 0
+    value_sum: float = 0.0
+    value_sumsq: float = 0.0
+    gas_sum: float = 0.0
+    high_calldata: int = 0
+    chains: dict[int, list[float]] = field(default_factory=dict)
+    value_sketch: QuantileSketch = field(init=False)
+    calldata_sketch: QuantileSketch = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.value_sketch = QuantileSketch(self.relative_accuracy)
+        self.calldata_sketch = QuantileSketch(self.relative_accuracy)
+
+    def merge(self, other: "_BucketState") -> None:
+        self.first_seen = min(self.first_seen, other.first_seen)
+        self.last_seen = max(self.last_seen, other.last_seen)
+        self.count += other.count
+        self.value_sum += other.value_sum
+        self.value_sumsq += other.value_sumsq
+        self.gas_sum += other.gas_sum
+        self.high_calldata += other.high_calldata
+        for chain_id, (count, value_sum) in other.chains.items():
+            state = self.chains.setdefault(chain_id, [0, 0.0])
+            state[0] += count
+            state[1] += value_sum
+        self.value_sketch.merge(other.value_sketch)
+        self.calldata_sketch.merge(other.calldata_sketch)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "start": self.start,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "count": self.count,
+            "value_sum": self.value_sum,
+            "value_sumsq": self.value_sumsq,
+            "gas_sum": self.gas_sum,
+            "high_calldata": self.high_calldata,
+            "chains": {str(chain_id): state for chain_id, state in self.chains.items()},
+            "value_sketch": self.value_sketch.to_dict(),
+            "calldata_sketch": self.calldata_sketch.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict[str, Any], relative_accuracy: float) -> "_BucketState":
+        bucket = cls(
+            start=int(payload["start"]),
+            relative_accuracy=relative_accuracy,
+            first_seen=int(payload["first_seen"]),
+            last_seen=int(payload["last_seen"]),
+            count=int(payload["count"]),
+            value_sum=float(payload["value_sum"]),
+            value_sumsq=float(payload["value_sumsq"]),
+            gas_sum=float(payload["gas_sum"]),
+            high_calldata=int(payload["high_calldata"]),
+            chains={int(chain_id): [int(state[0]), float(state[1])] for chain_id, state in payload["chains"].items()},
+        )
+        bucket.value_sketch = QuantileSketch.from_dict(payload["value_sketch"])
+        bucket.calldata_sketch = QuantileSketch.from_dict(payload["calldata_sketch"])
+        return bucket
+
+
+class IncrementalAggregationEngine:
+    """Инкрементальные агрегаты по бакетам времени.
+
+    Каждый вставленный батч раскладывается по бакетам длиной `bucket_seconds`:
+    count/sum/sum-of-squares, разрез по `chain_id` и скетчи квантилей (`QuantileSketch`).
+    `compute` объединяет бакеты за `horizon_seconds` и за каждое окно из `features.windows`
+    вместо повторного чтения сырых событий; граница окна округляется до бакета, квантили
+    приближённые с точностью `relative_accuracy`. Бакеты старше горизонта вытесняются,
+    состояние сохраняется в JSON по `flush()`.
+    """
+
+    def __init__(
+        self,
+        bucket_seconds: int = 60,
+        horizon_seconds: int = 86_400,
+        relative_accuracy: float = 0.01,
+        state_path: Path | str | None = None,
+        time_column: str = "event_time",
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        if bucket_seconds <= 0 or horizon_seconds <= 0:
+            raise ValueError("bucket and horizon must be positive")
+        self._bucket_seconds = bucket_seconds
+        self._horizon_seconds = horizon_seconds
+        self._relative_accuracy = relative_accuracy
+        self._state = JsonStateFile(state_path) if state_path else None
+        self._time_column = time_column
+        self._clock = clock
+        self._buckets: dict[int, _BucketState] = {}
+        self._dirty = False
+        self._load()
+
+    @property
+    def bucket_count(self) -> int:
+        return len(self._buckets)
+
+    def observe(self, batch: AnyRecordBatch) -> None:
+        if not batch.size:
+            return
+        seconds = batch.epoch_seconds(self._time_column)
+        order = np.argsort(seconds, kind="stable")
+        seconds = seconds[order]
+        starts = seconds - seconds % self._bucket_seconds
+        bounds = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+        ends = np.r_[bounds[1:], len(seconds)]
+
+        values = batch.column("value").astype(np.float64, copy=False)[order]
+        gas = batch.column("gas_used").astype(np.float64, copy=False)[order]
+        calldata = batch.column("calldata_size").astype(np.float64, copy=False)[order]
+        chains = batch.column("chain_id").astype(np.int64, copy=False)[order]
+
+        counts = ends - bounds
+        value_sums = np.add.reduceat(values, bounds)
+        value_sumsqs = np.add.reduceat(values * values, bounds)
+        gas_sums = np.add.reduceat(gas, bounds)
+        high_calldata = np.add.reduceat((calldata > _HIGH_CALLDATA_BYTES).astype(np.int64), bounds)
+        firsts = seconds[bounds]
+        lasts = seconds[ends - 1]
+
+        chain_ids, chain_codes = np.unique(chains, return_inverse=True)
+        segment = np.repeat(np.arange(len(bounds)), counts)
+        cells = segment * len(chain_ids) + chain_codes
+        shape = (len(bounds), len(chain_ids))
+        chain_counts = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+        chain_sums = np.bincount(cells, weights=values, minlength=shape[0] * shape[1]).reshape(shape)
+
+        touched: list[_BucketState] = []
+        for position, start in enumerate(bounds):
+            key = int(starts[start])
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = _BucketState(start=key, relative_accuracy=self._relative_accuracy)
+                self._buckets[key] = bucket
+            bucket.first_seen = min(bucket.first_seen, int(firsts[position]))
+            bucket.last_seen = max(bucket.last_seen, int(lasts[position]))
+            bucket.count += int(counts[position])
+            bucket.value_sum += float(value_sums[position])
+            bucket.value_sumsq += float(value_sumsqs[position])
+            bucket.gas_sum += float(gas_sums[position])
+            bucket.high_calldata += int(high_calldata[position])
+            for column in np.flatnonzero(chain_counts[position]):
+                state = bucket.chains.setdefault(int(chain_ids[column]), [0, 0.0])
+                state[0] += int(chain_counts[position, column])
+                state[1] += float(chain_sums[position, column])
+            touched.append(bucket)
+        add_grouped([bucket.value_sketch for bucket in touched], segment, values)
+        add_grouped([bucket.calldata_sketch for bucket in touched], segment, calldata)
+        self._dirty = True
+        self._evict()
+
+    def compute(self, windows: tuple[str, ...]) -> AggregateCollection:
+        self._evict()
+        total = self._merge(self._buckets.values())
+        if total is None:
+            raise RuntimeError("incremental aggregation state is empty")
+        window_start = _to_datetime(total.first_seen)
+        window_end = _to_datetime(total.last_seen)
+
+        aggregates = [
+            Aggregate("count", float(total.count), window_start, window_end),
+            Aggregate("mean_value", total.value_sum / total.count, window_start, window_end),
+            Aggregate("std_value", _sample_std(total), window_start, window_end),
+            Aggregate("p95_value", total.value_sketch.quantile(0.95), window_start, window_end),
+            Aggregate("p05_value", total.value_sketch.quantile(0.05), window_start, window_end),
+            Aggregate("mean_gas_used", total.gas_sum / total.count, window_start, window_end),
+            Aggregate("median_calldata", total.calldata_sketch.quantile(0.5), window_start, window_end),
+            Aggregate("high_calldata_ratio", total.high_calldata / total.count, window_start, window_end),
+        ]
+        for chain_id in sorted(total.chains):
+            count, value_sum = total.chains[chain_id]
+            aggregates.append(Aggregate(f"count_chain_{chain_id}", float(count), window_start, window_end))
+            aggregates.append(Aggregate(f"mean_value_chain_{chain_id}", value_sum / count, window_start, window_end))
+
+        for window in windows:
+            try:
+                delta = pd.to_timedelta(window)
+            except ValueError as exc:
+                raise ValueError(f"invalid window {window}") from exc
+            cutoff = total.last_seen - int(delta.total_seconds())
+            merged = self._merge(
+                bucket for bucket in self._buckets.values() if bucket.start + self._bucket_seconds > cutoff
+            )
+            if merged is None:
+                continue
+            start = _to_datetime(merged.first_seen)
+            aggregates.append(Aggregate(f"count_last_{window}", float(merged.count), start, window_end))
+            aggregates.append(Aggregate(f"mean_value_last_{window}", merged.value_sum / merged.count, start, window_end))
+        return AggregateCollection(aggregates=tuple(aggregates))
+
+    def flush(self) -> None:
+        if self._state is None or not self._dirty:
+            return
+        self._state.save(
+            {
+                "bucket_seconds": self._bucket_seconds,
+                "relative_accuracy": self._relative_accuracy,
+                "buckets": [bucket.to_dict() for bucket in self._buckets.values()],
+            }
+        )
+        self._dirty = False
+
+    def _merge(self, buckets: Iterable[_BucketState]) -> _BucketState | None:
+        total: _BucketState | None = None
+        for bucket in buckets:
+            if total is None:
+                total = _BucketState(start=bucket.start, relative_accuracy=self._relative_accuracy)
+            total.merge(bucket)
+        return total
+
+    def _evict(self) -> None:
+        horizon_start = self._clock() - self._horizon_seconds
+        expired = [key for key in self._buckets if key + self._bucket_seconds <= horizon_start]
+        for key in expired:
+            del self._buckets[key]
+        if expired:
+            self._dirty = True
+
+    def _load(self) -> None:
+        if self._state is None:
+            return
+        payload = self._state.load()
+        if not payload:
+            return
+        if (payload["bucket_seconds"], payload["relative_accuracy"]) != (self._bucket_seconds, self._relative_accuracy):
+            logger.warning("aggregation state {} has different parameters, starting empty", self._state.path)
+            return
+        for raw in payload["buckets"]:
+            bucket = _BucketState.from_dict(raw, self._relative_accuracy)
+            self._buckets[bucket.start] = bucket
+        self._evict()
+
+
+def _sample_std(state: _BucketState) -> float:
+    if state.count < 2:
+        return math.nan
+    variance = (state.value_sumsq - state.value_sum**2 / state.count) / (state.count - 1)
+    return math.sqrt(max(variance, 0.0))
+
+
+def _to_datetime(seconds: int) -> datetime:
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from pipeline_anomaly.domain.services.interfaces import QueryExecutor
+from pipeline_anomaly.infrastructure.aggregation.clickhouse_pushdown import ClickHousePushdownEngine, CompiledAggregates
+from pipeline_anomaly.infrastructure.repositories.clickhouse_repository import ROLLUP_TABLE
+
+
+class ClickHouseRollupEngine(ClickHousePushdownEngine):
+    """Тот же набор метрик, что у `ClickHousePushdownEngine`, но по поминутной rollup-таблице.
+
+    Читаются только состояния `events_rollup_1m` (минуты × сети), поэтому стоимость не
+    растёт с числом сырых событий. Горизонт и границы окон округляются до минуты,
+    квантили берутся слиянием состояний `quantilesTDigest`.
+    """
+
+    def __init__(self, executor: QueryExecutor, table: str = ROLLUP_TABLE, horizon: str = "1 DAY") -> None:
+        super().__init__(executor, table=table, horizon=horizon)
+
+    def compile(self, windows: tuple[str, ...]) -> CompiledAggregates:
+        resolved = self._resolve(windows)
+        source = f"FROM {self._table} WHERE minute >= toStartOfMinute(now() - INTERVAL {self._horizon})"
+        columns = [
+            "sum(events) AS total",
+            "min(first_event) AS first_event",
+            "max(last_event) AS last_event",
+            "sum(value_sum) / total",
+            "sqrt(greatest(sum(value_sumsq) - pow(sum(value_sum), 2) / total, 0) / (total - 1))",
+            "quantilesTDigestMerge(0.95, 0.05)(value_quantiles)",
+            "sum(gas_sum) / total",
+            "quantilesTDigestMerge(0.5)(calldata_quantiles)",
+            "sum(high_calldata) / total",
+        ]
+        for _, seconds in resolved:
+            condition = f"minute >= toStartOfMinute(window_end - INTERVAL {seconds} SECOND)"
+            columns.extend(
+                [
+                    f"sumIf(events, {condition})",
+                    f"sumIf(value_sum, {condition}) / sumIf(events, {condition})",
+                    f"minIf(first_event, {condition})",
+                ]
+            )
+        summary = (
+            f"WITH (SELECT max(last_event) {source}) AS window_end\n"
+            f"SELECT\n    " + ",\n    ".join(columns) + f"\n{source}"
+        )
+        chains = (
+            f"SELECT chain_id, sum(events), sum(value_sum) / sum(events)\n{source}\n"
+            "GROUP BY chain_id\nORDER BY chain_id"
+        )
+        return CompiledAggregates(summary=summary, chains=chains, windows=resolved)
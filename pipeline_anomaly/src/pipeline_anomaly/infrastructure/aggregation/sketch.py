@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import math
+from collections import Counter
+from collections.abc import Sequence
+from typing import Any
+
+import numpy as np
+
+_MIN_COUNT = 1e-6
+"""Корзины, вес которых после затухания упал ниже, выбрасываются из скетча."""
+
+
+def _count(value: Any) -> int | float:
+    """Целые счётчики остаются целыми, дробные (после `scale`) — дробными."""
+
+    number = float(value)
+    return int(number) if number.is_integer() else number
+
+
+class QuantileSketch:
+    """Мёрджируемый скетч квантилей с относительной ошибкой (схема DDSketch).
+
+    Значения раскладываются по логарифмическим корзинам `gamma**i`, поэтому любая
+    квантиль восстанавливается с относительной погрешностью не больше
+    `relative_accuracy`, а два скетча с одинаковой точностью объединяются сложением счётчиков.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.positive: Counter[int] = Counter()
+        self.negative: Counter[int] = Counter()
+        self.zero = 0
+
+    @property
+    def count(self) -> int:
+        return self.zero + sum(self.positive.values()) + sum(self.negative.values())
+
+    def add(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.zero += int((values == 0).sum())
+        self._add_to(self.positive, values[values > 0])
+        self._add_to(self.negative, -values[values < 0])
+
+    def scale(self, factor: float) -> None:
+        """Умножает все счётчики на `factor` (затухание истории); пустые корзины удаляются."""
+
+        if factor == 1.0:
+            return
+        for store in (self.positive, self.negative):
+            for index in list(store):
+                store[index] *= factor
+                if store[index] < _MIN_COUNT:
+                    del store[index]
+        self.zero *= factor
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if not math.isclose(other.relative_accuracy, self.relative_accuracy):
+            raise ValueError("cannot merge sketches with different accuracy")
+        self.positive.update(other.positive)
+        self.negative.update(other.negative)
+        self.zero += other.zero
+
+    def quantile(self, q: float) -> float:
+        total = self.count
+        if total == 0:
+            return math.nan
+        rank = q * (total - 1)
+        seen = 0
+        for index in sorted(self.negative, reverse=True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self._bin_value(index)
+        seen += self.zero
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self._bin_value(index)
+        return self._bin_value(max(self.positive)) if self.positive else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "positive": {str(index): count for index, count in self.positive.items()},
+            "negative": {str(index): count for index, count in self.negative.items()},
+            "zero": self.zero,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict[str, Any]) -> "QuantileSketch":
+        sketch = cls(relative_accuracy=float(payload["relative_accuracy"]))
+        sketch.positive.update({int(index): _count(count) for index, count in payload["positive"].items()})
+        sketch.negative.update({int(index): _count(count) for index, count in payload["negative"].items()})
+        sketch.zero = _count(payload["zero"])
+        return sketch
+
+    def _add_to(self, store: Counter[int], values: np.ndarray) -> None:
+        if not len(values):
+            return
+        indices = np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+        unique, counts = np.unique(indices, return_counts=True)
+        store.update(dict(zip(unique.tolist(), counts.tolist())))
+
+    def _bin_value(self, index: int) -> float:
+        return 2 * self._gamma**index / (self._gamma + 1)
+
+
+def add_grouped(sketches: Sequence[QuantileSketch], groups: np.ndarray, values: np.ndarray) -> None:
+    """Раскладывает значения по скетчам `sketches[groups[i]]` одним проходом numpy."""
+
+    if not sketches:
+        return
+    log_gamma = sketches[0]._log_gamma
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    groups, values = groups[valid], values[valid]
+    zeros = np.bincount(groups[values == 0], minlength=len(sketches))
+    for position in np.flatnonzero(zeros):
+        sketches[position].zero += int(zeros[position])
+    for attribute, mask in (("positive", values > 0), ("negative", values < 0)):
+        if not mask.any():
+            continue
+        indices = np.ceil(np.log(np.abs(values[mask])) / log_gamma).astype(np.int64)
+        lowest = indices.min()
+        span = int(indices.max() - lowest) + 1
+        cells, counts = np.unique(groups[mask].astype(np.int64) * span + (indices - lowest), return_counts=True)
+        cell_groups = cells // span
+        cell_indices = (cells % span + lowest).tolist()
+        counts = counts.tolist()
+        bounds = np.flatnonzero(np.r_[True, cell_groups[1:] != cell_groups[:-1], True])
+        for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            store: Counter[int] = getattr(sketches[int(cell_groups[start])], attribute)
+            store.update(dict(zip(cell_indices[start:stop], counts[start:stop])))
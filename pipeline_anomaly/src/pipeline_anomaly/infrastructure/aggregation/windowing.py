@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from pipeline_anomaly.domain.models.aggregate import Aggregate
+
+_SERIES_COLUMNS = ["window", "chain_id", "window_start", "window_end", "count", "value_sum", "mean_value"]
+
+
+@dataclass(frozen=True, slots=True)
+class WindowSpec:
+    """Окно временного ряда: `5m` — tumbling, `1h/5m` — sliding длиной 1h с шагом 5m."""
+
+    name: str
+    size_ns: int
+    step_ns: int
+
+    @classmethod
+    def parse(cls, spec: str) -> "WindowSpec":
+        size, _, step = spec.partition("/")
+        try:
+            size_ns = pd.to_timedelta(size).value
+            step_ns = pd.to_timedelta(step).value if step else size_ns
+        except ValueError as exc:
+            raise ValueError(f"invalid window {spec}") from exc
+        if size_ns <= 0 or step_ns <= 0:
+            raise ValueError(f"invalid window {spec}")
+        return cls(name=spec, size_ns=size_ns, step_ns=step_ns)
+
+
+class MultiWindowEngine:
+    """Временные ряды оконных метрик за один проход по упорядоченным меткам времени.
+
+    По каждому разрезу (все сети и каждая `chain_id` отдельно) один раз строятся
+    префиксные суммы `value`; границы всех окон всех `specs` находятся через
+    `searchsorted`, поэтому count/sum/mean любого окна — разность двух префиксов.
+    Концы окон выровнены по шагу от эпохи, окно — полуинтервал `[end - size, end)`;
+    последнее окно закрывается сразу после последнего события.
+    """
+
+    def __init__(self, specs: Sequence[str], time_column: str = "event_time", value_column: str = "value") -> None:
+        self._specs = [WindowSpec.parse(spec) for spec in specs]
+        self._time_column = time_column
+        self._value_column = value_column
+
+    def series(self, dataframe: pd.DataFrame) -> pd.DataFrame:
+        if dataframe.empty or not self._specs:
+            return pd.DataFrame(columns=_SERIES_COLUMNS)
+        index = pd.DatetimeIndex(dataframe[self._time_column])
+        if index.tz is not None:
+            index = index.tz_convert(None)
+        times = index.as_unit("ns").asi8
+        if not np.all(times[1:] >= times[:-1]):
+            raise ValueError("windowing requires frame sorted by event time")
+        values = dataframe[self._value_column].to_numpy(dtype=np.float64)
+        chains = dataframe["chain_id"].to_numpy()
+
+        frames = [self._partition_series(times, values, chain_id=None)]
+        order = np.argsort(chains, kind="stable")
+        chain_ids, starts = np.unique(chains[order], return_index=True)
+        bounds = np.r_[starts, len(order)]
+        for position, chain_id in enumerate(chain_ids):
+            rows = order[bounds[position] : bounds[position + 1]]
+            frames.append(self._partition_series(times[rows], values[rows], chain_id=int(chain_id)))
+        return pd.concat(frames, ignore_index=True)
+
+    def aggregates(self, dataframe: pd.DataFrame) -> list[Aggregate]:
+        series = self.series(dataframe)
+        metrics: list[Aggregate] = []
+        for row in series[series["count"] > 0].to_dict("records"):
+            extra = None if row["chain_id"] is None else {"chain_id": float(row["chain_id"])}
+            start, end = row["window_start"].to_pydatetime(), row["window_end"].to_pydatetime()
+            window = row["window"]
+            metrics.append(Aggregate(f"series_count_{window}", float(row["count"]), start, end, extra))
+            metrics.append(Aggregate(f"series_mean_value_{window}", float(row["mean_value"]), start, end, extra))
+        return metrics
+
+    def _partition_series(self, times: np.ndarray, values: np.ndarray, chain_id: int | None) -> pd.DataFrame:
+        prefix = np.concatenate(([0.0], np.cumsum(values)))
+        frames = []
+        for spec in self._specs:
+            first_end = (times[0] // spec.step_ns + 1) * spec.step_ns
+            last_end = (times[-1] // spec.step_ns + 1) * spec.step_ns
+            ends = np.arange(first_end, last_end + 1, spec.step_ns, dtype=np.int64)
+            starts = ends - spec.size_ns
+            lo = np.searchsorted(times, starts, side="left")
+            hi = np.searchsorted(times, ends, side="left")
+            counts = hi - lo
+            sums = prefix[hi] - prefix[lo]
+            means = np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+            frames.append(
+                pd.DataFrame(
+                    {
+                        "window": spec.name,
+                        "chain_id": chain_id,
+                        "window_start": pd.to_datetime(starts),
+                        "window_end": pd.to_datetime(ends),
+                        "count": counts,
+                        "value_sum": sums,
+                        "mean_value": means,
+                    }
+                )
+            )
+        return pd.concat(frames, ignore_index=True)
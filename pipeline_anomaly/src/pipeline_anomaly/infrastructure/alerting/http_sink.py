@@ -34,6 +34,7 @@ def _serialize_report(report: AnomalyReport) -> dict[str, Any]:
         "anomalies": [
             {
                 "detector": anomaly.detector,
+                "partition": anomaly.partition,
                 "score": anomaly.score,
                 "severity": anomaly.severity,
                 "description": anomaly.description,
@@ -34,5 +34,8 @@ class SlackAlertSink(AlertSink):
             f"window: {report.window_start.isoformat()} — {report.window_end.isoformat()}",
         ]
         for anomaly in report.anomalies:
-            lines.append(f"- `{anomaly.detector}` score={anomaly.score:.3f} severity={anomaly.severity:.3f}")
+            partition = f" [{anomaly.partition}]" if anomaly.partition else ""
+            lines.append(
+                f"- `{anomaly.detector}`{partition} score={anomaly.score:.3f} severity={anomaly.severity:.3f}"
+            )
         return "\n".join(lines)
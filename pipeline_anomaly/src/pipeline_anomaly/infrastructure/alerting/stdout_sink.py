@@ -16,6 +16,7 @@ class StdOutAlertSink:
             "anomalies": [
                 {
                     "detector": anomaly.detector,
+                    "partition": anomaly.partition,
                     "score": anomaly.score,
                     "severity": anomaly.severity,
                     "description": anomaly.description,
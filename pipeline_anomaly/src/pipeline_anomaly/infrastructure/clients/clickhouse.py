@@ -1,29 +1,70 @@
 from __future__ import annotations
 
 from contextlib import contextmanager
+from typing import Iterator, Protocol
 
 from clickhouse_connect import get_client
 from clickhouse_connect.driver import Client
 
+from pipeline_anomaly.infrastructure.clients.pool import ClickHousePool
+
+
+class _ConnectionSettings(Protocol):
+    host: str
+    port: int
+    username: str
+    password: str
+    database: str
+
 
 class ClickHouseFactory:
-    def __init__(self, host: str, port: int, username: str, password: str, database: str) -> None:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        database: str,
+        pool_size: int = 4,
+        idle_timeout: float = 300.0,
+        health_check_interval: float = 30.0,
+    ) -> None:
         self._host = host
         self._port = port
         self._username = username
         self._password = password
         self._database = database
+        self._pool = ClickHousePool(
+            self._create_client,
+            size=pool_size,
+            idle_timeout=idle_timeout,
+            health_check_interval=health_check_interval,
+        )
+
+    @classmethod
+    def from_config(cls, config: _ConnectionSettings, **pool_options: float) -> "ClickHouseFactory":
+        return cls(
+            host=config.host,
+            port=config.port,
+            username=config.username,
+            password=config.password,
+            database=config.database,
+            **pool_options,
+        )
 
     @contextmanager
-    def connect(self) -> Client:
-        client = get_client(
+    def connect(self) -> Iterator[Client]:
+        with self._pool.connection() as client:
+            yield client
+
+    def close(self) -> None:
+        self._pool.close()
+
+    def _create_client(self) -> Client:
+        return get_client(
             host=self._host,
             port=self._port,
             username=self._username,
             password=self._password,
             database=self._database,
         )
-        try:
-            yield client
-        finally:
-            client.close()
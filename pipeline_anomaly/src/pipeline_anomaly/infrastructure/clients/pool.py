@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator
+
+from clickhouse_connect.driver import Client
+from clickhouse_connect.driver.exceptions import OperationalError
+from loguru import logger
+
+
+@dataclass(slots=True)
+class _PooledClient:
+    client: Client
+    last_used: float
+    last_checked: float
+
+
+class ClickHousePool:
+    """Потокобезопасный пул клиентов clickhouse_connect.
+
+    Не зависит от конфигов конкретного проекта: достаточно передать фабрику клиентов,
+    поэтому пул подходит и для репозиториев `feature_store_ml` / `data_quality_monitor`.
+    Клиент, простоявший дольше `idle_timeout`, закрывается; перед выдачей клиент,
+    не проверявшийся дольше `health_check_interval`, пингуется. Клиенты, на которых
+    упал сетевой запрос (`OperationalError`), в пул не возвращаются.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Client],
+        size: int = 4,
+        idle_timeout: float = 300.0,
+        health_check_interval: float = 30.0,
+        checkout_timeout: float = 30.0,
+    ) -> None:
+        if size < 1:
+            raise ValueError("clickhouse pool size must be positive")
+        self._client_factory = client_factory
+        self._size = size
+        self._idle_timeout = idle_timeout
+        self._health_check_interval = health_check_interval
+        self._checkout_timeout = checkout_timeout
+        self._idle: deque[_PooledClient] = deque()
+        self._created = 0
+        self._closed = False
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def connection(self) -> Iterator[Client]:
+        pooled = self._checkout()
+        try:
+            yield pooled.client
+        except OperationalError:
+            self._discard(pooled)
+            raise
+        except BaseException:
+            self._checkin(pooled)
+            raise
+        else:
+            self._checkin(pooled)
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._created -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            _close_quietly(pooled.client)
+
+    def _checkout(self) -> _PooledClient:
+        deadline = time.monotonic() + self._checkout_timeout
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("clickhouse pool is closed")
+                    if self._idle:
+                        pooled = self._idle.pop()
+                        break
+                    if self._created < self._size:
+                        self._created += 1
+                        pooled = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._condition.wait(timeout=remaining):
+                        raise TimeoutError(f"no clickhouse connection available within {self._checkout_timeout}s")
+            if pooled is None:
+                return self._create()
+            if self._is_usable(pooled):
+                return pooled
+            self._discard(pooled)
+
+    def _create(self) -> _PooledClient:
+        try:
+            client = self._client_factory()
+        except BaseException:
+            with self._condition:
+                self._created -= 1
+                self._condition.notify()
+            raise
+        now = time.monotonic()
+        return _PooledClient(client=client, last_used=now, last_checked=now)
+
+    def _is_usable(self, pooled: _PooledClient) -> bool:
+        now = time.monotonic()
+        if now - pooled.last_used > self._idle_timeout:
+            return False
+        if now - pooled.last_checked > self._health_check_interval:
+            try:
+                alive = pooled.client.ping()
+            except Exception:  # noqa: BLE001 - any ping failure means the client is unusable
+                alive = False
+            if not alive:
+                logger.warning("clickhouse pool: health check failed, reconnecting")
+                return False
+            pooled.last_checked = now
+        return True
+
+    def _checkin(self, pooled: _PooledClient) -> None:
+        now = time.monotonic()
+        pooled.last_used = now
+        expired: list[_PooledClient] = []
+        with self._condition:
+            if self._closed:
+                self._created -= 1
+                expired.append(pooled)
+            else:
+                self._idle.append(pooled)
+                while self._idle and now - self._idle[0].last_used > self._idle_timeout:
+                    expired.append(self._idle.popleft())
+                    self._created -= 1
+            self._condition.notify()
+        for stale in expired:
+            _close_quietly(stale.client)
+
+    def _discard(self, pooled: _PooledClient) -> None:
+        with self._condition:
+            self._created -= 1
+            self._condition.notify()
+        _close_quietly(pooled.client)
+
+
+def _close_quietly(client: Client) -> None:
+    try:
+        client.close()
+    except Exception:  # noqa: BLE001 - closing a broken client must not mask the original error
+        logger.debug("clickhouse pool: failed to close client")
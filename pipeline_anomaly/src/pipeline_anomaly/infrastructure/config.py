@@ -1,28 +1,61 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any
 
 import yaml
 
 from pipeline_anomaly.infrastructure.generators.synthetic_generator import SyntheticDatasetConfig
 
 
+@dataclass(slots=True)
+class IncrementalAggregationConfig:
+    state_path: str | None = None
+    bucket: str = "1min"
+    horizon: str = "1d"
+    relative_accuracy: float = 0.01
+
+
 @dataclass(slots=True)
 class FeatureConfig:
     windows: tuple[str, ...]
+    series: tuple[str, ...] = ()
+    engine: str = "pandas"
+    incremental: IncrementalAggregationConfig = field(default_factory=IncrementalAggregationConfig)
+
+
+@dataclass(slots=True)
+class DedupIndexConfig:
+    path: str | None = None
+    partition: str = "1h"
+    ttl: str = "6h"
+    expected_items_per_partition: int = 1_000_000
+    false_positive_rate: float = 0.001
 
 
 @dataclass(slots=True)
 class QualityConfig:
     dedup_keys: tuple[str, ...]
     required_columns: tuple[str, ...]
+    dedup_index: DedupIndexConfig | None = None
+
+
+@dataclass(slots=True)
+class IngestionConfig:
+    max_in_flight_batches: int = 2
+    insert_workers: int = 1
 
 
 @dataclass(slots=True)
 class KafkaSourceConfig:
     path: str
     batch_size: int
+    reader: str = "rows"
+    block_size: int = 8 * 1024 * 1024
+    mmap: bool = False
+    checkpoint_path: str | None = None
+    batch_format: str = "pandas"
 
 
 @dataclass(slots=True)
@@ -37,6 +70,7 @@ class SourceConfig:
     type: str
     kafka: KafkaSourceConfig | None
     web3: Web3SourceConfig | None
+    options: dict[str, Any] = field(default_factory=dict)
 
 
 @dataclass(slots=True)
@@ -46,18 +80,23 @@ class ClickHouseConfig:
     username: str
     password: str
     database: str
+    pool_size: int = 4
+    pool_idle_timeout: float = 300.0
+    pool_health_check_interval: float = 30.0
 
 
 @dataclass(slots=True)
 class IsolationForestConfig:
-    contamination: float
-    random_state: int
+    contamination: float = 0.001
+    random_state: int = 42
 
 
 @dataclass(slots=True)
 class DBSCANConfig:
-    eps: float
-    min_samples: int
+    eps: float = 0.2
+    min_samples: int = 15
+    sample_size: int = 0
+    chunk_size: int = 200_000
 
 
 @dataclass(slots=True)
@@ -65,6 +104,47 @@ class HDBSCANConfig:
     enabled: bool
     min_cluster_size: int
     min_samples: int
+    sample_size: int = 0
+    chunk_size: int = 200_000
+
+
+@dataclass(slots=True)
+class DetectionExecutionConfig:
+    mode: str = "sequential"
+    workers: int = 0
+    timeout_seconds: float = 300.0
+    timeouts: dict[str, float] = field(default_factory=dict)
+    partition_by: str | None = None
+    min_partition_rows: int = 1_000
+    start_method: str | None = None
+
+
+@dataclass(slots=True)
+class StreamingDetectionConfig:
+    enabled: bool = False
+    zscore_threshold: float = 4.0
+    iqr_multiplier: float = 3.0
+    min_history: int = 1_000
+    alert_threshold: float = 0.05
+    event_threshold: float | None = 2.0
+    half_life_rows: int | None = None
+    state_path: str | None = None
+
+
+@dataclass(slots=True)
+class CascadeConfig:
+    enabled: bool = False
+    triggers: dict[str, float] = field(default_factory=lambda: {"zscore": 0.01, "iqr": 0.02})
+    safety_every_runs: int = 24
+    state_path: str | None = None
+
+
+@dataclass(slots=True)
+class ModelCacheConfig:
+    path: str
+    retrain_every_runs: int = 24
+    max_age: str = "1d"
+    drift_threshold: float = 0.5
 
 
 @dataclass(slots=True)
@@ -73,6 +153,13 @@ class AnomalyDetectionConfig:
     isolation_forest: IsolationForestConfig
     dbscan: DBSCANConfig
     hdbscan: HDBSCANConfig | None
+    detectors: tuple[str, ...] = ("zscore", "iqr", "isolation_forest", "dbscan")
+    detector_options: dict[str, dict[str, Any]] = field(default_factory=dict)
+    execution: DetectionExecutionConfig = field(default_factory=DetectionExecutionConfig)
+    streaming: StreamingDetectionConfig = field(default_factory=StreamingDetectionConfig)
+    model_cache: ModelCacheConfig | None = None
+    top_k_events: int = 100
+    cascade: CascadeConfig = field(default_factory=CascadeConfig)
 
 
 @dataclass(slots=True)
@@ -82,6 +169,31 @@ class AlertingConfig:
     sink: str
     webhook_url: str | None = None
     channel: str | None = None
+    options: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class WatermarkConfig:
+    enabled: bool = False
+    path: str = ".state/watermarks.json"
+    pipeline: str = "pipeline_anomaly"
+    overlap: str = "1h"
+
+
+@dataclass(slots=True)
+class MetricsConfig:
+    enabled: bool = False
+    port: int = 0
+    pushgateway_url: str | None = None
+    job: str = "pipeline_anomaly"
+
+
+@dataclass(slots=True)
+class DaemonConfig:
+    interval: str = "1m"
+    max_rows: int = 100_000
+    poll_interval: str = "5s"
+    model_cache_path: str = ".state/daemon_models"
 
 
 @dataclass(slots=True)
@@ -93,32 +205,60 @@ class PipelineConfig:
     quality: QualityConfig
     anomaly_detection: AnomalyDetectionConfig
     alerting: AlertingConfig
+    ingestion: IngestionConfig = field(default_factory=IngestionConfig)
+    watermark: WatermarkConfig = field(default_factory=WatermarkConfig)
+    daemon: DaemonConfig = field(default_factory=DaemonConfig)
+    metrics: MetricsConfig = field(default_factory=MetricsConfig)
 
     @classmethod
     def load(cls, path: Path) -> "PipelineConfig":
         with path.open("r", encoding="utf-8") as file:
             raw = yaml.safe_load(file)
         source_raw = raw.get("source", {})
+        quality_raw = raw.get("quality", {})
+        features_raw = raw.get("features", {})
         return cls(
             clickhouse=ClickHouseConfig(**raw["clickhouse"]),
             source=SourceConfig(
                 type=source_raw.get("type", "synthetic"),
                 kafka=KafkaSourceConfig(**source_raw["kafka"]) if source_raw.get("kafka") else None,
                 web3=Web3SourceConfig(**source_raw["web3"]) if source_raw.get("web3") else None,
+                options=source_raw.get("options", {}),
             ),
             dataset=SyntheticDatasetConfig(**raw["dataset"]),
-            features=FeatureConfig(windows=tuple(raw.get("features", {}).get("windows", ()))),
+            features=FeatureConfig(
+                windows=tuple(features_raw.get("windows", ())),
+                series=tuple(features_raw.get("series", ())),
+                engine=features_raw.get("engine", "pandas"),
+                incremental=IncrementalAggregationConfig(**features_raw.get("incremental", {})),
+            ),
             quality=QualityConfig(
-                dedup_keys=tuple(raw.get("quality", {}).get("dedup_keys", ())),
-                required_columns=tuple(raw.get("quality", {}).get("required_columns", ())),
+                dedup_keys=tuple(quality_raw.get("dedup_keys", ())),
+                required_columns=tuple(quality_raw.get("required_columns", ())),
+                dedup_index=DedupIndexConfig(**quality_raw["dedup_index"]) if quality_raw.get("dedup_index") else None,
             ),
             anomaly_detection=AnomalyDetectionConfig(
                 zscore_threshold=float(raw["anomaly_detection"]["zscore_threshold"]),
-                isolation_forest=IsolationForestConfig(**raw["anomaly_detection"]["isolation_forest"]),
-                dbscan=DBSCANConfig(**raw["anomaly_detection"]["dbscan"]),
+                isolation_forest=IsolationForestConfig(**raw["anomaly_detection"].get("isolation_forest", {})),
+                dbscan=DBSCANConfig(**raw["anomaly_detection"].get("dbscan", {})),
                 hdbscan=HDBSCANConfig(**raw["anomaly_detection"]["hdbscan"])
                 if raw["anomaly_detection"].get("hdbscan")
                 else None,
+                execution=DetectionExecutionConfig(**raw["anomaly_detection"].get("execution", {})),
+                streaming=StreamingDetectionConfig(**raw["anomaly_detection"].get("streaming", {})),
+                model_cache=ModelCacheConfig(**raw["anomaly_detection"]["model_cache"])
+                if raw["anomaly_detection"].get("model_cache")
+                else None,
+                top_k_events=int(raw["anomaly_detection"].get("top_k_events", 100)),
+                cascade=CascadeConfig(**raw["anomaly_detection"].get("cascade", {})),
+                detectors=tuple(
+                    raw["anomaly_detection"].get("detectors", ("zscore", "iqr", "isolation_forest", "dbscan"))
+                ),
+                detector_options=raw["anomaly_detection"].get("detector_options", {}),
             ),
             alerting=AlertingConfig(**raw["alerting"]),
+            ingestion=IngestionConfig(**raw.get("ingestion", {})),
+            watermark=WatermarkConfig(**raw.get("watermark", {})),
+            daemon=DaemonConfig(**raw.get("daemon", {})),
+            metrics=MetricsConfig(**raw.get("metrics", {})),
         )
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+_LOW_BITS = np.uint64(0xFFFFFFFF)
+_HIGH_SHIFT = np.uint64(32)
+
+
+class BloomFilter:
+    """Bloom-фильтр поверх numpy: `k` позиций из одного 64-битного хеша (double hashing)."""
+
+    def __init__(self, bit_count: int, hash_count: int, bits: np.ndarray | None = None) -> None:
+        self.bit_count = bit_count
+        self.hash_count = hash_count
+        self.bits = bits if bits is not None else np.zeros((bit_count + 7) // 8, dtype=np.uint8)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        positions = self._positions(hashes)
+        hits = (self.bits[positions >> 3] >> (positions & 7).astype(np.uint8)) & 1
+        return hits.all(axis=1)
+
+    def add(self, hashes: np.ndarray) -> None:
+        positions = self._positions(hashes).ravel()
+        np.bitwise_or.at(self.bits, positions >> 3, (1 << (positions & 7)).astype(np.uint8))
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        hashes = hashes.astype(np.uint64, copy=False)
+        low = hashes & _LOW_BITS
+        high = (hashes >> _HIGH_SHIFT) | np.uint64(1)
+        steps = np.arange(self.hash_count, dtype=np.uint64)
+        return ((low[:, None] + steps[None, :] * high[:, None]) % np.uint64(self.bit_count)).astype(np.int64)
+
+
+def bloom_parameters(expected_items: int, false_positive_rate: float) -> tuple[int, int]:
+    if expected_items <= 0:
+        raise ValueError("expected_items must be positive")
+    if not 0 < false_positive_rate < 1:
+        raise ValueError("false_positive_rate must be in (0, 1)")
+    bit_count = math.ceil(-expected_items * math.log(false_positive_rate) / math.log(2) ** 2)
+    hash_count = max(1, round(bit_count / expected_items * math.log(2)))
+    return bit_count, hash_count
+
+
+class TimePartitionedDedupIndex:
+    """Индекс уже загруженных ключей дедупликации между батчами и запусками.
+
+    Ключи раскладываются по партициям `event_time` длиной `partition_seconds`, на каждую
+    партицию — свой Bloom-фильтр фиксированного размера. Партиции старше `ttl_seconds`
+    относительно самой свежей вытесняются, поэтому память ограничена
+    `ttl / partition` фильтрами независимо от истории. Ключ проверяется по всем живым
+    партициям (повтор может прийти с другим `event_time`), и ложные срабатывания фильтров
+    складываются, поэтому каждый фильтр рассчитан на `false_positive_rate / (ttl / partition)`:
+    уникальная строка отбрасывается как дубль с вероятностью не больше `false_positive_rate` —
+    это плата за ограниченную память. Состояние сохраняется в `.npz` по `flush()`.
+    """
+
+    def __init__(
+        self,
+        partition_seconds: int,
+        ttl_seconds: int,
+        expected_items_per_partition: int,
+        false_positive_rate: float,
+        path: Path | str | None = None,
+    ) -> None:
+        if partition_seconds <= 0 or ttl_seconds <= 0:
+            raise ValueError("partition and ttl must be positive")
+        self._partition_seconds = partition_seconds
+        self._ttl_partitions = max(1, math.ceil(ttl_seconds / partition_seconds))
+        self._bit_count, self._hash_count = bloom_parameters(
+            expected_items_per_partition, false_positive_rate / self._ttl_partitions
+        )
+        self._path = Path(path) if path else None
+        self._partitions: dict[int, BloomFilter] = {}
+        self._dirty = False
+        self._load()
+
+    @property
+    def partitions(self) -> tuple[int, ...]:
+        return tuple(sorted(self._partitions))
+
+    def seen_and_add(self, hashes: np.ndarray, event_seconds: np.ndarray) -> np.ndarray:
+        """Возвращает маску ключей, встречавшихся раньше, и добавляет новые ключи в индекс."""
+
+        seen = np.zeros(len(hashes), dtype=bool)
+        if not len(hashes):
+            return seen
+        for bloom in self._partitions.values():
+            seen |= bloom.contains(hashes)
+
+        fresh = ~seen
+        buckets = event_seconds[fresh] // self._partition_seconds
+        fresh_hashes = hashes[fresh]
+        for bucket in np.unique(buckets):
+            bloom = self._partitions.get(int(bucket))
+            if bloom is None:
+                bloom = BloomFilter(self._bit_count, self._hash_count)
+                self._partitions[int(bucket)] = bloom
+            bloom.add(fresh_hashes[buckets == bucket])
+        self._dirty = True
+        self._evict()
+        return seen
+
+    def flush(self) -> None:
+        if self._path is None or not self._dirty:
+            return
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        buckets = np.array(sorted(self._partitions), dtype=np.int64)
+        bits = (
+            np.stack([self._partitions[int(bucket)].bits for bucket in buckets])
+            if len(buckets)
+            else np.empty((0, (self._bit_count + 7) // 8), dtype=np.uint8)
+        )
+        tmp_path = self._path.with_name(f".{self._path.name}.tmp")
+        with tmp_path.open("wb") as file:
+            np.savez(
+                file,
+                buckets=buckets,
+                bits=bits,
+                params=np.array([self._partition_seconds, self._bit_count, self._hash_count], dtype=np.int64),
+            )
+        os.replace(tmp_path, self._path)
+        self._dirty = False
+
+    def _evict(self) -> None:
+        newest = max(self._partitions)
+        for bucket in [bucket for bucket in self._partitions if bucket <= newest - self._ttl_partitions]:
+            del self._partitions[bucket]
+
+    def _load(self) -> None:
+        if self._path is None or not self._path.exists():
+            return
+        with np.load(self._path) as state:
+            params = tuple(int(value) for value in state["params"])
+            if params != (self._partition_seconds, self._bit_count, self._hash_count):
+                logger.warning("quality: dedup index {} has different parameters, starting empty", self._path)
+                return
+            for bucket, bits in zip(state["buckets"], state["bits"]):
+                self._partitions[int(bucket)] = BloomFilter(self._bit_count, self._hash_count, bits=bits.copy())
+        if self._partitions:
+            self._evict()
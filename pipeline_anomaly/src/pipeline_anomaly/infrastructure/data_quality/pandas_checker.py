@@ -1,39 +1,141 @@
 from __future__ import annotations
 
 from collections.abc import Sequence
+from dataclasses import replace
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from loguru import logger
 
-from pipeline_anomaly.domain.models.batch import RecordBatch
+from pipeline_anomaly.domain.models.batch import AnyRecordBatch, ArrowRecordBatch
 from pipeline_anomaly.domain.services.interfaces import DataQualityChecker
+from pipeline_anomaly.infrastructure.data_quality.dedup_index import TimePartitionedDedupIndex
 
 
 class PandasDataQualityChecker(DataQualityChecker):
-    """Простые проверки качества: заполненность и дедупликация по ключу."""
+    """Простые проверки качества: заполненность и дедупликация по ключу.
 
-    def __init__(self, dedup_keys: Sequence[str], required_columns: Sequence[str]) -> None:
+    Проверки собирают одну маску строк и применяют её одним фильтром, без копии всего батча.
+    С `dedup_index` дубли отсекаются и между батчами/запусками: ключи, уже попавшие в индекс,
+    отбрасываются, новые — добавляются. Состояние индекса сохраняется в `flush()`.
+    Батч, целиком загруженный раньше (повтор источника), возвращается пустым, а не считается ошибкой.
+    """
+
+    def __init__(
+        self,
+        dedup_keys: Sequence[str],
+        required_columns: Sequence[str],
+        dedup_index: TimePartitionedDedupIndex | None = None,
+        time_column: str = "event_time",
+    ) -> None:
         self._dedup_keys = list(dedup_keys)
         self._required_columns = list(required_columns)
+        self._dedup_index = dedup_index
+        self._time_column = time_column
+
+    def validate(self, batch: AnyRecordBatch) -> AnyRecordBatch:
+        if isinstance(batch, ArrowRecordBatch):
+            return self._validate_arrow(batch)
+        dataframe = batch.dataframe
+
+        keep = np.ones(len(dataframe), dtype=bool)
+        if self._required_columns:
+            keep &= dataframe[self._required_columns].notna().all(axis=1).to_numpy()
+            self._report_missing(keep)
+
+        replayed = 0
+        if self._dedup_keys:
+            kept_rows = np.flatnonzero(keep)
+            keys = dataframe[self._key_columns(dataframe.columns)].iloc[kept_rows]
+            replayed = self._drop_duplicates(keep, kept_rows, keys)
+
+        if not keep.any() and not replayed:
+            raise ValueError("_quality_checker removed all rows from batch")
+        if keep.all():
+            return batch
+        return replace(batch, dataframe=dataframe[keep])
+
+    def flush(self) -> None:
+        if self._dedup_index is not None:
+            self._dedup_index.flush()
 
-    def validate(self, batch: RecordBatch) -> RecordBatch:
-        dataframe = batch.dataframe.copy()
+    def _validate_arrow(self, batch: ArrowRecordBatch) -> ArrowRecordBatch:
+        table = batch.table
+        keep = np.ones(table.num_rows, dtype=bool)
 
         if self._required_columns:
-            before = len(dataframe)
-            dataframe = dataframe.dropna(subset=self._required_columns)
-            removed = before - len(dataframe)
-            if removed:
-                logger.warning("quality: dropped {} rows with missing values", removed)
+            for column in self._required_columns:
+                keep &= pc.is_valid(table.column(column)).to_numpy()
+            self._report_missing(keep)
 
+        replayed = 0
         if self._dedup_keys:
-            before = len(dataframe)
-            dataframe = dataframe.drop_duplicates(subset=self._dedup_keys, keep="first")
-            removed = before - len(dataframe)
-            if removed:
-                logger.warning("quality: deduplicated {} rows using {}", removed, self._dedup_keys)
+            kept_rows = np.flatnonzero(keep)
+            keys = table.select(self._key_columns(table.column_names)).take(pa.array(kept_rows)).to_pandas()
+            replayed = self._drop_duplicates(keep, kept_rows, keys)
 
-        if dataframe.empty:
+        if not keep.any() and not replayed:
             raise ValueError("_quality_checker removed all rows from batch")
+        if keep.all():
+            return batch
+        return replace(batch, table=table.filter(pa.array(keep)))
+
+    def _key_columns(self, columns: Sequence[str]) -> list[str]:
+        if self._dedup_index is not None and self._time_column in columns:
+            return [*self._dedup_keys, self._time_column]
+        return self._dedup_keys
+
+    @staticmethod
+    def _report_missing(keep: np.ndarray) -> None:
+        removed = int((~keep).sum())
+        if removed:
+            logger.warning("quality: dropped {} rows with missing values", removed)
+
+    def _drop_duplicates(self, keep: np.ndarray, kept_rows: np.ndarray, keys: pd.DataFrame) -> int:
+        """Снимает дубли из `keep`; возвращает число строк, отброшенных индексом как уже загруженные."""
+
+        duplicated = keys.duplicated(subset=self._dedup_keys, keep="first").to_numpy()
+        keep[kept_rows[duplicated]] = False
+        removed = int(duplicated.sum())
+        if removed:
+            logger.warning("quality: deduplicated {} rows using {}", removed, self._dedup_keys)
+
+        if self._dedup_index is None:
+            return 0
+        unique_rows = kept_rows[~duplicated]
+        unique_keys = keys[~duplicated]
+        seen = self._dedup_index.seen_and_add(self._key_hashes(unique_keys), self._event_seconds(unique_keys))
+        keep[unique_rows[seen]] = False
+        removed = int(seen.sum())
+        if removed:
+            logger.warning("quality: dropped {} rows already loaded in previous batches or runs", removed)
+        return removed
+
+    def _key_hashes(self, keys: pd.DataFrame) -> np.ndarray:
+        """Хеши ключей дедупликации, одинаковые для arrow- и pandas-батчей.
+
+        `hash_pandas_object` зависит от dtype (`int32` и `int64`, единицы `datetime64` дают разные
+        хеши одного значения), а пути батчей приводят ключи к разным dtype, поэтому колонки
+        сначала приводятся к фиксированным типам.
+        """
+        columns = {name: _fixed_dtype(keys[name]) for name in self._dedup_keys}
+        return pd.util.hash_pandas_object(pd.DataFrame(columns, index=keys.index), index=False).to_numpy()
+
+    def _event_seconds(self, keys: pd.DataFrame) -> np.ndarray:
+        if self._time_column not in keys.columns:
+            return np.zeros(len(keys), dtype=np.int64)
+        return pd.DatetimeIndex(keys[self._time_column]).as_unit("s").asi8
+
 
-        return RecordBatch(dataframe=dataframe)
+def _fixed_dtype(column: pd.Series) -> pd.Series:
+    if pd.api.types.is_bool_dtype(column) or pd.api.types.is_integer_dtype(column):
+        if column.hasnans:
+            return pd.Series(column.to_numpy(dtype=np.float64, na_value=np.nan), index=column.index)
+        return column.astype(np.int64)
+    if pd.api.types.is_float_dtype(column):
+        return column.astype(np.float64)
+    if pd.api.types.is_datetime64_any_dtype(column):
+        return pd.Series(pd.DatetimeIndex(column).as_unit("ns").asi8, index=column.index)
+    return column.astype(object, copy=False)
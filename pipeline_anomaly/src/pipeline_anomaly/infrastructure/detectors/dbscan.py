@@ -1,17 +1,47 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 from sklearn.cluster import DBSCAN
 
+from pipeline_anomaly.domain.models.feature_matrix import FeatureMatrix
 from pipeline_anomaly.infrastructure.detectors.base import PandasDetector
+from pipeline_anomaly.infrastructure.detectors.sampling import (
+    DensitySample,
+    label_by_nearest_core,
+    scaled_min_samples,
+    stratified_sample,
+)
 
 
 class DBSCANDetector(PandasDetector):
-    def __init__(self, eps: float, min_samples: int) -> None:
+    """DBSCAN по стандартизованным `value`/`attribute` (`eps` — в единицах std).
+
+    С `sample` окна больше бюджета обучаются на стратифицированной (по `chain_id`)
+    выборке; остальные строки размечаются как в DBSCAN для граничных точек: строка
+    не выброс, если в радиусе `eps` есть ядровая точка выборки.
+    """
+
+    columns = ("value", "attribute")
+
+    def __init__(self, eps: float, min_samples: int, sample: DensitySample | None = None) -> None:
         super().__init__(name="dbscan")
+        self._eps = eps
+        self._min_samples = min_samples
+        self._sample = sample
         self._model = DBSCAN(eps=eps, min_samples=min_samples)
 
-    def fit_predict(self, dataframe: pd.DataFrame) -> pd.Series:
-        features = dataframe[["value", "attribute"]]
-        predictions = self._model.fit_predict(features)
-        return pd.Series((predictions == -1).astype(int))
+    def fit_predict(self, features: FeatureMatrix) -> pd.Series:
+        matrix = features.select(self.columns)
+        if self._sample is None or len(matrix) <= self._sample.size:
+            predictions = self._model.fit_predict(matrix)
+            return pd.Series((predictions == -1).astype(int))
+        return pd.Series(self._fit_predict_sampled(matrix, features.strata))
+
+    def _fit_predict_sampled(self, matrix: np.ndarray, strata: np.ndarray | None) -> np.ndarray:
+        rows = stratified_sample(strata, len(matrix), self._sample.size, self._sample.random_state)
+        model = DBSCAN(eps=self._eps, min_samples=scaled_min_samples(self._min_samples, len(rows), len(matrix)))
+        model.fit(matrix[rows])
+        core_points = matrix[rows][model.core_sample_indices_]
+        radius = np.full(len(core_points), self._eps)
+        return label_by_nearest_core(matrix, core_points, radius, self._sample.chunk_size)
@@ -1,19 +1,54 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 import hdbscan
+from sklearn.neighbors import KDTree
 
+from pipeline_anomaly.domain.models.feature_matrix import FeatureMatrix
 from pipeline_anomaly.infrastructure.detectors.base import PandasDetector
+from pipeline_anomaly.infrastructure.detectors.sampling import (
+    DensitySample,
+    label_by_nearest_core,
+    scaled_min_samples,
+    stratified_sample,
+)
 
 
 class HDBSCANDetector(PandasDetector):
-    def __init__(self, min_cluster_size: int, min_samples: int) -> None:
+    """HDBSCAN по стандартизованным числовым колонкам окна.
+
+    С `sample` модель обучается на стратифицированной выборке; ядровыми считаются
+    кластеризованные точки выборки, радиус каждой — её core distance внутри выборки.
+    Остальные строки размечаются по ближайшей ядровой точке.
+    """
+
+    columns = ("value", "attribute", "gas_used", "calldata_size")
+
+    def __init__(self, min_cluster_size: int, min_samples: int, sample: DensitySample | None = None) -> None:
         super().__init__(name="hdbscan")
+        self._min_cluster_size = min_cluster_size
+        self._min_samples = min_samples
+        self._sample = sample
         self._model = hdbscan.HDBSCAN(min_cluster_size=min_cluster_size, min_samples=min_samples)
 
-    def fit_predict(self, dataframe: pd.DataFrame) -> pd.Series:
-        if dataframe.empty:
+    def fit_predict(self, features: FeatureMatrix) -> pd.Series:
+        if not len(features):
             return pd.Series(dtype=int)
-        features = dataframe[["value", "attribute", "gas_used", "calldata_size"]]
-        labels = self._model.fit_predict(features)
-        return pd.Series((labels == -1).astype(int))
+        matrix = features.select(self.columns)
+        if self._sample is None or len(matrix) <= self._sample.size:
+            labels = self._model.fit_predict(matrix)
+            return pd.Series((labels == -1).astype(int))
+        return pd.Series(self._fit_predict_sampled(matrix, features.strata))
+
+    def _fit_predict_sampled(self, matrix: np.ndarray, strata: np.ndarray | None) -> np.ndarray:
+        rows = stratified_sample(strata, len(matrix), self._sample.size, self._sample.random_state)
+        sample = matrix[rows]
+        min_samples = scaled_min_samples(self._min_samples, len(rows), len(matrix))
+        min_cluster_size = max(2, scaled_min_samples(self._min_cluster_size, len(rows), len(matrix)))
+        labels = hdbscan.HDBSCAN(min_cluster_size=min_cluster_size, min_samples=min_samples).fit_predict(sample)
+        core_points = sample[labels != -1]
+        if not len(core_points):
+            return np.ones(len(matrix), dtype=np.int64)
+        distances, _ = KDTree(sample).query(core_points, k=min(min_samples + 1, len(sample)))
+        return label_by_nearest_core(matrix, core_points, distances[:, -1], self._sample.chunk_size)
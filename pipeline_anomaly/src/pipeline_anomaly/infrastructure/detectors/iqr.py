@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 
+from pipeline_anomaly.domain.models.feature_matrix import FeatureMatrix
 from pipeline_anomaly.infrastructure.detectors.base import PandasDetector
 
 
@@ -12,13 +14,15 @@ class IQRDetector(PandasDetector):
         super().__init__(name="iqr")
         self._multiplier = multiplier
 
-    def fit_predict(self, dataframe: pd.DataFrame) -> pd.Series:
-        q1 = dataframe["value"].quantile(0.25)
-        q3 = dataframe["value"].quantile(0.75)
+    def fit_predict(self, features: FeatureMatrix) -> pd.Series:
+        values = features.column("value")
+        if not len(values):
+            return pd.Series(dtype=int)
+        q1, q3 = np.quantile(values, [0.25, 0.75])
         iqr = q3 - q1
         if iqr == 0:
-            return pd.Series([0] * len(dataframe))
+            return pd.Series([0] * len(values))
         lower = q1 - self._multiplier * iqr
         upper = q3 + self._multiplier * iqr
-        mask = (dataframe["value"] < lower) | (dataframe["value"] > upper)
-        return mask.astype(int)
+        mask = (values < lower) | (values > upper)
+        return pd.Series(mask.astype(int))
@@ -3,15 +3,25 @@ from __future__ import annotations
 import pandas as pd
 from sklearn.ensemble import IsolationForest
 
+from pipeline_anomaly.domain.models.feature_matrix import FeatureMatrix
 from pipeline_anomaly.infrastructure.detectors.base import PandasDetector
 
 
 class IsolationForestDetector(PandasDetector):
+    columns = ("value", "attribute")
+
     def __init__(self, contamination: float, random_state: int) -> None:
         super().__init__(name="isolation_forest")
-        self._model = IsolationForest(contamination=contamination, random_state=random_state)
+        self._contamination = contamination
+        self._random_state = random_state
+
+    def fit(self, features: FeatureMatrix) -> IsolationForest:
+        model = IsolationForest(contamination=self._contamination, random_state=self._random_state)
+        return model.fit(features.select(self.columns))
 
-    def fit_predict(self, dataframe: pd.DataFrame) -> pd.Series:
-        features = dataframe[["value", "attribute"]]
-        predictions = self._model.fit_predict(features)
+    def score(self, model: IsolationForest, features: FeatureMatrix) -> pd.Series:
+        predictions = model.predict(features.select(self.columns))
         return pd.Series((predictions == -1).astype(int))
+
+    def fit_predict(self, features: FeatureMatrix) -> pd.Series:
+        return self.score(self.fit(features), features)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import os
+import pickle
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from pipeline_anomaly.domain.models.feature_matrix import FeatureMatrix
+from pipeline_anomaly.domain.services.interfaces import FittableDetector
+from pipeline_anomaly.infrastructure.state.json_file import JsonStateFile
+
+
+@dataclass(frozen=True, slots=True)
+class RetrainPolicy:
+    """Когда переобучать закэшированную модель.
+
+    `every_runs` — после N оценок (`0` — не учитывать), `max_age_seconds` — по расписанию
+    (`0` — не учитывать), `drift_threshold` — если исходное среднее любой колонки окна ушло
+    от эталонного больше чем на столько эталонных std (`0` — не учитывать).
+    """
+
+    every_runs: int = 24
+    max_age_seconds: float = 86_400.0
+    drift_threshold: float = 0.5
+
+    def retrain_reason(self, entry: "CachedModel | None", features: FeatureMatrix, now: float) -> str | None:
+        if entry is None:
+            return "no cached model"
+        if self.every_runs and entry.runs >= self.every_runs:
+            return f"{entry.runs} runs since fit"
+        if self.max_age_seconds and now - entry.fitted_at >= self.max_age_seconds:
+            return "model expired"
+        if self.drift_threshold:
+            mean = features.mean[features.positions(entry.columns)]
+            shift = float(np.max(np.abs(mean - entry.reference_mean) / entry.reference_std))
+            if shift > self.drift_threshold:
+                return f"feature drift {shift:.2f} std"
+        return None
+
+
+@dataclass(slots=True)
+class CachedModel:
+    model: Any
+    columns: tuple[str, ...]
+    fitted_at: float
+    runs: int
+    reference_mean: np.ndarray
+    reference_std: np.ndarray
+
+
+class DetectorModelCache:
+    """Обученные модели детекторов на диске: по pickle-файлу на детектор, запись атомарная.
+
+    Pickle переписывается только при переобучении (`save`); счётчик оценок и время
+    обучения лежат рядом в маленьком JSON (`record_run`). Счётчик от другой модели
+    (сбой между записью pickle и JSON) не учитывается. Последняя прочитанная или
+    записанная модель держится в памяти и перечитывается с диска, только если файл
+    сменился (например, его переписал воркер пула процессов).
+    """
+
+    def __init__(self, directory: Path | str) -> None:
+        self._directory = Path(directory)
+        self._memory: dict[str, tuple[int, CachedModel]] = {}
+
+    def load(self, name: str) -> CachedModel | None:
+        entry = self._load_model(name)
+        if entry is None:
+            return None
+        state = self._state(name).load()
+        entry.runs = int(state.get("runs", 0)) if state.get("fitted_at") == entry.fitted_at else 0
+        return entry
+
+    def save(self, name: str, entry: CachedModel) -> None:
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(name)
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        with tmp_path.open("wb") as file:
+            pickle.dump(entry, file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+        self._memory[name] = (path.stat().st_mtime_ns, entry)
+        self.record_run(name, entry)
+
+    def record_run(self, name: str, entry: CachedModel) -> None:
+        self._state(name).save({"fitted_at": entry.fitted_at, "runs": entry.runs})
+
+    def _load_model(self, name: str) -> CachedModel | None:
+        path = self._path(name)
+        try:
+            mtime = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+        remembered = self._memory.get(name)
+        if remembered is not None and remembered[0] == mtime:
+            return remembered[1]
+        try:
+            with path.open("rb") as file:
+                entry = pickle.load(file)
+        except (pickle.UnpicklingError, EOFError, AttributeError) as exc:
+            logger.warning("dropping unreadable model cache {}: {}", path, exc)
+            return None
+        self._memory[name] = (mtime, entry)
+        return entry
+
+    def _path(self, name: str) -> Path:
+        return self._directory / f"{name}.pkl"
+
+    def _state(self, name: str) -> JsonStateFile:
+        return JsonStateFile(self._directory / f"{name}.json")
+
+
+class CachedModelDetector:
+    """Fit-once/score-many обёртка над `FittableDetector`.
+
+    Модель берётся из `cache`; переобучение происходит только по `policy`, в остальных
+    запусках окно лишь оценивается, предварительно приведённое к масштабу признаков, на
+    котором модель обучалась. Счётчик оценок хранится на диске рядом с моделью, поэтому
+    политика работает и между запусками CLI, и в воркерах пула процессов; в
+    партиционированном режиме у каждой партиции своя модель.
+    """
+
+    def __init__(
+        self,
+        detector: FittableDetector,
+        cache: DetectorModelCache,
+        policy: RetrainPolicy,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.name = detector.name
+        self._detector = detector
+        self._cache = cache
+        self._policy = policy
+        self._clock = clock
+
+    def fit_predict(self, features: FeatureMatrix) -> pd.Series:
+        now = self._clock()
+        columns = tuple(self._detector.columns)
+        key = self.name if features.partition is None else f"{self.name}.{features.partition}"
+        entry = self._cache.load(key)
+        if entry is not None and entry.columns != columns:
+            entry = None
+        reason = self._policy.retrain_reason(entry, features, now)
+        if reason is not None:
+            logger.info("fitting {} model: {}", key, reason)
+            positions = features.positions(columns)
+            entry = CachedModel(
+                model=self._detector.fit(features),
+                columns=columns,
+                fitted_at=now,
+                runs=0,
+                reference_mean=features.mean[positions],
+                reference_std=features.std[positions],
+            )
+            scored = features
+        else:
+            scored = features.restandardized(columns, entry.reference_mean, entry.reference_std)
+        scores = self._detector.score(entry.model, scored)
+        entry.runs += 1
+        if reason is not None:
+            self._cache.save(key, entry)
+        else:
+            self._cache.record_run(key, entry)
+        return scores
+
+    def severity(self, scores: pd.Series) -> float:
+        return self._detector.severity(scores)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from typing import Any, Mapping
+
+import numpy as np
+
+from pipeline_anomaly.infrastructure.aggregation.sketch import QuantileSketch
+
+
+def _decay_factor(rows: int, half_life_rows: int | None) -> float:
+    """Множитель веса истории перед добавлением `rows` новых строк."""
+
+    if not half_life_rows or not rows:
+        return 1.0
+    return 0.5 ** (rows / half_life_rows)
+
+
+class OnlineZScoreDetector:
+    """Z-score по бегущим среднему и дисперсии (Welford, слияние батчей по Chan).
+
+    Пока история короче `min_history`, батч сначала добавляется в статистики и только
+    потом оценивается; дальше батч оценивается по уже накопленной истории.
+    Оценка строки — `|z| / threshold`, выброс от 1. С `half_life_rows` вес истории
+    экспоненциально затухает: каждые `half_life_rows` новых строк он уменьшается вдвое.
+    """
+
+    def __init__(self, threshold: float, min_history: int = 1_000, half_life_rows: int | None = None) -> None:
+        self.name = "online_zscore"
+        self._threshold = threshold
+        self._min_history = min_history
+        self._half_life_rows = half_life_rows
+        self._count = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def score_update(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        if self._count < self._min_history:
+            self._update(values)
+            return self._score(values)
+        scores = self._score(values)
+        self._update(values)
+        return scores
+
+    def state(self) -> dict[str, Any]:
+        return {"count": self._count, "mean": self._mean, "m2": self._m2}
+
+    def restore(self, state: Mapping[str, Any]) -> None:
+        self._count = float(state["count"])
+        self._mean = float(state["mean"])
+        self._m2 = float(state["m2"])
+
+    def _score(self, values: np.ndarray) -> np.ndarray:
+        if self._count < 2:
+            return np.zeros(len(values))
+        std = np.sqrt(self._m2 / (self._count - 1))
+        if std == 0:
+            return np.zeros(len(values))
+        return np.nan_to_num(np.abs(values - self._mean) / (std * self._threshold))
+
+    def _update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        batch_count = len(values)
+        # затухание масштабирует вес истории, среднее при этом не меняется
+        decay = _decay_factor(batch_count, self._half_life_rows)
+        self._count *= decay
+        self._m2 *= decay
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        total = self._count + batch_count
+        delta = batch_mean - self._mean
+        self._mean += delta * batch_count / total
+        self._m2 += batch_m2 + delta**2 * self._count * batch_count / total
+        self._count = total
+
+
+class OnlineIQRDetector:
+    """IQR-выбросы по квартилям потокового скетча (`QuantileSketch`), без пересчёта по окну.
+
+    Оценка строки — удаление от ближайшего квартиля в единицах `multiplier * IQR`, выброс от 1.
+    `half_life_rows` затухает счётчики скетча так же, как у `OnlineZScoreDetector`.
+    """
+
+    def __init__(
+        self,
+        multiplier: float = 1.5,
+        relative_accuracy: float = 0.01,
+        min_history: int = 1_000,
+        half_life_rows: int | None = None,
+    ) -> None:
+        self.name = "online_iqr"
+        self._multiplier = multiplier
+        self._min_history = min_history
+        self._half_life_rows = half_life_rows
+        self._sketch = QuantileSketch(relative_accuracy)
+
+    def score_update(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values, dtype=np.float64)
+        if self._sketch.count < self._min_history:
+            self._update(values)
+            return self._score(values)
+        scores = self._score(values)
+        self._update(values)
+        return scores
+
+    def state(self) -> dict[str, Any]:
+        return self._sketch.to_dict()
+
+    def restore(self, state: Mapping[str, Any]) -> None:
+        self._sketch = QuantileSketch.from_dict(dict(state))
+
+    def _score(self, values: np.ndarray) -> np.ndarray:
+        if self._sketch.count == 0:
+            return np.zeros(len(values))
+        q1 = self._sketch.quantile(0.25)
+        q3 = self._sketch.quantile(0.75)
+        iqr = q3 - q1
+        if iqr == 0:
+            return np.zeros(len(values))
+        distance = np.maximum(np.maximum(q1 - values, values - q3), 0.0)
+        return np.nan_to_num(distance / (self._multiplier * iqr))
+
+    def _update(self, values: np.ndarray) -> None:
+        self._sketch.scale(_decay_factor(int((~np.isnan(values)).sum()), self._half_life_rows))
+        self._sketch.add(values)
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import time
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from multiprocessing.pool import Pool
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from pipeline_anomaly.domain.models.anomaly import DetectorOutcome
+from pipeline_anomaly.domain.models.feature_matrix import FeatureMatrix
+from pipeline_anomaly.domain.services.interfaces import AnomalyDetector
+
+
+class ProcessPoolDetectorRunner:
+    """Запускает детекторы параллельно в пуле процессов.
+
+    Матрица признаков окна (float32) и страты один раз копируются в общий сегмент
+    `SharedMemory`, воркеры собирают над ним `FeatureMatrix` без копирования, поэтому
+    данные не пиклятся в каждый процесс. У каждого детектора свой таймаут (`timeouts`,
+    иначе `default_timeout`), отсчитываемый от постановки в пул; не уложившийся детектор
+    попадает в отчёт как пропущенный, а пул после такого запуска принудительно
+    останавливается и пересоздаётся при следующем. Ошибка детектора пробрасывается;
+    пул при этом тоже останавливается до освобождения сегмента, иначе ещё работающие
+    задачи читали бы освобождённую память.
+
+    Пул создаётся при первом запуске и живёт до `close()`, поэтому каскад и микробатчи
+    демона не платят за старт процессов на каждый вызов. Воркеры стартуют через
+    `start_method` (`forkserver`, где он есть, иначе `spawn`): `fork` копировал бы
+    открытые соединения ClickHouse и потоки префетча.
+    """
+
+    def __init__(
+        self,
+        workers: int = 0,
+        default_timeout: float = 300.0,
+        timeouts: Mapping[str, float] | None = None,
+        start_method: str | None = None,
+    ) -> None:
+        self._workers = workers or os.cpu_count() or 1
+        self._default_timeout = default_timeout
+        self._timeouts = dict(timeouts or {})
+        self._context = multiprocessing.get_context(start_method or _default_start_method())
+        self._pool: Pool | None = None
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def run(self, detectors: Sequence[AnomalyDetector], features: FeatureMatrix) -> list[DetectorOutcome]:
+        return self.run_partitioned(detectors, {"": features})[""]
+
+    def run_partitioned(
+        self, detectors: Sequence[AnomalyDetector], partitions: Mapping[str, FeatureMatrix]
+    ) -> dict[str, list[DetectorOutcome]]:
+        """Все пары (партиция, детектор) — отдельные задачи одного пула над общим сегментом."""
+        if not detectors or not partitions:
+            return {label: [] for label in partitions}
+        size = sum(_SharedFeatures.nbytes(features) for features in partitions.values())
+        segment = SharedMemory(create=True, size=max(size, 1))
+        pool = self._ensure_pool()
+        timed_out = False
+        finished = False
+        try:
+            offset = 0
+            layouts = {}
+            for label, features in partitions.items():
+                layouts[label] = _SharedFeatures.publish(features, segment, offset)
+                offset += _SharedFeatures.nbytes(features)
+            submitted = time.monotonic()
+            pending = [
+                (label, detector, pool.apply_async(_run_on_shared_matrix, (detector, segment.name, layouts[label])))
+                for label in partitions
+                for detector in detectors
+            ]
+            outcomes: dict[str, list[DetectorOutcome]] = {label: [] for label in partitions}
+            for label, detector, result in pending:
+                timeout = self._timeouts.get(detector.name, self._default_timeout)
+                remaining = max(submitted + timeout - time.monotonic(), 0.0)
+                try:
+                    scores, severity, seconds = result.get(timeout=remaining)
+                except multiprocessing.TimeoutError:
+                    timed_out = True
+                    logger.warning(
+                        "detector {}{} exceeded {:.1f}s timeout, skipping",
+                        detector.name,
+                        f" [{label}]" if label else "",
+                        timeout,
+                    )
+                    outcomes[label].append(
+                        DetectorOutcome(
+                            detector=detector.name,
+                            scores=None,
+                            severity=0.0,
+                            seconds=time.monotonic() - submitted,
+                            skip_reason="timeout",
+                        )
+                    )
+                    continue
+                outcomes[label].append(
+                    DetectorOutcome(
+                        detector=detector.name,
+                        scores=pd.Series(scores),
+                        severity=severity,
+                        seconds=seconds,
+                    )
+                )
+            finished = not timed_out
+            return outcomes
+        finally:
+            if not finished:
+                pool.terminate()
+                pool.join()
+                self._pool = None
+            segment.close()
+            segment.unlink()
+
+    def _ensure_pool(self) -> Pool:
+        if self._pool is None:
+            self._pool = self._context.Pool(processes=self._workers)
+        return self._pool
+
+
+def _default_start_method() -> str:
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+@dataclass(frozen=True, slots=True)
+class _SharedFeatures:
+    """Раскладка `FeatureMatrix` в общем сегменте с `offset`: матрица, за ней страты."""
+
+    shape: tuple[int, int]
+    columns: tuple[str, ...]
+    mean: np.ndarray
+    std: np.ndarray
+    has_strata: bool
+    partition: str | None
+    offset: int
+
+    @staticmethod
+    def nbytes(features: FeatureMatrix) -> int:
+        strata_bytes = features.strata.nbytes if features.strata is not None else 0
+        return features.values.nbytes + strata_bytes
+
+    @classmethod
+    def publish(cls, features: FeatureMatrix, segment: SharedMemory, offset: int = 0) -> "_SharedFeatures":
+        layout = cls(
+            shape=features.values.shape,
+            columns=features.columns,
+            mean=features.mean,
+            std=features.std,
+            has_strata=features.strata is not None,
+            partition=features.partition,
+            offset=offset,
+        )
+        values, strata = layout.attach(segment)
+        values[:] = features.values
+        if strata is not None:
+            strata[:] = features.strata
+        return layout
+
+    def attach(self, segment: SharedMemory) -> tuple[np.ndarray, np.ndarray | None]:
+        values = np.ndarray(self.shape, dtype=np.float32, buffer=segment.buf, offset=self.offset)
+        if not self.has_strata:
+            return values, None
+        strata_offset = self.offset + values.nbytes
+        strata = np.ndarray((self.shape[0],), dtype=np.int64, buffer=segment.buf, offset=strata_offset)
+        return values, strata
+
+
+def _run_on_shared_matrix(
+    detector: AnomalyDetector, segment_name: str, shared: _SharedFeatures
+) -> tuple[np.ndarray, float, float]:
+    segment = SharedMemory(name=segment_name)
+    try:
+        values, strata = shared.attach(segment)
+        features = FeatureMatrix(
+            values=values,
+            columns=shared.columns,
+            mean=shared.mean,
+            std=shared.std,
+            strata=strata,
+            partition=shared.partition,
+        )
+        started = time.perf_counter()
+        scores = detector.fit_predict(features)
+        severity = float(detector.severity(scores))
+        elapsed = time.perf_counter() - started
+        result = np.asarray(scores).copy()
+        del features, values, strata
+        return result, severity, elapsed
+    finally:
+        segment.close()
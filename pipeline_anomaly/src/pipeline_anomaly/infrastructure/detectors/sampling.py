@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True, slots=True)
+class DensitySample:
+    """Параметры выборочного режима плотностных детекторов.
+
+    `size` — бюджет выборки (строк), `chunk_size` — размер блока при разметке
+    оставшихся строк через индекс ядровых точек.
+    """
+
+    size: int
+    chunk_size: int = 200_000
+    random_state: int = 0
+
+
+@dataclass(frozen=True, slots=True)
+class DetectorAgreement:
+    """Насколько выборочный режим совпадает с точным на одних и тех же данных."""
+
+    rows: int
+    exact_outliers: int
+    sampled_outliers: int
+    agreement: float
+    precision: float
+    recall: float
+    jaccard: float
+
+
+def stratified_sample(strata: np.ndarray | None, rows: int, size: int, random_state: int = 0) -> np.ndarray:
+    """Индексы выборки с пропорциональным размещением по стратам (минимум строка на страту)."""
+    if size >= rows:
+        return np.arange(rows)
+    rng = np.random.default_rng(random_state)
+    if strata is None:
+        return np.sort(rng.choice(rows, size=size, replace=False))
+    order = np.argsort(strata, kind="stable")
+    _, starts, counts = np.unique(strata[order], return_index=True, return_counts=True)
+    quotas = np.maximum(np.round(counts * size / rows).astype(np.int64), 1)
+    picked = [
+        order[start + rng.choice(count, size=min(quota, count), replace=False)]
+        for start, count, quota in zip(starts, counts, quotas)
+    ]
+    return np.sort(np.concatenate(picked))
+
+
+def label_by_nearest_core(
+    features: np.ndarray, core_points: np.ndarray, core_radius: np.ndarray, chunk_size: int
+) -> np.ndarray:
+    """Строка — выброс (1), если ближайшая ядровая точка дальше своего радиуса.
+
+    Индекс строится один раз (`KDTree`), строки размечаются блоками по `chunk_size`,
+    поэтому пиковая память не зависит от размера окна.
+    """
+    if not len(core_points):
+        return np.ones(len(features), dtype=np.int64)
+    # sklearn импортируется здесь: `DensitySample` нужен CLI и без плотностных детекторов
+    from sklearn.neighbors import KDTree
+
+    tree = KDTree(core_points)
+    flags = np.empty(len(features), dtype=np.int64)
+    for start in range(0, len(features), chunk_size):
+        chunk = features[start : start + chunk_size]
+        distances, nearest = tree.query(chunk, k=1)
+        flags[start : start + len(chunk)] = distances[:, 0] > core_radius[nearest[:, 0]]
+    return flags
+
+
+def scaled_min_samples(min_samples: int, sample_rows: int, rows: int) -> int:
+    """`min_samples` для выборки: ожидаемое число соседей падает пропорционально доле выборки."""
+    return max(2, int(round(min_samples * sample_rows / rows)))
+
+
+def agreement(exact: np.ndarray, sampled: np.ndarray) -> DetectorAgreement:
+    exact = np.asarray(exact) > 0
+    sampled = np.asarray(sampled) > 0
+    both = int(np.sum(exact & sampled))
+    either = int(np.sum(exact | sampled))
+    return DetectorAgreement(
+        rows=len(exact),
+        exact_outliers=int(exact.sum()),
+        sampled_outliers=int(sampled.sum()),
+        agreement=float(np.mean(exact == sampled)) if len(exact) else 1.0,
+        precision=both / int(sampled.sum()) if sampled.any() else 1.0,
+        recall=both / int(exact.sum()) if exact.any() else 1.0,
+        jaccard=both / either if either else 1.0,
+    )
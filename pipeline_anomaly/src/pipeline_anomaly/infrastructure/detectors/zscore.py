@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
 
+from pipeline_anomaly.domain.models.feature_matrix import FeatureMatrix
 from pipeline_anomaly.infrastructure.detectors.base import PandasDetector
 
 
@@ -10,8 +12,6 @@ class ZScoreDetector(PandasDetector):
         super().__init__(name="zscore")
         self._threshold = threshold
 
-    def fit_predict(self, dataframe: pd.DataFrame) -> pd.Series:
-        mean = dataframe["value"].mean()
-        std = dataframe["value"].std()
-        z_scores = (dataframe["value"] - mean) / std
-        return (z_scores.abs() > self._threshold).astype(int)
+    def fit_predict(self, features: FeatureMatrix) -> pd.Series:
+        z_scores = features.column("value")
+        return pd.Series((np.abs(z_scores) > self._threshold).astype(int))
@@ -1,13 +1,29 @@
 from __future__ import annotations
 
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Iterator
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 
-from pipeline_anomaly.domain.models.batch import RecordBatch
+from pipeline_anomaly.domain.models.batch import AnyRecordBatch, ArrowRecordBatch, RecordBatch
+
+_CHAIN_IDS = np.array([1, 10, 56, 137])
+_CHAIN_PROBABILITIES = np.array([0.45, 0.2, 0.15, 0.2])
+_CONTRACT_POOL = np.array(
+    [
+        "0xA1b2c3d4e5f6a7b8c9d0e1f2a3b4c5d6e7f8a9b0",
+        "0x1111111254eeb25477b68fb85ed929f73a960582",
+        "0x5aaeb6053f3e94c9b9a09f33669435e7ef1beaed",
+        "0x00000000006c3852cbef3e08e8df289169ede581",
+    ]
+)
+_HEX_DIGITS = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
 
 
 @dataclass(slots=True)
@@ -16,17 +32,54 @@ class SyntheticDatasetConfig:
     batch_size: int
     anomaly_ratio: float
     seed: int
+    mode: str = "sequential"
+    workers: int = 0
+    batch_format: str = "pandas"
+
+
+@dataclass(frozen=True, slots=True)
+class _ShardSpec:
+    """Описание одного батча: у каждого шарда свой независимый RNG-поток от общего seed."""
+
+    index: int
+    size: int
+    start_time: datetime
+    start_block: int
+    anomaly_ratio: float
+    seed: int
+    batch_format: str
 
 
 class SyntheticDatasetGenerator:
+    """Генератор синтетики.
+
+    Режимы (`mode`):
+
+    - `sequential` — исходная построчная генерация одним RNG;
+    - `vectorized` — все колонки строятся numpy-операциями, RNG на каждый батч;
+    - `parallel` — те же шарды, что и `vectorized`, но строятся в пуле процессов.
+      Результат для заданного `seed` не зависит от числа воркеров.
+
+    `batch_format: arrow` — батчи собираются сразу в Arrow (`ArrowRecordBatch`), минуя DataFrame.
+    """
+
     def __init__(self, config: SyntheticDatasetConfig) -> None:
         self._config = config
         self._random = np.random.default_rng(config.seed)
 
-    def batches(self) -> list[RecordBatch]:
-        return list(self._iter_batches())
+    def batches(self) -> Iterator[AnyRecordBatch]:
+        if self._config.batch_format not in ("pandas", "arrow"):
+            raise ValueError(f"unknown synthetic batch format {self._config.batch_format}")
+        mode = (self._config.mode or "sequential").lower()
+        if mode == "sequential":
+            return self._iter_batches()
+        if mode == "vectorized":
+            return self._iter_vectorized_batches()
+        if mode == "parallel":
+            return self._iter_parallel_batches()
+        raise ValueError(f"unknown synthetic generator mode {self._config.mode}")
 
-    def _iter_batches(self) -> Iterator[RecordBatch]:
+    def _iter_batches(self) -> Iterator[AnyRecordBatch]:
         remaining = self._config.row_count
         current_time = datetime.utcnow()
         block_number = int(current_time.timestamp())
@@ -34,16 +87,8 @@ class SyntheticDatasetGenerator:
             batch_size = min(self._config.batch_size, remaining)
             timestamps = [current_time - timedelta(seconds=i) for i in range(batch_size)]
             entity_ids = self._random.integers(1, 1_000_000, size=batch_size)
-            chain_id_options = np.array([1, 10, 56, 137])
-            chain_id_prob = np.array([0.45, 0.2, 0.15, 0.2])
-            chain_ids = self._random.choice(chain_id_options, size=batch_size, p=chain_id_prob)
-            contract_pool = [
-                "0xA1b2c3d4e5f6a7b8c9d0e1f2a3b4c5d6e7f8a9b0",
-                "0x1111111254eeb25477b68fb85ed929f73a960582",
-                "0x5aaeb6053f3e94c9b9a09f33669435e7ef1beaed",
-                "0x00000000006c3852cbef3e08e8df289169ede581",
-            ]
-            contract_addresses = self._random.choice(contract_pool, size=batch_size)
+            chain_ids = self._random.choice(_CHAIN_IDS, size=batch_size, p=_CHAIN_PROBABILITIES)
+            contract_addresses = self._random.choice(_CONTRACT_POOL, size=batch_size)
             base_values = self._random.normal(loc=100.0, scale=15.0, size=batch_size)
             gas_used = self._random.integers(21_000, 800_000, size=batch_size)
             calldata_size = self._random.integers(64, 4096, size=batch_size)
@@ -72,11 +117,51 @@ class SyntheticDatasetGenerator:
                     "calldata_size": calldata_size,
                 }
             )
-            yield RecordBatch(dataframe=dataframe)
+            if self._config.batch_format == "arrow":
+                yield ArrowRecordBatch.from_dataframe(dataframe)
+            else:
+                yield RecordBatch(dataframe=dataframe)
             remaining -= batch_size
             current_time -= timedelta(seconds=batch_size)
             block_number -= batch_size
 
+    def _iter_vectorized_batches(self) -> Iterator[AnyRecordBatch]:
+        for spec in self._shard_specs():
+            yield _build_shard(spec)
+
+    def _iter_parallel_batches(self) -> Iterator[AnyRecordBatch]:
+        workers = self._config.workers or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(max_workers=workers)
+        pending: deque[Future[AnyRecordBatch]] = deque()
+        try:
+            for spec in self._shard_specs():
+                pending.append(executor.submit(_build_shard, spec))
+                if len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _shard_specs(self) -> Iterator[_ShardSpec]:
+        started_at = datetime.utcnow().replace(microsecond=0)
+        first_block = int(started_at.timestamp())
+        offset = 0
+        index = 0
+        while offset < self._config.row_count:
+            size = min(self._config.batch_size, self._config.row_count - offset)
+            yield _ShardSpec(
+                index=index,
+                size=size,
+                start_time=started_at - timedelta(seconds=offset),
+                start_block=first_block - offset,
+                anomaly_ratio=self._config.anomaly_ratio,
+                seed=self._config.seed,
+                batch_format=self._config.batch_format,
+            )
+            offset += size
+            index += 1
+
     def _generate_tx_hashes(self, size: int) -> list[str]:
         random_bytes = self._random.integers(0, 256, size=(size, 32), dtype=np.uint8)
         return ["0x" + "".join(f"{byte:02x}" for byte in row) for row in random_bytes]
@@ -88,3 +173,64 @@ class SyntheticDatasetGenerator:
         indices = self._random.choice(len(tx_hashes) - 1, size=duplicate_count, replace=False)
         for idx in indices:
             tx_hashes[idx] = tx_hashes[idx + 1]
+
+
+def _build_shard(spec: _ShardSpec) -> AnyRecordBatch:
+    random = np.random.default_rng(np.random.SeedSequence(spec.seed, spawn_key=(spec.index,)))
+    size = spec.size
+    offsets = np.arange(size, dtype=np.int64)
+    timestamps = np.datetime64(spec.start_time, "ns") - offsets.astype("timedelta64[s]")
+    entity_ids = random.integers(1, 1_000_000, size=size)
+    chain_ids = random.choice(_CHAIN_IDS, size=size, p=_CHAIN_PROBABILITIES)
+    contract_addresses = _CONTRACT_POOL[random.integers(0, len(_CONTRACT_POOL), size=size)]
+    base_values = random.normal(loc=100.0, scale=15.0, size=size)
+    gas_used = random.integers(21_000, 800_000, size=size)
+    calldata_size = random.integers(64, 4096, size=size)
+    attribute = random.uniform(0, 1, size=size)
+    tx_hash_chars = _hex_hash_chars(random.integers(0, 256, size=(size, 32), dtype=np.uint8))
+
+    anomalies_count = max(1, int(size * spec.anomaly_ratio))
+    anomaly_indices = random.choice(size, size=anomalies_count, replace=False)
+    base_values[anomaly_indices] *= random.uniform(2, 5, size=anomalies_count)
+    gas_used[anomaly_indices] *= random.integers(2, 6, size=anomalies_count)
+    calldata_size[anomaly_indices] *= random.integers(2, 5, size=anomalies_count)
+
+    if size >= 2:
+        duplicate_count = max(1, int(size * 0.01))
+        duplicate_indices = random.choice(size - 1, size=duplicate_count, replace=False)
+        tx_hash_chars[duplicate_indices] = tx_hash_chars[duplicate_indices + 1]
+
+    columns = {
+        "event_time": timestamps,
+        "entity_id": entity_ids,
+        "chain_id": chain_ids,
+        "block_number": spec.start_block,
+        "contract_address": contract_addresses,
+        "tx_hash": None,
+        "value": base_values,
+        "attribute": attribute,
+        "gas_used": gas_used,
+        "calldata_size": calldata_size,
+    }
+    if spec.batch_format == "arrow":
+        columns["block_number"] = np.full(size, spec.start_block, dtype=np.int64)
+        columns["tx_hash"] = _arrow_strings(tx_hash_chars)
+        return ArrowRecordBatch.from_columns(columns)
+    columns["tx_hash"] = tx_hash_chars.view(f"S{tx_hash_chars.shape[1]}").ravel().astype(str)
+    return RecordBatch(dataframe=pd.DataFrame(columns))
+
+
+def _hex_hash_chars(random_bytes: np.ndarray) -> np.ndarray:
+    rows, width = random_bytes.shape
+    chars = np.empty((rows, 2 + 2 * width), dtype=np.uint8)
+    chars[:, 0] = ord("0")
+    chars[:, 1] = ord("x")
+    chars[:, 2::2] = _HEX_DIGITS[random_bytes >> 4]
+    chars[:, 3::2] = _HEX_DIGITS[random_bytes & 0x0F]
+    return chars
+
+
+def _arrow_strings(chars: np.ndarray) -> pa.StringArray:
+    rows, width = chars.shape
+    offsets = np.arange(0, (rows + 1) * width, width, dtype=np.int32)
+    return pa.StringArray.from_buffers(rows, pa.py_buffer(offsets), pa.py_buffer(np.ascontiguousarray(chars)))
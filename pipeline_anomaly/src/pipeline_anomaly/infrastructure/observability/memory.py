@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import resource
+from pathlib import Path
+
+_PROC_STATUS = Path("/proc/self/status")
+_PROC_CLEAR_REFS = Path("/proc/self/clear_refs")
+
+
+def reset_peak_rss() -> bool:
+    """Сбрасывает пиковый RSS (`VmHWM`) до текущего; `False`, если ОС этого не умеет."""
+
+    try:
+        _PROC_CLEAR_REFS.write_text("5")
+    except OSError:
+        return False
+    return True
+
+
+def peak_rss_bytes() -> int:
+    """Пиковый RSS с последнего `reset_peak_rss` (`VmHWM`); без `/proc` — за всю жизнь процесса."""
+
+    try:
+        status = _PROC_STATUS.read_text()
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    for line in status.splitlines():
+        if line.startswith("VmHWM:"):
+            return int(line.split()[1]) * 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
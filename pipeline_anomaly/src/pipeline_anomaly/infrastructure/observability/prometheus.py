@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import bisect
+import threading
+import urllib.request
+from collections.abc import Sequence
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from loguru import logger
+
+from pipeline_anomaly.domain.models.span import Span
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@dataclass(slots=True)
+class _StageSeries:
+    buckets: list[int]
+    duration_sum: float = 0.0
+    calls: int = 0
+    rows: int = 0
+    bytes_read: int = 0
+    bytes_written: int = 0
+    rows_per_second: float = 0.0
+    peak_memory_delta: int = 0
+
+
+class PrometheusExporter:
+    """Метрики стадий в текстовом формате Prometheus, без зависимости от `prometheus_client`.
+
+    Для каждого имени спана (`stage`): гистограмма длительности, счётчики строк и байт
+    чтения/записи, гауджи строк в секунду и прироста пикового RSS за последний вызов.
+    Отдаётся по HTTP (`serve`, для резидентного режима) или отправляется в Pushgateway
+    (`push`, для разовых запусков).
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS, namespace: str = "pipeline") -> None:
+        self._bounds = tuple(sorted(buckets))
+        self._namespace = namespace
+        self._lock = threading.Lock()
+        self._stages: dict[str, _StageSeries] = {}
+        self._server: ThreadingHTTPServer | None = None
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            series = self._stages.get(span.name)
+            if series is None:
+                series = self._stages[span.name] = _StageSeries(buckets=[0] * (len(self._bounds) + 1))
+            series.buckets[bisect.bisect_left(self._bounds, span.seconds)] += 1
+            series.duration_sum += span.seconds
+            series.calls += 1
+            series.rows += span.rows
+            series.bytes_read += span.bytes_read
+            series.bytes_written += span.bytes_written
+            if span.rows:
+                series.rows_per_second = span.rows_per_second
+            series.peak_memory_delta = span.peak_memory_delta
+
+    def render(self) -> str:
+        ns = self._namespace
+        lines = [
+            f"# HELP {ns}_stage_duration_seconds Duration of pipeline stages and repository calls.",
+            f"# TYPE {ns}_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            stages = sorted(self._stages.items())
+            for stage, series in stages:
+                cumulative = 0
+                for bound, count in zip((*self._bounds, float("inf")), series.buckets):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{ns}_stage_duration_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'{ns}_stage_duration_seconds_sum{{stage="{stage}"}} {series.duration_sum!r}')
+                lines.append(f'{ns}_stage_duration_seconds_count{{stage="{stage}"}} {series.calls}')
+            for metric, kind, help_text, attr in (
+                ("stage_rows_total", "counter", "Rows processed by the stage.", "rows"),
+                ("stage_bytes_read_total", "counter", "Bytes read by the stage.", "bytes_read"),
+                ("stage_bytes_written_total", "counter", "Bytes written by the stage.", "bytes_written"),
+                ("stage_rows_per_second", "gauge", "Throughput of the last stage call.", "rows_per_second"),
+                (
+                    "stage_peak_memory_delta_bytes",
+                    "gauge",
+                    "Growth of the process peak RSS during the last stage call.",
+                    "peak_memory_delta",
+                ),
+            ):
+                lines.append(f"# HELP {ns}_{metric} {help_text}")
+                lines.append(f"# TYPE {ns}_{metric} {kind}")
+                for stage, series in stages:
+                    lines.append(f'{ns}_{metric}{{stage="{stage}"}} {getattr(series, attr)!r}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "0.0.0.0") -> None:
+        exporter = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:  # noqa: N802 - http.server API
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+                return
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info("serving prometheus metrics on :{}/metrics", self._server.server_address[1])
+
+    def push(self, gateway_url: str, job: str, timeout: float = 5.0) -> None:
+        request = urllib.request.Request(
+            f"{gateway_url.rstrip('/')}/metrics/job/{job}",
+            data=self.render().encode("utf-8"),
+            method="PUT",
+            headers={"Content-Type": CONTENT_TYPE},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout):
+                pass
+        except OSError as exc:
+            logger.warning("failed to push metrics to {}: {}", gateway_url, exc)
+
+    def close(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
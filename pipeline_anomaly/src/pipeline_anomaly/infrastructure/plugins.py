@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from importlib import import_module
+from importlib.metadata import entry_points
+from typing import Any
+
+DETECTORS_GROUP = "pipeline_anomaly.detectors"
+SOURCES_GROUP = "pipeline_anomaly.sources"
+ALERT_SINKS_GROUP = "pipeline_anomaly.alert_sinks"
+
+
+class PluginRegistry:
+    """Реализации по имени из конфига, импортируемые только при первом обращении.
+
+    Имя ищется среди встроенных (`builtins`: имя → `"module:attr"`), затем среди
+    entry points группы `group` установленных пакетов; допускается и явная ссылка
+    `"module:attr"`. Поэтому тяжёлые зависимости (`sklearn`, `hdbscan`, `requests`)
+    загружаются, только если реализация включена в конфиге.
+    """
+
+    def __init__(self, kind: str, group: str, builtins: Mapping[str, str]) -> None:
+        self._kind = kind
+        self._group = group
+        self._builtins = dict(builtins)
+        self._loaded: dict[str, Any] = {}
+
+    def names(self) -> list[str]:
+        discovered = {entry.name for entry in entry_points(group=self._group)}
+        return sorted(set(self._builtins) | discovered)
+
+    def resolve(self, name: str) -> Any:
+        if name not in self._loaded:
+            self._loaded[name] = self._load(name)
+        return self._loaded[name]
+
+    def _load(self, name: str) -> Any:
+        target = self._builtins.get(name)
+        if target is None:
+            for entry in entry_points(group=self._group, name=name):
+                return entry.load()
+            if ":" not in name:
+                raise ValueError(f"unknown {self._kind} {name}")
+            target = name
+        module_name, _, attr = target.partition(":")
+        return getattr(import_module(module_name), attr)
+
+
+DETECTORS = PluginRegistry(
+    "detector",
+    DETECTORS_GROUP,
+    {
+        "zscore": "pipeline_anomaly.infrastructure.detectors.zscore:ZScoreDetector",
+        "iqr": "pipeline_anomaly.infrastructure.detectors.iqr:IQRDetector",
+        "isolation_forest": "pipeline_anomaly.infrastructure.detectors.isolation_forest:IsolationForestDetector",
+        "dbscan": "pipeline_anomaly.infrastructure.detectors.dbscan:DBSCANDetector",
+        "hdbscan": "pipeline_anomaly.infrastructure.detectors.hdbscan:HDBSCANDetector",
+    },
+)
+
+SOURCES = PluginRegistry(
+    "source",
+    SOURCES_GROUP,
+    {
+        "synthetic": "pipeline_anomaly.infrastructure.generators.synthetic_generator:SyntheticDatasetGenerator",
+        "kafka": "pipeline_anomaly.infrastructure.sources.kafka_file_source:KafkaBatchSource",
+        "web3": "pipeline_anomaly.infrastructure.sources.web3_stub:Web3DatasetSource",
+    },
+)
+
+ALERT_SINKS = PluginRegistry(
+    "alert sink",
+    ALERT_SINKS_GROUP,
+    {
+        "stdout": "pipeline_anomaly.infrastructure.alerting.stdout_sink:StdOutAlertSink",
+        "http": "pipeline_anomaly.infrastructure.alerting.http_sink:HttpAlertSink",
+        "slack": "pipeline_anomaly.infrastructure.alerting.slack_sink:SlackAlertSink",
+    },
+)
@@ -1,19 +1,159 @@
 from __future__ import annotations
 
+import math
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
 from datetime import datetime
 
 import pandas as pd
+from clickhouse_connect.driver import Client
+from loguru import logger
 
 from pipeline_anomaly.domain.models.aggregate import AggregateCollection
 from pipeline_anomaly.domain.models.anomaly import AnomalyReport
-from pipeline_anomaly.domain.models.batch import RecordBatch
+from pipeline_anomaly.domain.models.batch import AnyRecordBatch, ArrowRecordBatch
+from pipeline_anomaly.domain.services.tracing import Tracer, traced
 from pipeline_anomaly.infrastructure.clients.clickhouse import ClickHouseFactory
 
 
+ROLLUP_TABLE = "events_rollup_1m"
+
+
+@dataclass(frozen=True, slots=True)
+class _Migration:
+    version: int
+    name: str
+    statements: tuple[str, ...]
+    backfill: tuple[str, ...] = ()
+
+
+_MIGRATIONS: tuple[_Migration, ...] = (
+    _Migration(
+        version=1,
+        name="events_rollup_1m",
+        statements=(
+            f"""
+            CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+                minute DateTime,
+                chain_id UInt16,
+                events SimpleAggregateFunction(sum, UInt64),
+                value_sum SimpleAggregateFunction(sum, Float64),
+                value_sumsq SimpleAggregateFunction(sum, Float64),
+                gas_sum SimpleAggregateFunction(sum, Float64),
+                high_calldata SimpleAggregateFunction(sum, UInt64),
+                first_event SimpleAggregateFunction(min, DateTime),
+                last_event SimpleAggregateFunction(max, DateTime),
+                value_quantiles AggregateFunction(quantilesTDigest(0.95, 0.05), Float64),
+                calldata_quantiles AggregateFunction(quantilesTDigest(0.5), UInt32)
+            ) ENGINE = AggregatingMergeTree
+            PARTITION BY toDate(minute)
+            ORDER BY (minute, chain_id)
+            TTL minute + INTERVAL 45 DAY
+            """,
+            f"DROP VIEW IF EXISTS {ROLLUP_TABLE}_mv",
+            f"TRUNCATE TABLE {ROLLUP_TABLE}",
+            # время вставки по часам сервера; у строк, загруженных до миграции, — 0
+            "ALTER TABLE events ADD COLUMN IF NOT EXISTS ingested_at DateTime MATERIALIZED toDateTime(0)",
+            "ALTER TABLE events MODIFY COLUMN ingested_at DateTime MATERIALIZED toDateTime(0)",
+            "ALTER TABLE events MATERIALIZE COLUMN ingested_at SETTINGS mutations_sync = 2",
+            "ALTER TABLE events MODIFY COLUMN ingested_at DateTime MATERIALIZED now()",
+            f"""
+            CREATE MATERIALIZED VIEW {ROLLUP_TABLE}_mv TO {ROLLUP_TABLE} AS
+            SELECT
+                toStartOfMinute(event_time) AS minute,
+                chain_id,
+                count() AS events,
+                sum(value) AS value_sum,
+                sum(value * value) AS value_sumsq,
+                sum(gas_used) AS gas_sum,
+                countIf(calldata_size > 1024) AS high_calldata,
+                min(event_time) AS first_event,
+                max(event_time) AS last_event,
+                quantilesTDigestState(0.95, 0.05)(value) AS value_quantiles,
+                quantilesTDigestState(0.5)(calldata_size) AS calldata_quantiles
+            FROM events
+            WHERE ingested_at >= toDateTime({{cutoff}})
+            GROUP BY minute, chain_id
+            """,
+        ),
+        backfill=(
+            f"""
+            INSERT INTO {ROLLUP_TABLE}
+            SELECT
+                toStartOfMinute(event_time) AS minute,
+                chain_id,
+                count(),
+                sum(value),
+                sum(value * value),
+                sum(gas_used),
+                countIf(calldata_size > 1024),
+                min(event_time),
+                max(event_time),
+                quantilesTDigestState(0.95, 0.05)(value),
+                quantilesTDigestState(0.5)(calldata_size)
+            FROM events
+            WHERE ingested_at < toDateTime({{cutoff}})
+            GROUP BY minute, chain_id
+            """,
+        ),
+    ),
+    _Migration(
+        version=2,
+        name="anomaly_reports_partition",
+        statements=(
+            """
+            ALTER TABLE anomaly_reports
+            ADD COLUMN IF NOT EXISTS partition String DEFAULT '' AFTER detector
+            """,
+        ),
+    ),
+    _Migration(
+        version=3,
+        name="anomaly_events",
+        statements=(
+            """
+            CREATE TABLE IF NOT EXISTS anomaly_events (
+                tx_hash String,
+                generated_at DateTime,
+                event_time DateTime,
+                chain_id UInt16,
+                score Float64,
+                detectors Array(LowCardinality(String)),
+                partition String
+            ) ENGINE = MergeTree
+            ORDER BY (tx_hash, generated_at)
+            TTL generated_at + INTERVAL 90 DAY
+            """,
+        ),
+    ),
+)
+"""Миграции схемы по порядку версий; применённые версии записываются в `schema_migrations`.
+
+`{cutoff}` в тексте — момент по часам сервера, взятый за `migration_grace_seconds` до
+первого оператора, где он встречается. Строки делятся по времени вставки `ingested_at`, а не по
+`event_time`: view считает строки, вставленные с cutoff (в том числе с давним `event_time` —
+опоздавшие и повторно загруженные), а `backfill` запускается, когда cutoff прошёл с запасом,
+и считает всё, что вставлено до него. Вставка, выполняемая во время миграции, попадает ровно
+в одну из частей. Повтор после сбоя (до записи в `schema_migrations`) очищает rollup и
+строит его заново.
+"""
+
+
 class ClickHouseRepository:
-    def __init__(self, factory: ClickHouseFactory) -> None:
+    def __init__(
+        self,
+        factory: ClickHouseFactory,
+        tracer: Tracer | None = None,
+        sleep: Callable[[float], None] = time.sleep,
+        migration_grace_seconds: float = 10.0,
+    ) -> None:
         self._factory = factory
+        self._tracer = tracer
+        self._sleep = sleep
+        self._migration_grace_seconds = migration_grace_seconds
 
+    @traced("repository.ensure_schema")
     def ensure_schema(self) -> None:
         ddl_statements = [
             """
@@ -60,11 +200,65 @@ class ClickHouseRepository:
         with self._factory.connect() as client:
             for ddl in ddl_statements:
                 client.command(ddl)
+            self._migrate(client)
 
-    def ingest_batch(self, batch: RecordBatch) -> None:
+    def _migrate(self, client: Client) -> None:
+        client.command(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version UInt32,
+                name String,
+                applied_at DateTime
+            ) ENGINE = MergeTree
+            ORDER BY version
+            """
+        )
+        applied = {int(row[0]) for row in client.query("SELECT version FROM schema_migrations").result_rows}
+        for migration in _MIGRATIONS:
+            if migration.version in applied:
+                continue
+            logger.info("applying schema migration {} {}", migration.version, migration.name)
+            cutoff: int | None = None
+            for statement in migration.statements:
+                if cutoff is None and "{cutoff}" in statement:
+                    cutoff = self._server_time(client) + math.ceil(self._migration_grace_seconds)
+                client.command(statement if cutoff is None else statement.format(cutoff=cutoff))
+            if migration.backfill:
+                self._wait_past_cutoff(client, cutoff)
+                for statement in migration.backfill:
+                    client.command(statement.format(cutoff=cutoff))
+            client.insert(
+                "schema_migrations",
+                [(migration.version, migration.name, datetime.utcnow())],
+                column_names=["version", "name", "applied_at"],
+            )
+
+    def _wait_past_cutoff(self, client: Client, cutoff: int | None) -> None:
+        """Ждёт, пока вставки, начатые до cutoff, завершатся; view обязан появиться раньше cutoff."""
+
+        if cutoff is None:
+            raise ValueError("migration backfill needs a {cutoff} statement")
+        now = self._server_time(client)
+        if now >= cutoff:
+            raise RuntimeError(f"materialized view was created after cutoff {cutoff}, rerun the migration")
+        deadline = cutoff + math.ceil(self._migration_grace_seconds)
+        while now < deadline:
+            self._sleep(deadline - now)
+            now = self._server_time(client)
+
+    @staticmethod
+    def _server_time(client: Client) -> int:
+        return int(client.query("SELECT toUnixTimestamp(now())").result_rows[0][0])
+
+    @traced("repository.ingest_batch")
+    def ingest_batch(self, batch: AnyRecordBatch) -> None:
         with self._factory.connect() as client:
-            client.insert_df("events", batch.dataframe)
+            if isinstance(batch, ArrowRecordBatch):
+                client.insert_arrow("events", batch.table)
+            else:
+                client.insert_df("events", batch.dataframe)
 
+    @traced("repository.persist_aggregates")
     def persist_aggregates(self, aggregates: AggregateCollection) -> None:
         rows = [
             (
@@ -83,6 +277,7 @@ class ClickHouseRepository:
                 column_names=["metric", "value", "window_start", "window_end", "extra"],
             )
 
+    @traced("repository.persist_report")
     def persist_report(self, report: AnomalyReport) -> None:
         rows = [
             {
@@ -90,6 +285,7 @@ class ClickHouseRepository:
                 "window_start": report.window_start,
                 "window_end": report.window_end,
                 "detector": anomaly.detector,
+                "partition": anomaly.partition or "",
                 "score": anomaly.score,
                 "severity": anomaly.severity,
                 "description": anomaly.description,
@@ -105,6 +301,7 @@ class ClickHouseRepository:
                         row["window_start"],
                         row["window_end"],
                         row["detector"],
+                        row["partition"],
                         row["score"],
                         row["severity"],
                         row["description"],
@@ -116,12 +313,86 @@ class ClickHouseRepository:
                     "window_start",
                     "window_end",
                     "detector",
+                    "partition",
                     "score",
                     "severity",
                     "description",
                 ],
             )
+            if report.events:
+                client.insert(
+                    "anomaly_events",
+                    [
+                        (
+                            event.tx_hash,
+                            report.generated_at,
+                            event.event_time,
+                            event.chain_id,
+                            event.score,
+                            list(event.detectors),
+                            event.partition or "",
+                        )
+                        for event in report.events
+                    ],
+                    column_names=[
+                        "tx_hash",
+                        "generated_at",
+                        "event_time",
+                        "chain_id",
+                        "score",
+                        "detectors",
+                        "partition",
+                    ],
+                )
+
+    @traced("repository.query_rows")
+    def query_rows(self, query: str) -> list[tuple]:
+        with self._factory.connect() as client:
+            return list(client.query(query).result_rows)
+
+    @traced("repository.read_rollup_series")
+    def read_rollup_series(self, since: str = "1 DAY") -> pd.DataFrame:
+        """Поминутный ряд по сетям из rollup-таблицы: стоимость чтения не зависит от числа событий."""
+
+        query = f"""
+        SELECT
+            minute,
+            chain_id,
+            sum(events) AS events,
+            sum(value_sum) / sum(events) AS mean_value,
+            sum(gas_sum) / sum(events) AS mean_gas_used,
+            sum(high_calldata) / sum(events) AS high_calldata_ratio
+        FROM {ROLLUP_TABLE}
+        WHERE minute >= toStartOfMinute(now() - INTERVAL {since})
+        GROUP BY minute, chain_id
+        ORDER BY minute, chain_id
+        """
+        with self._factory.connect() as client:
+            return client.query_df(query)
+
+    @traced("repository.read_anomalous_events")
+    def read_anomalous_events(self, tx_hash: str) -> pd.DataFrame:
+        """Все попадания транзакции в топ аномалий — поиск по первичному ключу `anomaly_events`."""
+
+        query = "SELECT * FROM anomaly_events WHERE tx_hash = {tx_hash:String} ORDER BY generated_at"
+        with self._factory.connect() as client:
+            return client.query_df(query, parameters={"tx_hash": tx_hash})
+
+    @traced("repository.read_events_since")
+    def read_events_since(self, since: datetime | None) -> pd.DataFrame:
+        """События с `since` включительно (без него — за последние сутки), по порядку времени и блока."""
+
+        with self._factory.connect() as client:
+            if since is None:
+                return client.query_df(
+                    "SELECT * FROM events WHERE event_time >= now() - INTERVAL 1 DAY ORDER BY event_time, block_number"
+                )
+            return client.query_df(
+                "SELECT * FROM events WHERE event_time >= {since:DateTime} ORDER BY event_time, block_number",
+                parameters={"since": since},
+            )
 
+    @traced("repository.read_latest_window")
     def read_latest_window(self) -> pd.DataFrame:
         with self._factory.connect() as client:
             query = """
@@ -1,28 +1,72 @@
 from __future__ import annotations
 
+import io
 import json
+import mmap
 from pathlib import Path
 from typing import Iterator
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.json as pa_json
 from loguru import logger
 
-from pipeline_anomaly.domain.models.batch import RecordBatch
-from pipeline_anomaly.domain.services.interfaces import DatasetGenerator
+from pipeline_anomaly.domain.models.batch import EVENTS_SCHEMA, AnyRecordBatch, ArrowRecordBatch, RecordBatch
+from pipeline_anomaly.domain.services.interfaces import CheckpointedSource, DatasetGenerator
 from pipeline_anomaly.infrastructure.config import KafkaSourceConfig
+from pipeline_anomaly.infrastructure.state.json_file import JsonStateFile
 
+_NEWLINE = 0x0A
+_WHITESPACE = np.array([0x20, 0x09, 0x0A, 0x0D], dtype=np.uint8)
+_ARROW_PARSE_OPTIONS = pa_json.ParseOptions(explicit_schema=EVENTS_SCHEMA, unexpected_field_behavior="ignore")
 
-class KafkaBatchSource(DatasetGenerator):
-    """Читает newline-json файл и имитирует консьюмера Kafka."""
+Block = pd.DataFrame | pa.Table
+
+
+class KafkaBatchSource(DatasetGenerator, CheckpointedSource):
+    """Читает newline-json файл и имитирует консьюмера Kafka.
+
+    `reader: rows` — построчный разбор (исходное поведение).
+    `reader: columnar` — файл читается блоками по `block_size` байт (опционально через mmap),
+    каждый блок разбирается целиком, `event_time` конвертируется векторно. Если задан
+    `checkpoint_path`, после успешной вставки батча фиксируется байтовый оффсет, и
+    следующий запуск продолжает чтение с него. С `batch_format: arrow` блоки разбираются
+    `pyarrow.json` сразу в `EVENTS_SCHEMA`, и батчи (`ArrowRecordBatch`) не проходят через pandas.
+    """
 
     def __init__(self, config: KafkaSourceConfig) -> None:
         self._config = config
         self._path = Path(config.path)
         if not self._path.exists():
             raise FileNotFoundError(f"kafka mock file not found: {self._path}")
+        self._checkpoint = JsonStateFile(config.checkpoint_path) if config.checkpoint_path else None
+
+    def batches(self) -> Iterator[AnyRecordBatch]:
+        reader = (self._config.reader or "rows").lower()
+        if reader == "rows":
+            return self._iter_batches()
+        if reader == "columnar":
+            return self._iter_columnar_batches()
+        raise ValueError(f"unknown kafka reader {self._config.reader}")
 
-    def batches(self) -> list[RecordBatch]:
-        return list(self._iter_batches())
+    def commit(self, batch: AnyRecordBatch) -> None:
+        if self._checkpoint is None or batch.source_offset is None:
+            return
+        self._checkpoint.save({"path": str(self._path.resolve()), "offset": batch.source_offset})
+
+    def committed_offset(self) -> int:
+        if self._checkpoint is None:
+            return 0
+        state = self._checkpoint.load()
+        if not state or state.get("path") != str(self._path.resolve()):
+            return 0
+        offset = int(state["offset"])
+        size = self._path.stat().st_size
+        if offset > size:
+            logger.warning("kafka checkpoint offset {} is beyond file size {}, rereading from start", offset, size)
+            return 0
+        return offset
 
     def _iter_batches(self) -> Iterator[RecordBatch]:
         current_rows: list[dict[str, object]] = []
@@ -43,3 +87,96 @@ class KafkaBatchSource(DatasetGenerator):
         logger.info("kafka mock emitted {} rows", len(rows))
         dataframe = pd.DataFrame(rows)
         return RecordBatch(dataframe=dataframe)
+
+    def _iter_columnar_batches(self) -> Iterator[AnyRecordBatch]:
+        batch_size = self._config.batch_size
+        carry: Block | None = None
+        carry_ends = np.empty(0, dtype=np.int64)
+        for block, row_ends in self._iter_blocks(self.committed_offset()):
+            if carry is not None:
+                block = _concat(carry, block)
+                row_ends = np.concatenate([carry_ends, row_ends])
+            start = 0
+            while len(block) - start >= batch_size:
+                stop = start + batch_size
+                yield self._to_columnar_batch(_slice(block, start, stop), int(row_ends[stop - 1]))
+                start = stop
+            carry = _slice(block, start, len(block)) if start < len(block) else None
+            carry_ends = row_ends[start:]
+        if carry is not None:
+            yield self._to_columnar_batch(carry, int(carry_ends[-1]))
+
+    def _iter_blocks(self, start: int) -> Iterator[tuple[Block, np.ndarray]]:
+        size = self._path.stat().st_size
+        if start >= size:
+            return
+        with self._path.open("rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if self._config.mmap else None
+            try:
+                position = start
+                block_size = self._config.block_size
+                while position < size:
+                    block = self._read(file, mapped, position, block_size)
+                    at_eof = position + len(block) >= size
+                    cut = len(block) if at_eof else block.rfind(b"\n") + 1
+                    if cut == 0:
+                        block_size *= 2
+                        continue
+                    parsed = self._parse_block(block[:cut], position)
+                    if parsed is not None:
+                        yield parsed
+                    position += cut
+                    block_size = self._config.block_size
+            finally:
+                if mapped is not None:
+                    mapped.close()
+
+    @staticmethod
+    def _read(file: io.BufferedReader, mapped: mmap.mmap | None, position: int, length: int) -> bytes:
+        if mapped is not None:
+            return mapped[position : position + length]
+        file.seek(position)
+        return file.read(length)
+
+    def _parse_block(self, block: bytes, base_offset: int) -> tuple[Block, np.ndarray] | None:
+        raw = np.frombuffer(block, dtype=np.uint8)
+        ends = np.flatnonzero(raw == _NEWLINE) + 1
+        if not len(ends) or ends[-1] != len(block):
+            ends = np.append(ends, len(block))
+        starts = np.concatenate(([0], ends[:-1]))
+        # строка без единого непробельного байта (пустая, из пробелов, одиночный `\r`) пропускается,
+        # как в построчном ридере; `\r` перед `\n` JSON-парсеры считают пробелом
+        visible = np.concatenate(([0], np.cumsum(~np.isin(raw, _WHITESPACE))))
+        has_content = visible[ends] > visible[starts]
+        row_ends = ends[has_content] + base_offset
+        if not len(row_ends):
+            return None
+        if not has_content.all():
+            block = raw[np.repeat(has_content, ends - starts)].tobytes()
+        parsed: Block
+        if self._config.batch_format == "arrow":
+            parsed = pa_json.read_json(io.BytesIO(block), parse_options=_ARROW_PARSE_OPTIONS)
+        else:
+            parsed = pd.read_json(io.BytesIO(block), lines=True, convert_dates=False)
+            parsed["event_time"] = pd.to_datetime(parsed["event_time"], utc=True, format="ISO8601")
+        if len(parsed) != len(row_ends):
+            raise ValueError(f"kafka mock block at offset {base_offset} has malformed lines")
+        return parsed, row_ends.astype(np.int64)
+
+    def _to_columnar_batch(self, block: Block, source_offset: int) -> AnyRecordBatch:
+        logger.info("kafka mock emitted {} rows", len(block))
+        if isinstance(block, pa.Table):
+            return ArrowRecordBatch(table=block, source_offset=source_offset)
+        return RecordBatch(dataframe=block.reset_index(drop=True), source_offset=source_offset)
+
+
+def _slice(block: Block, start: int, stop: int) -> Block:
+    if isinstance(block, pa.Table):
+        return block.slice(start, stop - start)
+    return block.iloc[start:stop]
+
+
+def _concat(head: Block, tail: Block) -> Block:
+    if isinstance(head, pa.Table):
+        return pa.concat_tables([head, tail])
+    return pd.concat([head, tail], ignore_index=True)
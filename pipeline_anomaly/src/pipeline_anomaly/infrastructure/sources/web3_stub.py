@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from collections.abc import Iterator
+
 from loguru import logger
 
 from pipeline_anomaly.domain.models.batch import RecordBatch
@@ -22,8 +24,8 @@ class Web3DatasetSource(DatasetGenerator):
         )
         return []
 
-    def batches(self) -> list[RecordBatch]:
+    def batches(self) -> Iterator[RecordBatch]:
         logger.warning(
             "web3 dataset source is a stub – returning no records. Configure a real Web3 connector to enable ingestion."
         )
-        return []
+        return iter(())
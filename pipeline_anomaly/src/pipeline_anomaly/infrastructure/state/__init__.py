@@ -0,0 +1 @@
+"""Persisted pipeline state (checkpoints, indexes, detector state)."""
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Mapping
+
+
+class JsonStateFile:
+    """JSON-состояние на диске; запись атомарная (tmp-файл + rename)."""
+
+    def __init__(self, path: Path | str) -> None:
+        self._path = Path(path)
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def load(self) -> dict[str, Any]:
+        if not self._path.exists():
+            return {}
+        with self._path.open("r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def save(self, payload: Mapping[str, Any]) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._path.with_name(f".{self._path.name}.tmp")
+        with tmp_path.open("w", encoding="utf-8") as file:
+            json.dump(payload, file, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self._path)
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from pipeline_anomaly.domain.models.watermark import Watermark
+from pipeline_anomaly.infrastructure.state.json_file import JsonStateFile
+
+
+class JsonWatermarkStore:
+    """Водяные знаки пайплайнов в одном JSON-файле: `{pipeline: {event_time, block_number}}`."""
+
+    def __init__(self, path: Path | str) -> None:
+        self._file = JsonStateFile(path)
+
+    def load(self, pipeline: str) -> Watermark | None:
+        payload = self._file.load().get(pipeline)
+        return Watermark.from_dict(payload) if payload else None
+
+    def save(self, pipeline: str, watermark: Watermark) -> None:
+        payload = self._file.load()
+        payload[pipeline] = watermark.to_dict()
+        self._file.save(payload)
@@ -1,114 +1,457 @@
+from __future__ import annotations
+
+import signal
+from datetime import timedelta
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 import typer
 
-from pipeline_anomaly.application.use_cases.compute_aggregates import ComputeAggregates
-from pipeline_anomaly.application.use_cases.detect_anomalies import DetectAnomalies
-from pipeline_anomaly.application.use_cases.load_dataset import LoadSyntheticDataset
-from pipeline_anomaly.application.use_cases.run_pipeline import RunPipeline
-from pipeline_anomaly.domain.services.interfaces import AlertSink, DatasetGenerator
-from pipeline_anomaly.infrastructure.alerting.http_sink import HttpAlertSink
-from pipeline_anomaly.infrastructure.alerting.slack_sink import SlackAlertSink
-from pipeline_anomaly.infrastructure.alerting.stdout_sink import StdOutAlertSink
-from pipeline_anomaly.infrastructure.clients.clickhouse import ClickHouseFactory
-from pipeline_anomaly.infrastructure.config import PipelineConfig
-from pipeline_anomaly.infrastructure.data_quality.pandas_checker import PandasDataQualityChecker
-from pipeline_anomaly.infrastructure.detectors.dbscan import DBSCANDetector
-from pipeline_anomaly.infrastructure.detectors.hdbscan import HDBSCANDetector
-from pipeline_anomaly.infrastructure.detectors.iqr import IQRDetector
-from pipeline_anomaly.infrastructure.detectors.isolation_forest import IsolationForestDetector
-from pipeline_anomaly.infrastructure.detectors.zscore import ZScoreDetector
-from pipeline_anomaly.infrastructure.generators.synthetic_generator import SyntheticDatasetGenerator
-from pipeline_anomaly.infrastructure.repositories.clickhouse_repository import ClickHouseRepository
-from pipeline_anomaly.infrastructure.sources.kafka_file_source import KafkaBatchSource
-from pipeline_anomaly.infrastructure.sources.web3_stub import Web3DatasetSource
-
-
-def _build_pipeline(cfg: PipelineConfig) -> RunPipeline:
-    factory = ClickHouseFactory(
+# Модули пайплайна импортируются в тех ветках сборки, которые их используют:
+# `--help` и конфиг с выключенными режимами не тянут pandas/pyarrow, sklearn, пул процессов и экспорт метрик.
+if TYPE_CHECKING:
+    from pipeline_anomaly.application.services.cascade import DetectionCascade
+    from pipeline_anomaly.application.services.streaming_monitor import StreamingAnomalyMonitor
+    from pipeline_anomaly.application.services.watermark_window import WatermarkWindowReader
+    from pipeline_anomaly.application.use_cases.run_pipeline import RunPipeline
+    from pipeline_anomaly.domain.services.interfaces import (
+        AggregationEngine,
+        AlertSink,
+        AnomalyDetector,
+        DatasetGenerator,
+        DetectorRunner,
+        FittableDetector,
+        WindowSeriesEngine,
+    )
+    from pipeline_anomaly.domain.services.tracing import Tracer
+    from pipeline_anomaly.infrastructure.clients.clickhouse import ClickHouseFactory
+    from pipeline_anomaly.infrastructure.config import PipelineConfig
+    from pipeline_anomaly.infrastructure.data_quality.pandas_checker import PandasDataQualityChecker
+    from pipeline_anomaly.infrastructure.detectors.sampling import DensitySample
+    from pipeline_anomaly.infrastructure.observability.prometheus import PrometheusExporter
+    from pipeline_anomaly.infrastructure.repositories.clickhouse_repository import ClickHouseRepository
+
+
+def _seconds(duration: str) -> float:
+    import pandas as pd
+
+    return pd.to_timedelta(duration).total_seconds()
+
+
+def _build_factory(cfg: PipelineConfig) -> ClickHouseFactory:
+    from pipeline_anomaly.infrastructure.clients.clickhouse import ClickHouseFactory
+
+    return ClickHouseFactory(
         host=cfg.clickhouse.host,
         port=cfg.clickhouse.port,
         username=cfg.clickhouse.username,
         password=cfg.clickhouse.password,
         database=cfg.clickhouse.database,
+        pool_size=cfg.clickhouse.pool_size,
+        idle_timeout=cfg.clickhouse.pool_idle_timeout,
+        health_check_interval=cfg.clickhouse.pool_health_check_interval,
     )
-    repository = ClickHouseRepository(factory=factory)
 
-    generator = _build_generator(cfg)
-    quality_checker = None
-    if cfg.quality.dedup_keys or cfg.quality.required_columns:
-        quality_checker = PandasDataQualityChecker(
-            dedup_keys=cfg.quality.dedup_keys,
-            required_columns=cfg.quality.required_columns,
+
+def _build_quality_checker(cfg: PipelineConfig) -> PandasDataQualityChecker | None:
+    if not (cfg.quality.dedup_keys or cfg.quality.required_columns):
+        return None
+    from pipeline_anomaly.infrastructure.data_quality.pandas_checker import PandasDataQualityChecker
+
+    dedup_index = None
+    index_cfg = cfg.quality.dedup_index
+    if index_cfg is not None and cfg.quality.dedup_keys:
+        from pipeline_anomaly.infrastructure.data_quality.dedup_index import TimePartitionedDedupIndex
+
+        dedup_index = TimePartitionedDedupIndex(
+            partition_seconds=int(_seconds(index_cfg.partition)),
+            ttl_seconds=int(_seconds(index_cfg.ttl)),
+            expected_items_per_partition=index_cfg.expected_items_per_partition,
+            false_positive_rate=index_cfg.false_positive_rate,
+            path=index_cfg.path,
         )
-    loader = LoadSyntheticDataset(generator=generator, writer=repository, quality_checker=quality_checker)
-    aggregator = ComputeAggregates(writer=repository, windows=cfg.features.windows)
-
-    detectors = [
-        ZScoreDetector(threshold=cfg.anomaly_detection.zscore_threshold),
-        IQRDetector(),
-        IsolationForestDetector(
-            contamination=cfg.anomaly_detection.isolation_forest.contamination,
-            random_state=cfg.anomaly_detection.isolation_forest.random_state,
-        ),
-        DBSCANDetector(
-            eps=cfg.anomaly_detection.dbscan.eps,
-            min_samples=cfg.anomaly_detection.dbscan.min_samples,
+    return PandasDataQualityChecker(
+        dedup_keys=cfg.quality.dedup_keys,
+        required_columns=cfg.quality.required_columns,
+        dedup_index=dedup_index,
+    )
+
+
+def _build_aggregation_engine(cfg: PipelineConfig, repository: ClickHouseRepository) -> AggregationEngine | None:
+    engine = cfg.features.engine.lower()
+    if engine == "pandas":
+        return None
+    if engine == "clickhouse":
+        from pipeline_anomaly.infrastructure.aggregation.clickhouse_pushdown import ClickHousePushdownEngine
+
+        return ClickHousePushdownEngine(executor=repository)
+    if engine == "rollup":
+        from pipeline_anomaly.infrastructure.aggregation.rollup import ClickHouseRollupEngine
+
+        return ClickHouseRollupEngine(executor=repository)
+    if engine == "incremental":
+        from pipeline_anomaly.infrastructure.aggregation.incremental import IncrementalAggregationEngine
+
+        incremental = cfg.features.incremental
+        return IncrementalAggregationEngine(
+            bucket_seconds=int(_seconds(incremental.bucket)),
+            horizon_seconds=int(_seconds(incremental.horizon)),
+            relative_accuracy=incremental.relative_accuracy,
+            state_path=incremental.state_path,
+        )
+    raise ValueError(f"unknown aggregation engine {cfg.features.engine}")
+
+
+def _build_detector_runner(cfg: PipelineConfig) -> DetectorRunner | None:
+    execution = cfg.anomaly_detection.execution
+    mode = execution.mode.lower()
+    if mode == "sequential":
+        return None
+    if mode == "parallel":
+        from pipeline_anomaly.infrastructure.detectors.parallel import ProcessPoolDetectorRunner
+
+        return ProcessPoolDetectorRunner(
+            workers=execution.workers,
+            default_timeout=execution.timeout_seconds,
+            timeouts=execution.timeouts,
+            start_method=execution.start_method,
+        )
+    raise ValueError(f"unknown detection execution mode {execution.mode}")
+
+
+def _build_watermarks(cfg: PipelineConfig, repository: ClickHouseRepository) -> WatermarkWindowReader | None:
+    if not cfg.watermark.enabled:
+        return None
+    from pipeline_anomaly.application.services.watermark_window import WatermarkWindowReader
+    from pipeline_anomaly.infrastructure.state.watermarks import JsonWatermarkStore
+
+    return WatermarkWindowReader(
+        reader=repository,
+        store=JsonWatermarkStore(cfg.watermark.path),
+        pipeline=cfg.watermark.pipeline,
+        overlap=timedelta(seconds=_seconds(cfg.watermark.overlap)),
+    )
+
+
+def _build_cascade(cfg: PipelineConfig) -> DetectionCascade | None:
+    cascade = cfg.anomaly_detection.cascade
+    if not cascade.enabled:
+        return None
+    from pipeline_anomaly.application.services.cascade import DetectionCascade
+    from pipeline_anomaly.infrastructure.state.json_file import JsonStateFile
+
+    return DetectionCascade(
+        triggers=cascade.triggers,
+        safety_every_runs=cascade.safety_every_runs,
+        state=JsonStateFile(cascade.state_path) if cascade.state_path else None,
+    )
+
+
+def _with_model_cache(cfg: PipelineConfig, detector: FittableDetector) -> AnomalyDetector:
+    cache_cfg = cfg.anomaly_detection.model_cache
+    if cache_cfg is None:
+        return detector
+    from pipeline_anomaly.infrastructure.detectors.lifecycle import (
+        CachedModelDetector,
+        DetectorModelCache,
+        RetrainPolicy,
+    )
+
+    return CachedModelDetector(
+        detector=detector,
+        cache=DetectorModelCache(cache_cfg.path),
+        policy=RetrainPolicy(
+            every_runs=cache_cfg.retrain_every_runs,
+            max_age_seconds=_seconds(cache_cfg.max_age) if cache_cfg.max_age else 0.0,
+            drift_threshold=cache_cfg.drift_threshold,
         ),
-    ]
-    if cfg.anomaly_detection.hdbscan and cfg.anomaly_detection.hdbscan.enabled:
-        detectors.append(
-            HDBSCANDetector(
-                min_cluster_size=cfg.anomaly_detection.hdbscan.min_cluster_size,
-                min_samples=cfg.anomaly_detection.hdbscan.min_samples,
-            )
+    )
+
+
+def _build_detectors(cfg: PipelineConfig) -> list[AnomalyDetector]:
+    names = list(cfg.anomaly_detection.detectors)
+    if cfg.anomaly_detection.hdbscan and cfg.anomaly_detection.hdbscan.enabled and "hdbscan" not in names:
+        names.append("hdbscan")
+    return [_build_detector(cfg, name) for name in names]
+
+
+def _build_detector(cfg: PipelineConfig, name: str) -> AnomalyDetector:
+    from pipeline_anomaly.infrastructure.plugins import DETECTORS
+
+    detection = cfg.anomaly_detection
+    detector_cls = DETECTORS.resolve(name)
+    if name == "zscore":
+        return detector_cls(threshold=detection.zscore_threshold)
+    if name == "iqr":
+        return detector_cls()
+    if name == "isolation_forest":
+        return _with_model_cache(
+            cfg,
+            detector_cls(
+                contamination=detection.isolation_forest.contamination,
+                random_state=detection.isolation_forest.random_state,
+            ),
+        )
+    if name == "dbscan":
+        return detector_cls(
+            eps=detection.dbscan.eps,
+            min_samples=detection.dbscan.min_samples,
+            sample=_density_sample(detection.dbscan.sample_size, detection.dbscan.chunk_size),
+        )
+    if name == "hdbscan":
+        if detection.hdbscan is None:
+            raise ValueError("hdbscan detector requested but hdbscan config missing")
+        return detector_cls(
+            min_cluster_size=detection.hdbscan.min_cluster_size,
+            min_samples=detection.hdbscan.min_samples,
+            sample=_density_sample(detection.hdbscan.sample_size, detection.hdbscan.chunk_size),
         )
+    return detector_cls(**detection.detector_options.get(name, {}))
+
+
+def _density_sample(sample_size: int, chunk_size: int) -> DensitySample | None:
+    if sample_size <= 0:
+        return None
+    from pipeline_anomaly.infrastructure.detectors.sampling import DensitySample
+
+    return DensitySample(size=sample_size, chunk_size=chunk_size)
+
+
+def _build_streaming_monitor(
+    cfg: PipelineConfig, repository: ClickHouseRepository, sink: AlertSink
+) -> StreamingAnomalyMonitor:
+    from pipeline_anomaly.application.services.streaming_monitor import StreamingAnomalyMonitor
+    from pipeline_anomaly.infrastructure.detectors.online import OnlineIQRDetector, OnlineZScoreDetector
+    from pipeline_anomaly.infrastructure.state.json_file import JsonStateFile
+
+    streaming = cfg.anomaly_detection.streaming
+    return StreamingAnomalyMonitor(
+        detectors=[
+            OnlineZScoreDetector(
+                threshold=streaming.zscore_threshold,
+                min_history=streaming.min_history,
+                half_life_rows=streaming.half_life_rows,
+            ),
+            OnlineIQRDetector(
+                multiplier=streaming.iqr_multiplier,
+                min_history=streaming.min_history,
+                half_life_rows=streaming.half_life_rows,
+            ),
+        ],
+        alert_sink=sink if cfg.alerting.enabled else None,
+        alert_threshold=streaming.alert_threshold,
+        event_threshold=streaming.event_threshold,
+        state=JsonStateFile(streaming.state_path) if streaming.state_path else None,
+        writer=repository,
+    )
+
+
+def _build_metrics(cfg: PipelineConfig) -> PrometheusExporter | None:
+    if not cfg.metrics.enabled:
+        return None
+    from pipeline_anomaly.infrastructure.observability.prometheus import PrometheusExporter
+
+    return PrometheusExporter()
+
+
+def _push_metrics(cfg: PipelineConfig, exporter: PrometheusExporter | None) -> None:
+    if exporter is not None and cfg.metrics.pushgateway_url:
+        exporter.push(cfg.metrics.pushgateway_url, cfg.metrics.job)
+
+
+def _build_pipeline(cfg: PipelineConfig, factory: ClickHouseFactory, tracer: Tracer | None = None) -> RunPipeline:
+    from pipeline_anomaly.application.services.window_snapshot import WindowSnapshot
+    from pipeline_anomaly.application.use_cases.compute_aggregates import ComputeAggregates
+    from pipeline_anomaly.application.use_cases.detect_anomalies import DetectAnomalies
+    from pipeline_anomaly.application.use_cases.load_dataset import LoadSyntheticDataset
+    from pipeline_anomaly.application.use_cases.run_pipeline import RunPipeline
+    from pipeline_anomaly.domain.services.interfaces import BatchObserver
+    from pipeline_anomaly.infrastructure.repositories.clickhouse_repository import ClickHouseRepository
+
+    repository = ClickHouseRepository(factory=factory, tracer=tracer)
+
+    generator = _build_generator(cfg)
+    quality_checker = _build_quality_checker(cfg)
+    engine = _build_aggregation_engine(cfg, repository)
+    sink = _build_alert_sink(cfg)
+    observers: list[BatchObserver] = []
+    if cfg.features.engine.lower() == "incremental":
+        observers.append(engine)
+    if cfg.anomaly_detection.streaming.enabled:
+        observers.append(_build_streaming_monitor(cfg, repository, sink))
+    loader = LoadSyntheticDataset(
+        generator=generator,
+        writer=repository,
+        quality_checker=quality_checker,
+        max_in_flight_batches=cfg.ingestion.max_in_flight_batches,
+        insert_workers=cfg.ingestion.insert_workers,
+        observers=observers,
+        tracer=tracer,
+    )
+    watermarks = _build_watermarks(cfg, repository)
+    window_snapshot = WindowSnapshot(reader=watermarks or repository)
+    aggregator = ComputeAggregates(
+        writer=repository,
+        windows=cfg.features.windows,
+        window_source=window_snapshot,
+        engine=engine,
+        series_engine=_build_series_engine(cfg),
+        delta=watermarks,
+    )
+
+    detectors = _build_detectors(cfg)
     detector = DetectAnomalies(
         writer=repository,
         detectors=detectors,
         threshold=cfg.alerting.threshold_score,
+        window_source=window_snapshot,
+        runner=_build_detector_runner(cfg),
+        partition_by=cfg.anomaly_detection.execution.partition_by,
+        min_partition_rows=cfg.anomaly_detection.execution.min_partition_rows,
+        top_k=cfg.anomaly_detection.top_k_events,
+        cascade=_build_cascade(cfg),
+        delta=watermarks,
     )
 
-    sink = _build_alert_sink(cfg)
     pipeline = RunPipeline(
         loader=loader,
         aggregator=aggregator,
         detector=detector,
         alert_sink=sink,
         alerts_enabled=cfg.alerting.enabled,
+        window_snapshot=window_snapshot,
+        watermarks=watermarks,
+        tracer=tracer,
     )
     return pipeline
 
 
+def _build_series_engine(cfg: PipelineConfig) -> WindowSeriesEngine | None:
+    if not cfg.features.series:
+        return None
+    from pipeline_anomaly.infrastructure.aggregation.windowing import MultiWindowEngine
+
+    return MultiWindowEngine(cfg.features.series)
+
+
 def _build_generator(cfg: PipelineConfig) -> DatasetGenerator:
+    from pipeline_anomaly.infrastructure.plugins import SOURCES
+
     source_type = (cfg.source.type or "synthetic").lower()
+    source_cls = SOURCES.resolve(source_type)
     if source_type == "kafka":
         if not cfg.source.kafka:
             raise ValueError("kafka source requested but kafka config missing")
-        return KafkaBatchSource(cfg.source.kafka)
+        return source_cls(cfg.source.kafka)
     if source_type == "web3":
         if not cfg.source.web3:
             raise ValueError("web3 source requested but web3 config missing")
-        return Web3DatasetSource(cfg.source.web3)
-    return SyntheticDatasetGenerator(config=cfg.dataset)
+        return source_cls(cfg.source.web3)
+    if source_type == "synthetic":
+        return source_cls(config=cfg.dataset)
+    return source_cls(**cfg.source.options)
 
 
 def _build_alert_sink(cfg: PipelineConfig) -> AlertSink:
-    sink_type = (cfg.alerting.sink or "stdout").lower()
+    from pipeline_anomaly.infrastructure.plugins import ALERT_SINKS
+
+    # при выключенных алертах sink не вызывается — не тянем его зависимости
+    sink_type = (cfg.alerting.sink or "stdout").lower() if cfg.alerting.enabled else "stdout"
+    sink_cls = ALERT_SINKS.resolve(sink_type)
     if sink_type == "http":
-        return HttpAlertSink(url=cfg.alerting.webhook_url or "")
+        return sink_cls(url=cfg.alerting.webhook_url or "")
     if sink_type == "slack":
-        return SlackAlertSink(
+        return sink_cls(
             webhook_url=cfg.alerting.webhook_url or "",
             channel=cfg.alerting.channel,
         )
-    return StdOutAlertSink()
+    if sink_type == "stdout":
+        return sink_cls()
+    return sink_cls(**cfg.alerting.options)
+
+
+def _build_tracer(metrics: PrometheusExporter | None) -> Tracer:
+    from pipeline_anomaly.domain.services.tracing import Tracer
+
+    if metrics is None:
+        # без экспорта спаны нужны только для дерева таймингов в логе — пик памяти не замеряется
+        return Tracer()
+    from pipeline_anomaly.infrastructure.observability.memory import peak_rss_bytes, reset_peak_rss
+
+    return Tracer(exporters=[metrics], peak_rss=peak_rss_bytes, reset_peak=reset_peak_rss)
 
 
 def run_pipeline(config: Path) -> None:
+    from pipeline_anomaly.infrastructure.config import PipelineConfig
+
     cfg = PipelineConfig.load(config)
-    pipeline = _build_pipeline(cfg)
-    pipeline.execute()
+    factory = _build_factory(cfg)
+    metrics = _build_metrics(cfg)
+    tracer = _build_tracer(metrics)
+    try:
+        pipeline = _build_pipeline(cfg, factory, tracer)
+        try:
+            pipeline.execute()
+        finally:
+            pipeline.close()
+    finally:
+        _push_metrics(cfg, metrics)
+        factory.close()
+
+
+def _daemon_config(cfg: PipelineConfig) -> PipelineConfig:
+    """Конфиг резидентного режима: окно водяного знака и кэш моделей включены всегда.
+
+    Без них каждый микробатч перечитывал бы суточное окно и заново обучал детекторы —
+    дороже ежечасного запуска, который демон заменяет.
+    """
+
+    from dataclasses import replace
+
+    from loguru import logger
+
+    from pipeline_anomaly.infrastructure.config import ModelCacheConfig
+
+    if not cfg.watermark.enabled:
+        logger.warning("daemon mode reads only new events: enabling watermark at {}", cfg.watermark.path)
+        cfg = replace(cfg, watermark=replace(cfg.watermark, enabled=True))
+    if cfg.anomaly_detection.model_cache is None:
+        logger.warning(
+            "daemon mode keeps fitted models between micro-batches: caching them in {}", cfg.daemon.model_cache_path
+        )
+        cache = ModelCacheConfig(path=cfg.daemon.model_cache_path)
+        cfg = replace(cfg, anomaly_detection=replace(cfg.anomaly_detection, model_cache=cache))
+    return cfg
+
+
+def run_daemon(config: Path) -> None:
+    from pipeline_anomaly.application.use_cases.run_micro_batches import MicroBatchScheduler
+    from pipeline_anomaly.infrastructure.config import PipelineConfig
+
+    cfg = _daemon_config(PipelineConfig.load(config))
+    factory = _build_factory(cfg)
+    metrics = _build_metrics(cfg)
+    if metrics is not None and cfg.metrics.port:
+        metrics.serve(cfg.metrics.port)
+    tracer = _build_tracer(metrics)
+    try:
+        pipeline = _build_pipeline(cfg, factory, tracer)
+        scheduler = MicroBatchScheduler(
+            pipeline=pipeline,
+            interval_seconds=_seconds(cfg.daemon.interval),
+            max_rows=cfg.daemon.max_rows,
+            poll_seconds=_seconds(cfg.daemon.poll_interval),
+        )
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, lambda *_: scheduler.stop())
+        try:
+            scheduler.run()
+        finally:
+            pipeline.close()
+    finally:
+        if metrics is not None:
+            metrics.close()
+        factory.close()
 
 
 def main(
@@ -118,11 +461,19 @@ def main(
         "-c",
         help="Path to pipeline config YAML",
         show_default=True,
-    )
+    ),
+    daemon: bool = typer.Option(
+        False,
+        "--daemon",
+        help="Run as a resident service with the micro-batch scheduler from the `daemon` config section",
+    ),
 ) -> None:
     if not config.exists():
         raise typer.BadParameter(f"config file not found: {config}")
-    run_pipeline(config)
+    if daemon:
+        run_daemon(config)
+    else:
+        run_pipeline(config)
 
 
 if __name__ == "__main__":
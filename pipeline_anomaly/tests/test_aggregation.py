@@ -0,0 +1,178 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline_anomaly.application.use_cases.compute_aggregates import ComputeAggregates
+from pipeline_anomaly.infrastructure.aggregation.clickhouse_pushdown import ClickHousePushdownEngine
+from pipeline_anomaly.infrastructure.aggregation.incremental import IncrementalAggregationEngine
+from pipeline_anomaly.infrastructure.aggregation.rollup import ClickHouseRollupEngine
+from pipeline_anomaly.infrastructure.aggregation.sketch import QuantileSketch
+from pipeline_anomaly.infrastructure.aggregation.windowing import MultiWindowEngine
+from pipeline_anomaly.infrastructure.generators.synthetic_generator import (
+    SyntheticDatasetConfig,
+    SyntheticDatasetGenerator,
+)
+
+
+class _FrameWriter:
+    def __init__(self, frame: pd.DataFrame) -> None:
+        self._frame = frame
+
+    def read_latest_window(self) -> pd.DataFrame:
+        return self._frame
+
+    def persist_aggregates(self, aggregates) -> None:
+        pass
+
+
+def test_quantile_sketch_merge_matches_relative_accuracy():
+    rng = np.random.default_rng(7)
+    values = rng.lognormal(mean=3.0, sigma=1.0, size=20_000)
+    left, right = QuantileSketch(0.01), QuantileSketch(0.01)
+    left.add(values[:12_000])
+    right.add(values[12_000:])
+    left.merge(QuantileSketch.from_dict(right.to_dict()))
+
+    for q in (0.05, 0.5, 0.95):
+        assert left.quantile(q) == pytest.approx(np.quantile(values, q), rel=0.03)
+
+
+@pytest.mark.parametrize("batch_format", ["pandas", "arrow"])
+def test_incremental_engine_matches_pandas_metrics(tmp_path, batch_format):
+    config = SyntheticDatasetConfig(
+        row_count=6_000, batch_size=1_000, anomaly_ratio=0.05, seed=3, mode="vectorized", batch_format=batch_format
+    )
+    batches = list(SyntheticDatasetGenerator(config).batches())
+    frame = pd.concat([batch.dataframe for batch in batches], ignore_index=True)
+    now = pd.Timestamp(frame["event_time"].max()).timestamp() + 1
+
+    engine = IncrementalAggregationEngine(state_path=tmp_path / "aggregates.json", clock=lambda: now)
+    for batch in batches:
+        engine.observe(batch)
+    engine.flush()
+    restored = IncrementalAggregationEngine(state_path=tmp_path / "aggregates.json", clock=lambda: now)
+
+    windows = ("5m", "1h")
+    expected = {row["metric"]: row["value"] for row in ComputeAggregates(_FrameWriter(frame), windows).execute().as_dict()}
+    actual = {row["metric"]: row["value"] for row in restored.compute(windows).as_dict()}
+
+    assert set(actual) == set(expected)
+    for metric in ("count", "count_chain_1", "high_calldata_ratio"):
+        assert actual[metric] == pytest.approx(expected[metric])
+    for metric in ("mean_value", "std_value", "mean_gas_used", "mean_value_chain_137"):
+        assert actual[metric] == pytest.approx(expected[metric], rel=1e-9)
+    for metric in ("p95_value", "p05_value", "median_calldata"):
+        assert actual[metric] == pytest.approx(expected[metric], rel=0.03)
+    # окна собираются из целых бакетов: граничный бакет попадает целиком
+    assert expected["count_last_1h"] <= actual["count_last_1h"] <= expected["count_last_1h"] + 60
+
+
+class _CannedExecutor:
+    def __init__(self, summary: tuple, chains: list[tuple]) -> None:
+        self._summary = summary
+        self._chains = chains
+        self.queries: list[str] = []
+
+    def query_rows(self, query: str) -> list[tuple]:
+        self.queries.append(query)
+        return self._chains if "GROUP BY chain_id" in query else [self._summary]
+
+
+def test_pushdown_engine_compiles_metrics_into_two_queries():
+    start, end = datetime(2024, 1, 1, 0, 0), datetime(2024, 1, 1, 0, 4)
+    summary = (2, start, end, 150.0, 70.7, [195.0, 105.0], 31500.0, [1088.0], 0.5, 2, 150.0, start)
+    executor = _CannedExecutor(summary, chains=[(1, 1, 100.0), (137, 1, 200.0)])
+
+    result = ClickHousePushdownEngine(executor).compute(("5m",))
+
+    assert len(executor.queries) == 2
+    assert "quantilesTDigest(0.95, 0.05)(value)" in executor.queries[0]
+    assert "countIf(event_time >= window_end - INTERVAL 300 SECOND)" in executor.queries[0]
+    metrics = {row["metric"]: row["value"] for row in result.as_dict()}
+    assert metrics["p95_value"] == pytest.approx(195.0)
+    assert metrics["median_calldata"] == pytest.approx(1088.0)
+    assert metrics["mean_value_chain_137"] == pytest.approx(200.0)
+    assert metrics["count_last_5m"] == pytest.approx(2.0)
+
+
+def test_rollup_engine_reads_only_rollup_states():
+    start, end = datetime(2024, 1, 1, 0, 0), datetime(2024, 1, 1, 0, 4)
+    summary = (2, start, end, 150.0, 70.7, [195.0, 105.0], 31500.0, [1088.0], 0.5, 2, 150.0, start)
+    executor = _CannedExecutor(summary, chains=[(1, 1, 100.0), (137, 1, 200.0)])
+
+    result = ClickHouseRollupEngine(executor).compute(("5m",))
+
+    assert all("FROM events_rollup_1m" in query for query in executor.queries)
+    assert "quantilesTDigestMerge(0.95, 0.05)(value_quantiles)" in executor.queries[0]
+    assert "sumIf(events, minute >= toStartOfMinute(window_end - INTERVAL 300 SECOND))" in executor.queries[0]
+    assert {row["metric"] for row in result.as_dict()} >= {"count", "p95_value", "count_chain_137", "count_last_5m"}
+
+
+class _ChdbExecutor:
+    def __init__(self, session) -> None:
+        self._session = session
+
+    def query_rows(self, query: str) -> list[tuple]:
+        result = self._session.query(query, "JSONCompact")
+        return [tuple(row) for row in json.loads(bytes(result.bytes()))["data"]]
+
+
+@pytest.mark.parametrize(
+    ("quantile_function", "quantile_tolerance"),
+    [
+        # точные квантили с линейной интерполяцией — как у pandas
+        ("quantilesExactInclusive", 1e-6),
+        # p95 попадает на границу нормальных и аномальных значений, где t-digest грубее всего
+        ("quantilesTDigest", 0.1),
+    ],
+)
+def test_pushdown_engine_matches_pandas_engine_on_chdb(quantile_function, quantile_tolerance):
+    session_module = pytest.importorskip("chdb.session")
+    config = SyntheticDatasetConfig(row_count=5_000, batch_size=5_000, anomaly_ratio=0.05, seed=11, mode="vectorized")
+    frame = next(iter(SyntheticDatasetGenerator(config).batches())).dataframe
+
+    session = session_module.Session()
+    session.query("CREATE DATABASE IF NOT EXISTS parity")
+    session.query("DROP TABLE IF EXISTS parity.events")
+    session.query(
+        "CREATE TABLE parity.events (event_time DateTime, chain_id UInt16, value Float64, "
+        "gas_used Float64, calldata_size UInt32) ENGINE = MergeTree ORDER BY event_time"
+    )
+    rows = frame[["event_time", "chain_id", "value", "gas_used", "calldata_size"]].assign(
+        event_time=frame["event_time"].dt.strftime("%Y-%m-%d %H:%M:%S")
+    )
+    session.query(f"INSERT INTO parity.events FORMAT JSONEachRow {rows.to_json(orient='records', lines=True)}")
+
+    windows = ("5m", "1h")
+    engine = ClickHousePushdownEngine(
+        _ChdbExecutor(session), table="parity.events", horizon="100 YEAR", quantile_function=quantile_function
+    )
+    actual = {row["metric"]: row["value"] for row in engine.compute(windows).as_dict()}
+    expected = {row["metric"]: row["value"] for row in ComputeAggregates(_FrameWriter(frame), windows).execute().as_dict()}
+
+    assert set(actual) == set(expected)
+    for metric, value in expected.items():
+        tolerance = quantile_tolerance if metric in {"p95_value", "p05_value", "median_calldata"} else 1e-6
+        assert actual[metric] == pytest.approx(value, rel=tolerance), metric
+
+
+def test_multi_window_engine_matches_brute_force_per_chain():
+    config = SyntheticDatasetConfig(row_count=3_000, batch_size=3_000, anomaly_ratio=0.05, seed=5, mode="vectorized")
+    frame = next(iter(SyntheticDatasetGenerator(config).batches())).dataframe
+    frame = frame.sort_values("event_time", ignore_index=True)
+
+    series = MultiWindowEngine(["5m", "30m/10m"]).series(frame)
+
+    sample = series[(series["window"] == "30m/10m") & (series["chain_id"] == 137)].iloc[2]
+    chain = frame[frame["chain_id"] == 137]
+    inside = chain[(chain["event_time"] >= sample["window_start"]) & (chain["event_time"] < sample["window_end"])]
+    assert sample["count"] == len(inside)
+    assert sample["mean_value"] == pytest.approx(inside["value"].mean())
+    assert sample["window_end"] - sample["window_start"] == pd.Timedelta("30m")
+
+    tumbling = series[(series["window"] == "5m") & series["chain_id"].isna()]
+    assert tumbling["count"].sum() == len(frame)
+    assert (tumbling["window_end"].diff().dropna() == pd.Timedelta("5m")).all()
@@ -0,0 +1,44 @@
+from benchmarks.__main__ import compare_results
+from benchmarks.measure import measure
+from benchmarks.stages import STAGES, AgreementRun, Workload
+
+
+FIELDS = ("stage", "rows", "seconds", "rows_per_second", "peak_memory_bytes")
+
+
+def _results(*items):
+    return {"results": [dict(zip(FIELDS, item)) for item in items]}
+
+
+def test_compare_flags_throughput_and_memory_regressions_beyond_thresholds():
+    baseline = _results(
+        ("aggregates", 1_000_000, 1.0, 1_000_000.0, 100 * 2**20),
+        ("detector.iqr", 1_000_000, 0.5, 2_000_000.0, 0),
+        ("detector.zscore", 1_000_000, 0.001, 1e9, 0),
+    )
+    current = _results(
+        ("aggregates", 1_000_000, 1.1, 900_000.0, 300 * 2**20),
+        ("detector.iqr", 1_000_000, 1.0, 1_000_000.0, 8 * 2**20),
+        ("detector.zscore", 1_000_000, 0.01, 1e8, 0),
+        ("detector.dbscan", 1_000_000, 3.0, 330_000.0, 0),
+    )
+
+    regressions = compare_results(baseline, current, threshold=0.2, memory_threshold=0.5)
+
+    assert regressions == [
+        "aggregates @ 1000000 rows: peak +300.0 MiB vs baseline +100.0 MiB",
+        "detector.iqr @ 1000000 rows: 1000000 rows/s vs baseline 2000000",
+    ]
+
+
+def test_every_stage_runs_on_a_small_workload():
+    workload = Workload(rows=2_000)
+
+    for stage in STAGES:
+        runner = stage.prepare(workload)
+        measurement = measure(runner)
+        assert measurement.rows >= 1_900, stage.name
+        assert measurement.seconds > 0
+        if isinstance(runner, AgreementRun):
+            # окно меньше бюджета выборки: выборочный режим совпадает с точным
+            assert runner.report().agreement == 1.0, stage.name
@@ -0,0 +1,102 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+import yaml
+
+from pipeline_anomaly.infrastructure.detectors.zscore import ZScoreDetector
+from pipeline_anomaly.infrastructure.plugins import DETECTORS
+
+HEAVY_MODULES = ("sklearn", "hdbscan", "requests")
+OPTIONAL_MODULES = (
+    "pipeline_anomaly.infrastructure.detectors.parallel",
+    "pipeline_anomaly.infrastructure.detectors.lifecycle",
+    "pipeline_anomaly.infrastructure.detectors.online",
+    "pipeline_anomaly.infrastructure.observability.prometheus",
+    "pipeline_anomaly.infrastructure.aggregation.incremental",
+    "pipeline_anomaly.infrastructure.aggregation.clickhouse_pushdown",
+    "pipeline_anomaly.infrastructure.aggregation.rollup",
+)
+COLD_START_LIMIT_SECONDS = 5.0
+
+STARTUP_SCRIPT = """
+import json, sys, time
+from pathlib import Path
+
+started = time.perf_counter()
+from pipeline_anomaly.presentation import cli
+from pipeline_anomaly.infrastructure.config import PipelineConfig
+
+cfg = PipelineConfig.load(Path(sys.argv[1]))
+factory = cli._build_factory(cfg)
+pipeline = cli._build_pipeline(cfg, factory)
+print(json.dumps({"seconds": time.perf_counter() - started, "loaded": sorted(sys.modules)}))
+"""
+
+HELP_SCRIPT = """
+import json, sys
+from pipeline_anomaly.presentation import cli
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+def _minimal_config(tmp_path):
+    config = {
+        "clickhouse": {"host": "localhost", "port": 8123, "database": "pipeline", "username": "default", "password": ""},
+        "source": {"type": "synthetic"},
+        "dataset": {"row_count": 1000, "batch_size": 500, "anomaly_ratio": 0.01, "seed": 42},
+        "anomaly_detection": {"zscore_threshold": 3.0, "detectors": ["zscore", "iqr"]},
+        "alerting": {"enabled": False, "threshold_score": 0.8, "sink": "slack"},
+    }
+    path = tmp_path / "minimal.yaml"
+    path.write_text(yaml.safe_dump(config), encoding="utf-8")
+    return path
+
+
+def _run_script(script: str, *args: str, cwd) -> object:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    completed = subprocess.run(
+        [sys.executable, "-c", script, *args], capture_output=True, text=True, cwd=cwd, env=env, check=True
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def test_minimal_config_starts_without_heavy_imports(tmp_path):
+    startup = _run_script(STARTUP_SCRIPT, str(_minimal_config(tmp_path)), cwd=tmp_path)
+
+    loaded = set(startup["loaded"])
+    assert not {name.split(".")[0] for name in loaded} & set(HEAVY_MODULES)
+    assert not loaded & set(OPTIONAL_MODULES)
+    assert startup["seconds"] < COLD_START_LIMIT_SECONDS
+
+
+def test_cli_module_imports_nothing_from_the_pipeline(tmp_path):
+    loaded = set(_run_script(HELP_SCRIPT, cwd=tmp_path))
+
+    assert not loaded & {"pandas", "pyarrow", "numpy", "sklearn"}
+    assert not any(name.startswith("pipeline_anomaly.infrastructure") for name in loaded)
+
+
+def test_plugin_registry_resolves_builtins_and_module_references():
+    assert DETECTORS.resolve("zscore") is ZScoreDetector
+    assert DETECTORS.resolve("pipeline_anomaly.infrastructure.detectors.zscore:ZScoreDetector") is ZScoreDetector
+    assert {"zscore", "iqr", "isolation_forest", "dbscan", "hdbscan"} <= set(DETECTORS.names())
+    with pytest.raises(ValueError, match="unknown detector"):
+        DETECTORS.resolve("missing")
+
+
+def test_daemon_config_enables_watermark_and_model_cache(tmp_path):
+    from pipeline_anomaly.infrastructure.config import PipelineConfig
+    from pipeline_anomaly.presentation.cli import _daemon_config
+
+    cfg = PipelineConfig.load(_minimal_config(tmp_path))
+    assert not cfg.watermark.enabled and cfg.anomaly_detection.model_cache is None
+
+    daemon = _daemon_config(cfg)
+
+    assert daemon.watermark.enabled
+    assert daemon.anomaly_detection.model_cache.path == cfg.daemon.model_cache_path
+    # настроенный кэш не подменяется
+    assert _daemon_config(daemon).anomaly_detection.model_cache is daemon.anomaly_detection.model_cache
@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+from clickhouse_connect.driver.exceptions import OperationalError
+
+from pipeline_anomaly.infrastructure.clients.pool import ClickHousePool
+
+
+class FakeClient:
+    def __init__(self, alive: bool = True) -> None:
+        self.alive = alive
+        self.closed = False
+
+    def ping(self) -> bool:
+        return self.alive
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeClientFactory:
+    def __init__(self) -> None:
+        self.created: list[FakeClient] = []
+
+    def __call__(self) -> FakeClient:
+        client = FakeClient()
+        self.created.append(client)
+        return client
+
+
+def test_pool_reuses_clients_between_checkouts():
+    factory = FakeClientFactory()
+    pool = ClickHousePool(factory, size=2)
+
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        pass
+
+    assert first is second
+    assert len(factory.created) == 1
+
+
+def test_pool_blocks_when_exhausted_and_times_out():
+    pool = ClickHousePool(FakeClientFactory(), size=1, checkout_timeout=0.05)
+    with pool.connection():
+        with pytest.raises(TimeoutError):
+            with pool.connection():
+                pass
+
+
+def test_pool_replaces_expired_unhealthy_and_broken_clients():
+    factory = FakeClientFactory()
+    pool = ClickHousePool(factory, size=1, health_check_interval=0.0)
+
+    with pool.connection() as client:
+        client.alive = False
+    with pool.connection() as replacement:
+        pass
+    assert replacement is not client and client.closed
+
+    with pytest.raises(OperationalError):
+        with pool.connection():
+            raise OperationalError("connection reset")
+    assert replacement.closed
+
+    expiring = ClickHousePool(factory, size=1, idle_timeout=0.0)
+    with expiring.connection() as stale:
+        pass
+    with expiring.connection() as fresh:
+        pass
+    assert fresh is not stale and stale.closed
+
+
+def test_pool_checkout_is_thread_safe():
+    factory = FakeClientFactory()
+    pool = ClickHousePool(factory, size=3)
+    in_use: set[int] = set()
+    violations: list[int] = []
+    guard = threading.Lock()
+
+    def worker() -> None:
+        for _ in range(50):
+            with pool.connection() as client:
+                with guard:
+                    if id(client) in in_use:
+                        violations.append(id(client))
+                    in_use.add(id(client))
+                with guard:
+                    in_use.discard(id(client))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not violations
+    assert len(factory.created) <= 3
+    pool.close()
+    assert all(client.closed for client in factory.created)
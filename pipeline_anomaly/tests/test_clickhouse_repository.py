@@ -0,0 +1,175 @@
+import json
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from pipeline_anomaly.infrastructure.repositories.clickhouse_repository import ClickHouseRepository
+
+
+class FakeClient:
+    def __init__(self, now: int = 1_704_067_245) -> None:
+        self.now = now
+        self.commands: list[str] = []
+        self.migrations: list[tuple] = []
+
+    def command(self, statement: str) -> None:
+        self.commands.append(" ".join(statement.split()))
+
+    def query(self, query: str) -> SimpleNamespace:
+        if query == "SELECT toUnixTimestamp(now())":
+            return SimpleNamespace(result_rows=[(self.now,)])
+        assert query == "SELECT version FROM schema_migrations"
+        return SimpleNamespace(result_rows=[(row[0],) for row in self.migrations])
+
+    def insert(self, table: str, rows: list[tuple], column_names: list[str]) -> None:
+        assert table == "schema_migrations"
+        self.migrations.extend(rows)
+
+
+class FakeFactory:
+    def __init__(self, client) -> None:
+        self._client = client
+
+    def connect(self):
+        client = self._client
+
+        class _Connection:
+            def __enter__(self):
+                return client
+
+            def __exit__(self, *exc_info):
+                return False
+
+        return _Connection()
+
+
+def test_ensure_schema_applies_rollup_migration_once():
+    client = FakeClient()
+    sleeps: list[float] = []
+
+    def sleep(seconds: float) -> None:
+        sleeps.append(seconds)
+        client.now += int(seconds)
+
+    repository = ClickHouseRepository(factory=FakeFactory(client), sleep=sleep, migration_grace_seconds=10)
+
+    repository.ensure_schema()
+    first_run = list(client.commands)
+    repository.ensure_schema()
+    second_run = client.commands[len(first_run) :]
+
+    assert [row[:2] for row in client.migrations] == [
+        (1, "events_rollup_1m"),
+        (2, "anomaly_reports_partition"),
+        (3, "anomaly_events"),
+    ]
+    rollup = [command for command in first_run if "events_rollup_1m" in command or "ingested_at" in command]
+    assert [command.split(" AS ")[0].split(" (")[0] for command in rollup] == [
+        "CREATE TABLE IF NOT EXISTS events_rollup_1m",
+        "DROP VIEW IF EXISTS events_rollup_1m_mv",
+        "TRUNCATE TABLE events_rollup_1m",
+        "ALTER TABLE events ADD COLUMN IF NOT EXISTS ingested_at DateTime MATERIALIZED toDateTime(0)",
+        "ALTER TABLE events MODIFY COLUMN ingested_at DateTime MATERIALIZED toDateTime(0)",
+        "ALTER TABLE events MATERIALIZE COLUMN ingested_at SETTINGS mutations_sync = 2",
+        "ALTER TABLE events MODIFY COLUMN ingested_at DateTime MATERIALIZED now()",
+        "CREATE MATERIALIZED VIEW events_rollup_1m_mv TO events_rollup_1m",
+        "INSERT INTO events_rollup_1m SELECT toStartOfMinute(event_time)",
+    ]
+    # граница — время вставки по часам сервера: view создан до cutoff, бэкфилл — после cutoff + запас
+    assert "WHERE ingested_at >= toDateTime(1704067255)" in rollup[7]
+    assert "WHERE ingested_at < toDateTime(1704067255)" in rollup[8]
+    assert "event_time >=" not in rollup[7]
+    assert sleeps == [20]
+    assert not any("events_rollup_1m" in command for command in second_run)
+
+
+def test_rollup_migration_refuses_backfill_when_view_is_late():
+    class SlowClient(FakeClient):
+        def command(self, statement: str) -> None:
+            super().command(statement)
+            if "CREATE MATERIALIZED VIEW" in statement:
+                self.now += 60
+
+    client = SlowClient()
+    repository = ClickHouseRepository(factory=FakeFactory(client), sleep=lambda seconds: None)
+
+    with pytest.raises(RuntimeError, match="after cutoff"):
+        repository.ensure_schema()
+    assert not client.migrations
+    assert not any(command.startswith("INSERT INTO events_rollup_1m") for command in client.commands)
+
+
+class _ChdbClient:
+    """Адаптер `chdb.session.Session` к методам клиента clickhouse-connect, которые использует миграция."""
+
+    def __init__(self, session) -> None:
+        self._session = session
+
+    def command(self, statement: str) -> None:
+        self._session.query(statement)
+
+    def query(self, query: str) -> SimpleNamespace:
+        result = self._session.query(query, "JSONCompact")
+        return SimpleNamespace(result_rows=[tuple(row) for row in json.loads(bytes(result.bytes()))["data"]])
+
+    def insert(self, table: str, rows: list[tuple], column_names: list[str]) -> None:
+        values = ", ".join(
+            "(" + ", ".join(f"'{value:%Y-%m-%d %H:%M:%S}'" if hasattr(value, "year") else repr(value) for value in row) + ")"
+            for row in rows
+        )
+        self._session.query(f"INSERT INTO {table} ({', '.join(column_names)}) VALUES {values}")
+
+    def insert_event(self, event_time: str, chain_id: int, value: float) -> None:
+        self._session.query(
+            "INSERT INTO events (event_time, entity_id, chain_id, block_number, contract_address, tx_hash, "
+            f"value, attribute, gas_used, calldata_size) VALUES ('{event_time}', 1, {chain_id}, 1, '0xc', "
+            f"'0x{abs(hash((event_time, value))):x}', {value}, 0.5, 21000, 64)"
+        )
+
+
+def test_rollup_counts_rows_inserted_before_during_and_after_migration_on_chdb():
+    session_module = pytest.importorskip("chdb.session")
+    session = session_module.Session()
+    session.query("DROP DATABASE IF EXISTS migration")
+    session.query("CREATE DATABASE migration")
+    session.query("USE migration")
+    client = _ChdbClient(session)
+    session.query(
+        "CREATE TABLE events (event_time DateTime, entity_id UInt64, chain_id UInt16, block_number UInt64, "
+        "contract_address String, tx_hash String, value Float64, attribute Float64, gas_used Float64, "
+        "calldata_size UInt32) ENGINE = MergeTree PARTITION BY toDate(event_time) ORDER BY (event_time, entity_id)"
+    )
+    # события в пределах TTL rollup (45 дней), но намного раньше минуты миграции
+    hour_ago = (datetime.utcnow() - timedelta(hours=1)).replace(minute=0, second=0)
+    last_week = hour_ago - timedelta(days=7)
+    client.insert_event(f"{hour_ago:%Y-%m-%d %H:%M:10}", 1, 10.0)
+
+    def sleep(seconds: float) -> None:
+        # вставка между созданием view и бэкфиллом: её учитывает только бэкфилл
+        client.insert_event(f"{hour_ago:%Y-%m-%d %H:%M:20}", 1, 20.0)
+        time.sleep(seconds)
+
+    ClickHouseRepository(factory=FakeFactory(client), sleep=sleep, migration_grace_seconds=1).ensure_schema()
+    # после миграции приходят события с давним event_time — опоздавшие или повторно загруженные
+    client.insert_event(f"{hour_ago:%Y-%m-%d %H:%M:30}", 1, 30.0)
+    client.insert_event(f"{last_week:%Y-%m-%d %H:%M:%S}", 137, 5.0)
+
+    rollup = client.query(
+        "SELECT minute, chain_id, sum(events), sum(value_sum) FROM events_rollup_1m "
+        "GROUP BY minute, chain_id ORDER BY minute, chain_id"
+    ).result_rows
+    inserted = client.query(
+        "SELECT toStartOfMinute(event_time) AS minute, chain_id, count(), sum(value) FROM events "
+        "GROUP BY minute, chain_id ORDER BY minute, chain_id"
+    ).result_rows
+    columns = client.query("SELECT name FROM system.columns WHERE database = 'migration' AND table = 'events'")
+    star = session.query("SELECT * FROM events LIMIT 1", "JSONCompact")
+    session.query("DROP DATABASE migration")
+
+    assert rollup == inserted
+    # неделя назад — 1 строка, час назад — строки до, во время (на каждое ожидание) и после миграции
+    assert inserted[0][2] == 1 and inserted[1][2] >= 3
+    assert ("ingested_at",) in columns.result_rows
+    assert "ingested_at" not in {column["name"] for column in json.loads(bytes(star.bytes()))["meta"]}
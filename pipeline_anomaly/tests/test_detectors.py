@@ -0,0 +1,297 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline_anomaly.application.services.streaming_monitor import StreamingAnomalyMonitor
+from pipeline_anomaly.domain.models.batch import RecordBatch
+from pipeline_anomaly.domain.models.feature_matrix import FeatureMatrix
+from pipeline_anomaly.infrastructure.detectors.dbscan import DBSCANDetector
+from pipeline_anomaly.infrastructure.detectors.isolation_forest import IsolationForestDetector
+from pipeline_anomaly.infrastructure.detectors.lifecycle import CachedModelDetector, DetectorModelCache, RetrainPolicy
+from pipeline_anomaly.infrastructure.detectors.online import OnlineIQRDetector, OnlineZScoreDetector
+from pipeline_anomaly.infrastructure.detectors.parallel import ProcessPoolDetectorRunner
+from pipeline_anomaly.infrastructure.detectors.sampling import DensitySample, agreement, stratified_sample
+from pipeline_anomaly.infrastructure.state.json_file import JsonStateFile
+from pipeline_anomaly.infrastructure.detectors.zscore import ZScoreDetector
+
+
+class SleepyDetector:
+    name = "sleepy"
+
+    def fit_predict(self, features: FeatureMatrix) -> pd.Series:
+        time.sleep(30)
+        return pd.Series(np.zeros(len(features), dtype=int))
+
+    def severity(self, scores: pd.Series) -> float:
+        return 0.0
+
+
+class ExplodingDetector:
+    name = "exploding"
+
+    def fit_predict(self, features: FeatureMatrix) -> pd.Series:
+        raise ValueError("broken detector")
+
+    def severity(self, scores: pd.Series) -> float:
+        return 0.0
+
+
+def _features(frame: pd.DataFrame) -> FeatureMatrix:
+    return FeatureMatrix.from_frame(frame)
+
+
+def _frame() -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=500)
+    values[:5] = 50.0
+    return pd.DataFrame({"value": values, "attribute": rng.normal(size=500), "tx_hash": ["0x"] * 500})
+
+
+def test_process_pool_runner_matches_inline_and_skips_slow_detectors():
+    features = _features(_frame())
+    detector = ZScoreDetector(threshold=3.0)
+    runner = ProcessPoolDetectorRunner(workers=2, timeouts={"sleepy": 0.5})
+
+    started = time.monotonic()
+    fast, slow = runner.run([detector, SleepyDetector()], features)
+
+    assert time.monotonic() - started < 10
+    assert fast.skip_reason is None
+    assert fast.scores.tolist() == detector.fit_predict(features).tolist()
+    assert fast.severity == detector.severity(detector.fit_predict(features))
+    assert slow.scores is None
+    assert slow.skip_reason == "timeout"
+
+    # после таймаута зависший пул остановлен, следующий запуск поднимает новый
+    (again,) = runner.run([detector], features)
+    runner.close()
+    assert again.scores.tolist() == fast.scores.tolist()
+
+
+def test_process_pool_runner_stops_pool_when_a_detector_raises():
+    features = _features(_frame())
+    detector = ZScoreDetector(threshold=3.0)
+    runner = ProcessPoolDetectorRunner(workers=2)
+
+    started = time.monotonic()
+    with pytest.raises(ValueError, match="broken detector"):
+        runner.run([ExplodingDetector(), SleepyDetector()], features)
+
+    # соседний детектор ещё работал над общим сегментом: пул остановлен, а не дождан
+    assert time.monotonic() - started < 10
+    assert runner._pool is None
+    (again,) = runner.run([detector], features)
+    runner.close()
+    assert again.scores.tolist() == detector.fit_predict(features).tolist()
+
+
+class RecordingSink:
+    def __init__(self) -> None:
+        self.reports = []
+
+    def send(self, report) -> None:
+        self.reports.append(report)
+
+
+def _batch(values: np.ndarray, start: int) -> RecordBatch:
+    times = pd.to_datetime(np.arange(start, start + len(values)), unit="s")
+    return RecordBatch(dataframe=pd.DataFrame({"event_time": times, "value": values}))
+
+
+def _monitor(
+    sink: RecordingSink, state: JsonStateFile | None, event_threshold: float | None = None
+) -> StreamingAnomalyMonitor:
+    return StreamingAnomalyMonitor(
+        detectors=[OnlineZScoreDetector(threshold=4.0, min_history=500), OnlineIQRDetector(multiplier=3.0, min_history=500)],
+        alert_sink=sink,
+        alert_threshold=0.05,
+        event_threshold=event_threshold,
+        state=state,
+    )
+
+
+def test_streaming_monitor_alerts_on_anomalous_batch_and_restores_state(tmp_path):
+    rng = np.random.default_rng(7)
+    state = JsonStateFile(tmp_path / "online.json")
+    sink = RecordingSink()
+    monitor = _monitor(sink, state)
+    for position in range(5):
+        monitor.observe(_batch(rng.normal(size=1_000), start=position * 1_000))
+    assert sink.reports == []
+
+    monitor.flush()
+    restored = _monitor(sink, state)
+    spiky = rng.normal(size=1_000)
+    spiky[:100] = 40.0
+    restored.observe(_batch(spiky, start=5_000))
+
+    assert restored.alerts == 1
+    (report,) = sink.reports
+    assert {anomaly.detector for anomaly in report.anomalies} == {"online_zscore", "online_iqr"}
+    assert all(anomaly.severity >= 0.1 for anomaly in report.anomalies)
+
+
+def test_streaming_monitor_alerts_on_single_extreme_event():
+    rng = np.random.default_rng(11)
+    sink = RecordingSink()
+    monitor = _monitor(sink, state=None, event_threshold=2.0)
+    for position in range(3):
+        monitor.observe(_batch(rng.normal(size=1_000), start=position * 1_000))
+
+    # один выброс на 5000 строк: доля далеко ниже alert_threshold, но отклонение — десятки порогов
+    extreme = rng.normal(size=5_000)
+    extreme[123] = 200.0
+    monitor.observe(_batch(extreme, start=3_000))
+
+    assert monitor.alerts == 1
+    (report,) = sink.reports
+    for anomaly in report.anomalies:
+        assert anomaly.severity < 0.05
+        assert anomaly.score >= 2.0
+        assert "value=200.0" in anomaly.description
+
+
+def test_online_detectors_forget_history_with_half_life():
+    def feed(detector) -> None:
+        rng = np.random.default_rng(5)
+        for _ in range(20):
+            detector.score_update(rng.normal(size=1_000))
+        for _ in range(5):
+            detector.score_update(rng.normal(loc=10.0, size=1_000))
+
+    stale, decayed = OnlineZScoreDetector(threshold=4.0), OnlineZScoreDetector(threshold=4.0, half_life_rows=500)
+    feed(stale)
+    feed(decayed)
+    # без затухания 20k строк старого уровня тянут среднее к нулю
+    assert stale.state()["mean"] == pytest.approx(2.0, abs=0.1)
+    assert decayed.state()["mean"] == pytest.approx(10.0, abs=0.1)
+    restored = OnlineZScoreDetector(threshold=4.0, half_life_rows=500)
+    restored.restore(decayed.state())
+    assert restored.state() == decayed.state()
+
+    shifted = np.random.default_rng(6).normal(loc=10.0, size=1_000)
+    stale_iqr, decayed_iqr = OnlineIQRDetector(multiplier=3.0), OnlineIQRDetector(multiplier=3.0, half_life_rows=500)
+    feed(stale_iqr)
+    feed(decayed_iqr)
+    assert (stale_iqr.score_update(shifted) >= 1.0).mean() > 0.9
+    assert (decayed_iqr.score_update(shifted) >= 1.0).mean() < 0.01
+
+
+def test_sampled_dbscan_agrees_with_exact_mode():
+    rng = np.random.default_rng(3)
+    rows = 12_000
+    value = rng.normal(size=rows)
+    outliers = rng.choice(rows, rows // 200, replace=False)
+    value[outliers] += rng.uniform(5, 10, len(outliers)) * rng.choice([-1, 1], len(outliers))
+    features = _features(
+        pd.DataFrame({"value": value, "attribute": rng.normal(size=rows), "chain_id": rng.integers(1, 4, rows)})
+    )
+
+    exact = DBSCANDetector(eps=0.5, min_samples=15).fit_predict(features)
+    sampled = DBSCANDetector(eps=0.5, min_samples=15, sample=DensitySample(size=3_000, chunk_size=1_000)).fit_predict(
+        features
+    )
+    report = agreement(exact.to_numpy(), sampled.to_numpy())
+
+    assert report.agreement > 0.995
+    assert report.recall > 0.95
+    assert report.jaccard > 0.8
+
+
+def test_stratified_sample_keeps_every_stratum():
+    strata = np.r_[np.zeros(9_990, dtype=int), np.ones(10, dtype=int)]
+
+    rows = stratified_sample(strata, len(strata), size=100)
+
+    assert len(np.unique(rows)) == len(rows)
+    assert set(strata[rows]) == {0, 1}
+    assert 95 <= len(rows) <= 105
+
+
+class CountingForest(IsolationForestDetector):
+    def __init__(self) -> None:
+        super().__init__(contamination=0.01, random_state=0)
+        self.fits = 0
+
+    def fit(self, features: FeatureMatrix):
+        self.fits += 1
+        return super().fit(features)
+
+
+def test_cached_model_detector_scores_until_policy_requests_retrain(tmp_path):
+    frame = _frame()
+    features = _features(frame)
+    now = [0.0]
+    forest = CountingForest()
+    cache = DetectorModelCache(tmp_path / "models")
+    policy = RetrainPolicy(every_runs=3, max_age_seconds=3_600, drift_threshold=0.5)
+
+    def detector() -> CachedModelDetector:
+        return CachedModelDetector(forest, cache, policy, clock=lambda: now[0])
+
+    first = detector().fit_predict(features)
+    assert first.tolist() == IsolationForestDetector(contamination=0.01, random_state=0).fit_predict(features).tolist()
+    model_file = tmp_path / "models" / "isolation_forest.pkl"
+    fitted_mtime = model_file.stat().st_mtime_ns
+    assert detector().fit_predict(_features(frame.iloc[::-1])).tolist() == first.tolist()[::-1]
+    # оценка без переобучения пишет только счётчик в JSON, pickle модели не трогает
+    detector().fit_predict(features)
+    assert forest.fits == 1
+    assert model_file.stat().st_mtime_ns == fitted_mtime
+    assert DetectorModelCache(tmp_path / "models").load("isolation_forest").runs == 3
+
+    detector().fit_predict(features)
+    assert forest.fits == 2
+
+    drifted = _features(frame.assign(value=frame["value"] + 5.0))
+    detector().fit_predict(drifted)
+    assert forest.fits == 3
+
+    now[0] = 7_200.0
+    detector().fit_predict(drifted)
+    assert forest.fits == 4
+
+
+def test_feature_matrix_is_standardized_float32_with_cached_stats():
+    frame = _frame().assign(gas_used=np.arange(500) * 10.0, chain_id=np.repeat([1, 137], 250))
+
+    features = FeatureMatrix.from_frame(frame)
+
+    assert features.values.dtype == np.float32
+    assert features.values.flags.c_contiguous
+    assert features.columns == ("value", "attribute", "gas_used")
+    assert features.mean[2] == pytest.approx(2_495.0)
+    assert features.std[0] == pytest.approx(frame["value"].std())
+    np.testing.assert_allclose(features.values.mean(axis=0), 0.0, atol=1e-5)
+    assert np.shares_memory(features.select(["value", "attribute"]), features.values)
+    assert features.strata.tolist() == frame["chain_id"].tolist()
+    rescaled = features.restandardized(["gas_used"], np.array([0.0]), np.array([10.0]))
+    np.testing.assert_allclose(rescaled.column("gas_used"), np.arange(500), atol=1e-3)
+
+
+def test_process_pool_runner_scores_partitions_independently():
+    frame = _frame().assign(chain_id=np.repeat([1, 137], 250))
+    frame.loc[300, "value"] = 8.0
+    partitions = FeatureMatrix.split_by(frame, "chain_id")
+    detector = ZScoreDetector(threshold=3.0)
+
+    runner = ProcessPoolDetectorRunner(workers=2, start_method="spawn")
+
+    try:
+        outcomes = runner.run_partitioned([detector], partitions)
+        pool = runner._pool
+        again = runner.run_partitioned([detector], partitions)
+        # пул живёт между вызовами до явного close()
+        assert runner._pool is pool
+    finally:
+        runner.close()
+
+    assert runner._pool is None
+    assert list(outcomes) == ["chain_id=1", "chain_id=137"]
+    for label, features in partitions.items():
+        (outcome,) = outcomes[label]
+        assert outcome.scores.tolist() == detector.fit_predict(features).tolist()
+        assert again[label][0].scores.tolist() == outcome.scores.tolist()
+    assert outcomes["chain_id=137"][0].scores.iloc[50] == 1
@@ -1,3 +1,4 @@
+from pipeline_anomaly.domain.models.batch import EVENTS_SCHEMA, ArrowRecordBatch
 from pipeline_anomaly.infrastructure.generators.synthetic_generator import (
     SyntheticDatasetConfig,
     SyntheticDatasetGenerator,
@@ -7,7 +8,7 @@ from pipeline_anomaly.infrastructure.generators.synthetic_generator import (
 def test_batches_shape_and_schema():
     config = SyntheticDatasetConfig(row_count=1000, batch_size=200, anomaly_ratio=0.1, seed=42)
     generator = SyntheticDatasetGenerator(config)
-    batches = generator.batches()
+    batches = list(generator.batches())
     assert sum(batch.size for batch in batches) == 1000
 
     required_columns = {
@@ -24,3 +25,38 @@ def test_batches_shape_and_schema():
     }
     for batch in batches:
         assert required_columns.issubset(batch.dataframe.columns)
+
+
+def test_parallel_mode_is_reproducible_regardless_of_worker_count():
+    def frames(mode: str, workers: int = 0) -> list:
+        config = SyntheticDatasetConfig(
+            row_count=1000, batch_size=300, anomaly_ratio=0.01, seed=7, mode=mode, workers=workers
+        )
+        return [
+            batch.dataframe.drop(columns=["event_time", "block_number"])
+            for batch in SyntheticDatasetGenerator(config).batches()
+        ]
+
+    expected = frames("vectorized")
+    assert [len(frame) for frame in expected] == [300, 300, 300, 100]
+    for workers in (1, 3):
+        actual = frames("parallel", workers=workers)
+        assert len(actual) == len(expected)
+        for left, right in zip(expected, actual):
+            assert left.equals(right)
+    assert expected[0]["tx_hash"].str.match(r"^0x[0-9a-f]{64}$").all()
+
+
+def test_arrow_batches_match_events_schema_and_slice_without_copy():
+    config = SyntheticDatasetConfig(
+        row_count=500, batch_size=250, anomaly_ratio=0.01, seed=3, mode="vectorized", batch_format="arrow"
+    )
+    batches = list(SyntheticDatasetGenerator(config).batches())
+
+    assert all(isinstance(batch, ArrowRecordBatch) for batch in batches)
+    assert batches[0].table.schema.equals(EVENTS_SCHEMA)
+    head = batches[0].slice(10, 5)
+    assert head.size == 5
+    value_buffer = batches[0].table.column("value").chunk(0).buffers()[1]
+    assert head.table.column("value").chunk(0).buffers()[1].address == value_buffer.address
+    assert head.dataframe["tx_hash"].str.match(r"^0x[0-9a-f]{64}$").all()
@@ -1,5 +1,7 @@
+import json
 from pathlib import Path
 
+from pipeline_anomaly.domain.models.batch import EVENTS_SCHEMA, ArrowRecordBatch
 from pipeline_anomaly.infrastructure.config import KafkaSourceConfig
 from pipeline_anomaly.infrastructure.sources.kafka_file_source import KafkaBatchSource
 
@@ -8,6 +10,70 @@ def test_kafka_source_reads_batches(tmp_path: Path) -> None:
     sample_file = Path(__file__).resolve().parents[1] / "data" / "kafka_mock" / "events.ndjson"
     config = KafkaSourceConfig(path=str(sample_file), batch_size=2)
     source = KafkaBatchSource(config)
-    batches = source.batches()
+    batches = list(source.batches())
     assert batches
     assert sum(batch.size for batch in batches) == 5
+
+
+def test_columnar_reader_resumes_from_committed_offset(tmp_path: Path) -> None:
+    sample_file = Path(__file__).resolve().parents[1] / "data" / "kafka_mock" / "events.ndjson"
+    events = tmp_path / "events.ndjson"
+    lines = sample_file.read_text(encoding="utf-8").splitlines(keepends=True)
+    events.write_text("".join(lines[:3]), encoding="utf-8")
+    config = KafkaSourceConfig(
+        path=str(events),
+        batch_size=2,
+        reader="columnar",
+        block_size=64,
+        mmap=True,
+        checkpoint_path=str(tmp_path / "offsets.json"),
+    )
+
+    source = KafkaBatchSource(config)
+    batches = list(source.batches())
+    assert [batch.size for batch in batches] == [2, 1]
+    assert str(batches[0].dataframe["event_time"].dt.tz) == "UTC"
+    source.commit(batches[0])
+    assert source.committed_offset() == len("".join(lines[:2]).encode())
+
+    source.commit(batches[-1])
+    with events.open("a", encoding="utf-8") as file:
+        file.write("".join(lines[3:]))
+
+    resumed = list(KafkaBatchSource(config).batches())
+    assert sum(batch.size for batch in resumed) == 2
+    assert resumed[0].dataframe["tx_hash"].tolist() == [
+        json.loads(line)["tx_hash"] for line in lines[3:]
+    ]
+
+
+def test_columnar_reader_builds_arrow_batches() -> None:
+    sample_file = Path(__file__).resolve().parents[1] / "data" / "kafka_mock" / "events.ndjson"
+    config = KafkaSourceConfig(path=str(sample_file), batch_size=4, reader="columnar", batch_format="arrow")
+
+    batches = list(KafkaBatchSource(config).batches())
+
+    assert [batch.size for batch in batches] == [4, 1]
+    assert all(isinstance(batch, ArrowRecordBatch) for batch in batches)
+    assert batches[0].table.schema.equals(EVENTS_SCHEMA)
+    assert batches[-1].source_offset == sample_file.stat().st_size
+
+
+def test_columnar_reader_skips_blank_lines_and_crlf_like_rows_reader(tmp_path: Path) -> None:
+    sample_file = Path(__file__).resolve().parents[1] / "data" / "kafka_mock" / "events.ndjson"
+    lines = sample_file.read_text(encoding="utf-8").splitlines()
+    events = tmp_path / "events.ndjson"
+    events.write_bytes(("\r\n".join([lines[0], "", "   ", *lines[1:3], " \t", *lines[3:]]) + "\r\n\r\n").encode())
+    expected = [json.loads(line)["tx_hash"] for line in lines]
+
+    rows = list(KafkaBatchSource(KafkaSourceConfig(path=str(events), batch_size=2)).batches())
+    assert [tx for batch in rows for tx in batch.dataframe["tx_hash"]] == expected
+
+    for batch_format in ("pandas", "arrow"):
+        config = KafkaSourceConfig(
+            path=str(events), batch_size=2, reader="columnar", block_size=64, batch_format=batch_format
+        )
+        batches = list(KafkaBatchSource(config).batches())
+        assert [tx for batch in batches for tx in batch.dataframe["tx_hash"]] == expected
+        # оффсет — конец последней непустой строки, хвостовой `\r\n` пропускается и при повторном чтении
+        assert batches[-1].source_offset == events.stat().st_size - len("\r\n")
@@ -0,0 +1,123 @@
+import threading
+import urllib.request
+
+import pandas as pd
+
+from pipeline_anomaly.domain.services.tracing import Tracer, data_volume, traced
+from pipeline_anomaly.infrastructure.observability.prometheus import PrometheusExporter
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeMemory:
+    """RSS процесса с пиком, который сбрасывается как `VmHWM`."""
+
+    def __init__(self) -> None:
+        self.rss = 100 * 2**20
+        self.hwm = self.rss
+
+    def allocate(self, size: int) -> None:
+        self.rss += size
+        self.hwm = max(self.hwm, self.rss)
+
+    def reset(self) -> bool:
+        self.hwm = self.rss
+        return True
+
+    def peak(self) -> int:
+        return self.hwm
+
+
+class FakeRepository:
+    def __init__(self, tracer: Tracer, clock: FakeClock, memory: FakeMemory) -> None:
+        self._tracer = tracer
+        self._clock = clock
+        self._memory = memory
+
+    @traced("repository.read_events_since")
+    def read_events_since(self, since: object) -> pd.DataFrame:
+        self._clock.now += 2.0
+        self._memory.allocate(2 * 2**20)
+        self._memory.allocate(-2 * 2**20)
+        return pd.DataFrame({"value": [1.0, 2.0, 3.0, 4.0]})
+
+    @traced("repository.ingest_batch")
+    def ingest_batch(self, frame: pd.DataFrame) -> None:
+        self._clock.now += 0.5
+        self._memory.allocate(5 * 2**20)
+        self._memory.allocate(-5 * 2**20)
+
+
+def test_tracer_nests_spans_across_threads_and_exports_prometheus_metrics():
+    clock = FakeClock()
+    memory = FakeMemory()
+    exporter = PrometheusExporter(buckets=(1.0, 5.0))
+    tracer = Tracer(exporters=[exporter], peak_rss=memory.peak, reset_peak=memory.reset, clock=clock)
+    repository = FakeRepository(tracer, clock, memory)
+
+    with tracer.span("pipeline"):
+        with tracer.span("ingest"):
+            worker = threading.Thread(target=repository.ingest_batch, args=(pd.DataFrame({"value": [1.0, 2.0]}),))
+            worker.start()
+            worker.join()
+        with tracer.span("analyze"):
+            repository.read_events_since(None)
+            tracer.record("detector.zscore", 0.25)
+
+    tree = tracer.tree()
+    assert [line.split()[0] for line in tree] == [
+        "pipeline",
+        "ingest",
+        "repository.ingest_batch",
+        "analyze",
+        "repository.read_events_since",
+        "detector.zscore",
+    ]
+    assert tree[0] == "pipeline 2.500s peak rss +5.0 MiB"
+    assert tree[2].startswith("    repository.ingest_batch 0.500s 2 rows (4/s) written")
+    assert tree[2].endswith("peak rss +5.0 MiB")
+    # пик сбрасывается на открытии спана: меньший пик после тяжёлой стадии не теряется
+    assert tree[4].startswith("    repository.read_events_since 2.000s 4 rows (2/s) read")
+    assert tree[4].endswith("peak rss +2.0 MiB")
+    assert tree[5] == "    detector.zscore 0.250s"
+
+    # объём считается по размеру колонок без обхода строк, чтобы не тормозить вставку
+    rows, size = data_volume(pd.DataFrame({"tx_hash": ["0x" + "ab" * 32] * 10}))
+    assert rows == 10 and size == 10 * 8
+
+    metrics = exporter.render()
+    assert 'pipeline_stage_duration_seconds_bucket{stage="repository.read_events_since",le="1.0"} 0' in metrics
+    assert 'pipeline_stage_duration_seconds_bucket{stage="repository.read_events_since",le="5.0"} 1' in metrics
+    assert 'pipeline_stage_duration_seconds_count{stage="pipeline"} 1' in metrics
+    assert 'pipeline_stage_rows_total{stage="repository.read_events_since"} 4' in metrics
+    assert 'pipeline_stage_rows_per_second{stage="repository.read_events_since"} 2.0' in metrics
+    assert 'pipeline_stage_peak_memory_delta_bytes{stage="repository.read_events_since"} 2097152' in metrics
+
+    exporter.serve(port=0)
+    try:
+        port = exporter._server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as response:
+            assert response.read().decode("utf-8") == exporter.render()
+    finally:
+        exporter.close()
+
+
+def test_tracer_without_memory_probes_does_not_touch_peak_rss():
+    clock = FakeClock()
+    tracer = Tracer(clock=clock)
+    repository = FakeRepository(tracer, clock, FakeMemory())
+
+    with tracer.span("ingest"):
+        repository.ingest_batch(pd.DataFrame({"value": [1.0, 2.0]}))
+
+    # без проб памяти (метрики выключены) спаны не сбрасывают и не читают пик RSS
+    assert tracer.tree() == [
+        "ingest 0.500s",
+        "  repository.ingest_batch 0.500s 2 rows (4/s) written 0.0 MiB",
+    ]
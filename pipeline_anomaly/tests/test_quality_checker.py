@@ -1,6 +1,11 @@
+from dataclasses import replace
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 
-from pipeline_anomaly.domain.models.batch import RecordBatch
+from pipeline_anomaly.domain.models.batch import ArrowRecordBatch, RecordBatch
+from pipeline_anomaly.infrastructure.data_quality.dedup_index import TimePartitionedDedupIndex
 from pipeline_anomaly.infrastructure.data_quality.pandas_checker import PandasDataQualityChecker
 
 
@@ -19,3 +24,109 @@ def test_quality_checker_drops_duplicates_and_nulls():
 
     assert len(cleaned.dataframe) == 2
     assert cleaned.dataframe["tx_hash"].tolist() == ["0x1", "0x2"]
+
+
+def test_quality_checker_handles_arrow_batches():
+    table = pa.table(
+        {
+            "event_time": pa.array([1, 2, 3, 4], pa.timestamp("s")),
+            "tx_hash": ["0x1", "0x1", "0x2", None],
+            "value": [1.0, 2.0, 3.0, 4.0],
+        }
+    )
+    batch = ArrowRecordBatch(table=table, source_offset=42)
+
+    checker = PandasDataQualityChecker(dedup_keys=["tx_hash"], required_columns=["tx_hash", "event_time"])
+    cleaned = checker.validate(batch)
+
+    assert isinstance(cleaned, ArrowRecordBatch)
+    assert cleaned.table.column("tx_hash").to_pylist() == ["0x1", "0x2"]
+    assert cleaned.source_offset == 42
+
+
+def test_arrow_batch_converts_to_pandas_once():
+    batch = ArrowRecordBatch(table=pa.table({"tx_hash": ["0x1", "0x2", "0x3"]}), source_offset=7)
+
+    assert batch.dataframe is batch.dataframe
+    # срез и replace получают свою таблицу, кэш исходного батча не наследуют
+    assert batch.slice(1).dataframe["tx_hash"].tolist() == ["0x2", "0x3"]
+    assert replace(batch, table=batch.table.slice(0, 1)).dataframe["tx_hash"].tolist() == ["0x1"]
+    assert batch == ArrowRecordBatch(table=batch.table, source_offset=7)
+
+
+def test_quality_checker_dedup_index_spans_batches_and_runs(tmp_path):
+    def make_checker():
+        index = TimePartitionedDedupIndex(
+            partition_seconds=3600,
+            ttl_seconds=2 * 3600,
+            expected_items_per_partition=1_000,
+            false_positive_rate=0.001,
+            path=tmp_path / "dedup.npz",
+        )
+        return PandasDataQualityChecker(dedup_keys=["tx_hash"], required_columns=["tx_hash"], dedup_index=index)
+
+    def make_batch(hashes, start):
+        dataframe = pd.DataFrame(
+            {
+                "event_time": pd.date_range(start, periods=len(hashes), freq="1min", tz="UTC"),
+                "tx_hash": hashes,
+            }
+        )
+        return RecordBatch(dataframe=dataframe)
+
+    checker = make_checker()
+    first = checker.validate(make_batch(["0x1", "0x2", "0x3"], "2024-01-01 00:00"))
+    second = checker.validate(make_batch(["0x3", "0x4"], "2024-01-01 00:10"))
+    checker.flush()
+
+    assert first.dataframe["tx_hash"].tolist() == ["0x1", "0x2", "0x3"]
+    assert second.dataframe["tx_hash"].tolist() == ["0x4"]
+
+    restarted = make_checker()
+    third = restarted.validate(make_batch(["0x1", "0x5"], "2024-01-01 00:20"))
+    assert third.dataframe["tx_hash"].tolist() == ["0x5"]
+
+    # через ttl старые партиции вытесняются, и ключ снова проходит
+    restarted.validate(make_batch(["0x6"], "2024-01-01 05:00"))
+    fourth = restarted.validate(make_batch(["0x1"], "2024-01-01 05:01"))
+    assert fourth.dataframe["tx_hash"].tolist() == ["0x1"]
+
+
+def test_dedup_index_keeps_total_false_positive_rate_across_partitions():
+    index = TimePartitionedDedupIndex(
+        partition_seconds=3600, ttl_seconds=8 * 3600, expected_items_per_partition=1_000, false_positive_rate=0.01
+    )
+    rng = np.random.default_rng(0)
+    for partition in range(8):
+        index.seen_and_add(rng.integers(0, 2**63, size=1_000, dtype=np.uint64), np.full(1_000, partition * 3600))
+
+    # ключ проверяется по всем 8 партициям; с фильтрами на полную долю ложных дублей было бы ~8%
+    fresh = rng.integers(0, 2**63, size=20_000, dtype=np.uint64)
+    assert index.seen_and_add(fresh, np.full(len(fresh), 7 * 3600)).mean() < 0.015
+
+
+def test_dedup_index_hashes_arrow_and_pandas_keys_alike():
+    index = TimePartitionedDedupIndex(
+        partition_seconds=3600, ttl_seconds=3600, expected_items_per_partition=1_000, false_positive_rate=0.001
+    )
+    checker = PandasDataQualityChecker(dedup_keys=["entity_id", "opened_at"], required_columns=[], dedup_index=index)
+    dataframe = pd.DataFrame(
+        {
+            "event_time": pd.date_range("2024-01-01", periods=3, freq="1min"),
+            "entity_id": np.array([-1, 2, 3], dtype=np.int64),
+            "opened_at": pd.date_range("2023-12-31", periods=3, freq="1h"),
+        }
+    )
+    table = pa.table(
+        {
+            "event_time": pa.array(dataframe["event_time"], pa.timestamp("s")),
+            "entity_id": pa.array([-1, 2, 3], pa.int32()),
+            "opened_at": pa.array(dataframe["opened_at"], pa.timestamp("us")),
+        }
+    )
+
+    checker.validate(RecordBatch(dataframe=dataframe))
+    replayed = checker.validate(ArrowRecordBatch(table=table))
+
+    # те же ключи в других dtype (int32, timestamp[us]) — это повтор, а не новые строки
+    assert replayed.table.num_rows == 0
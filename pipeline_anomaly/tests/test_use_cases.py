@@ -1,15 +1,39 @@
 from __future__ import annotations
 
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timedelta
 
+import numpy as np
 import pandas as pd
 import pytest
 
+from pipeline_anomaly.application.services.cascade import DetectionCascade
+from pipeline_anomaly.application.services.watermark_window import WatermarkWindowReader
+from pipeline_anomaly.application.services.window_snapshot import WindowSnapshot
 from pipeline_anomaly.application.use_cases.compute_aggregates import ComputeAggregates
 from pipeline_anomaly.application.use_cases.detect_anomalies import DetectAnomalies
+from pipeline_anomaly.application.use_cases.load_dataset import LoadSyntheticDataset
+from pipeline_anomaly.application.use_cases.run_micro_batches import MicroBatchScheduler
+from pipeline_anomaly.application.use_cases.run_pipeline import RunPipeline
 from pipeline_anomaly.domain.models.aggregate import AggregateCollection
-from pipeline_anomaly.domain.models.anomaly import AnomalyReport
+from pipeline_anomaly.domain.models.anomaly import AnomalyReport, DetectorOutcome
+from pipeline_anomaly.domain.models.batch import RecordBatch
+from pipeline_anomaly.domain.models.feature_matrix import FeatureMatrix
+from pipeline_anomaly.domain.models.ingestion import IngestionReport
+from pipeline_anomaly.domain.models.watermark import Watermark
 from pipeline_anomaly.domain.services.interfaces import AnomalyDetector, ClickHouseWriter
+from pipeline_anomaly.infrastructure.alerting.stdout_sink import StdOutAlertSink
+from pipeline_anomaly.infrastructure.data_quality.dedup_index import TimePartitionedDedupIndex
+from pipeline_anomaly.infrastructure.data_quality.pandas_checker import PandasDataQualityChecker
+from pipeline_anomaly.infrastructure.detectors.isolation_forest import IsolationForestDetector
+from pipeline_anomaly.infrastructure.detectors.lifecycle import CachedModelDetector, DetectorModelCache, RetrainPolicy
+from pipeline_anomaly.infrastructure.generators.synthetic_generator import (
+    SyntheticDatasetConfig,
+    SyntheticDatasetGenerator,
+)
+from pipeline_anomaly.infrastructure.state.json_file import JsonStateFile
+from pipeline_anomaly.infrastructure.state.watermarks import JsonWatermarkStore
 
 
 class InMemoryWriter(ClickHouseWriter):
@@ -40,7 +64,7 @@ class FakeDetector(AnomalyDetector):
         self._scores = scores
         self._severity_value = severity_value
 
-    def fit_predict(self, dataframe: pd.DataFrame) -> pd.Series:
+    def fit_predict(self, features: FeatureMatrix) -> pd.Series:
         return pd.Series(self._scores)
 
     def severity(self, scores: pd.Series) -> float:
@@ -86,6 +110,187 @@ def test_compute_aggregates_calculates_expected_metrics():
     )
 
 
+def test_detect_anomalies_reports_each_partition():
+    writer = InMemoryWriter(frame=_sample_frame())
+    use_case = DetectAnomalies(
+        writer=writer,
+        detectors=[FakeDetector("zscore", [1.0], severity_value=0.4)],
+        threshold=0.8,
+        partition_by="chain_id",
+    )
+
+    report = use_case.execute()
+
+    assert [(anomaly.detector, anomaly.partition) for anomaly in report.anomalies] == [
+        ("zscore", "chain_id=1"),
+        ("zscore", "chain_id=137"),
+    ]
+    assert set(report.timings) == {"zscore[chain_id=1]", "zscore[chain_id=137]"}
+    assert writer.persisted_report == report
+
+
+def test_detect_anomalies_extracts_top_k_events_by_combined_score():
+    writer = InMemoryWriter(frame=_sample_frame())
+    use_case = DetectAnomalies(
+        writer=writer,
+        detectors=[
+            FakeDetector("zscore", [0.0, 1.0], severity_value=0.5),
+            FakeDetector("iqr", [1.0, 1.0], severity_value=1.0),
+        ],
+        threshold=0.8,
+        top_k=1,
+    )
+
+    report = use_case.execute()
+
+    (event,) = report.events
+    assert event.tx_hash == "0xdef"
+    assert event.score == pytest.approx(1.0)
+    assert event.detectors == ("zscore", "iqr")
+    assert event.chain_id == 137
+
+
+def test_cascade_runs_expensive_detectors_on_trigger_or_safety_schedule(tmp_path):
+    class CountingDetector(FakeDetector):
+        calls = 0
+
+        def fit_predict(self, features: FeatureMatrix) -> pd.Series:
+            self.calls += 1
+            return super().fit_predict(features)
+
+    quiet = FakeDetector("zscore", [0.0, 0.0], severity_value=0.0)
+    forest = CountingDetector("isolation_forest", [1.0, 0.0], severity_value=0.5)
+    state = JsonStateFile(tmp_path / "cascade.json")
+
+    def run(cheap: FakeDetector) -> AnomalyReport:
+        cascade = DetectionCascade(triggers={"zscore": 0.01}, safety_every_runs=3, state=state)
+        use_case = DetectAnomalies(
+            writer=InMemoryWriter(frame=_sample_frame()),
+            detectors=[cheap, forest],
+            threshold=0.8,
+            cascade=cascade,
+        )
+        return use_case.execute()
+
+    first, second = run(quiet), run(quiet)
+    assert forest.calls == 0
+    assert first.skipped == ("isolation_forest",) and second.skipped == ("isolation_forest",)
+
+    safety = run(quiet)
+    assert forest.calls == 1
+    assert safety.skipped == ()
+
+    run(quiet)
+    assert forest.calls == 1
+    triggered = run(FakeDetector("zscore", [1.0, 0.0], severity_value=0.5))
+    assert forest.calls == 2
+    assert [anomaly.detector for anomaly in triggered.anomalies] == ["zscore", "isolation_forest"]
+
+
+class GrowingEventReader:
+    def __init__(self, frame: pd.DataFrame) -> None:
+        self.frame = frame
+        self.since: list[datetime | None] = []
+
+    def read_events_since(self, since: datetime | None) -> pd.DataFrame:
+        self.since.append(since)
+        if since is None:
+            return self.frame.copy()
+        return self.frame[self.frame["event_time"] >= since].reset_index(drop=True)
+
+
+def _events(minutes: list[int]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "event_time": pd.Timestamp("2024-01-01") + pd.to_timedelta(minutes, unit="min"),
+            "block_number": list(range(1, len(minutes) + 1)),
+            "chain_id": [1] * len(minutes),
+            "value": [float(minute) for minute in minutes],
+            "gas_used": [21000.0] * len(minutes),
+            "calldata_size": [128] * len(minutes),
+        }
+    )
+
+
+def test_watermark_window_aggregates_only_new_rows_with_context(tmp_path):
+    store = JsonWatermarkStore(tmp_path / "watermarks.json")
+    events = GrowingEventReader(_events([0, 10, 20, 30]))
+    first = WatermarkWindowReader(events, store, overlap=timedelta(minutes=15))
+    assert first.is_new(first.read_latest_window()).all()
+    first.commit()
+
+    events.frame = _events([0, 10, 20, 30, 40, 50])
+    second = WatermarkWindowReader(events, store, overlap=timedelta(minutes=15))
+    writer = InMemoryWriter(frame=events.frame)
+    aggregator = ComputeAggregates(
+        writer=writer, windows=("30m",), window_source=WindowSnapshot(reader=second), delta=second
+    )
+
+    result = {row["metric"]: row["value"] for row in aggregator.execute().as_dict()}
+
+    assert events.since[-1] == datetime(2024, 1, 1, 0, 15)
+    assert result["count"] == pytest.approx(2.0)
+    assert result["mean_value"] == pytest.approx(45.0)
+    assert result["count_last_30m"] == pytest.approx(4.0)
+    second.commit()
+    assert store.load("pipeline_anomaly") == Watermark(datetime(2024, 1, 1, 0, 50), 6)
+
+    events.frame = _events([0, 10, 20, 30, 40, 50, 60])
+    resident = second.read_latest_window()
+    assert events.since[-1] == datetime(2024, 1, 1, 0, 50)
+    assert resident["value"].tolist() == [40.0, 50.0, 60.0]
+    assert second.is_new(resident).tolist() == [False, False, True]
+
+
+class FakeMicroBatchPipeline:
+    resumable_source = True
+
+    def __init__(self, rows_per_ingest: int, stop_after: int) -> None:
+        self.rows_per_ingest = rows_per_ingest
+        self.stop_after = stop_after
+        self.ingested = 0
+        self.analyzed: list[int] = []
+        self.scheduler: MicroBatchScheduler | None = None
+
+    def ingest(self) -> IngestionReport:
+        self.ingested += 1
+        if self.ingested == 3:
+            raise RuntimeError("clickhouse unavailable")
+        return IngestionReport(
+            batches=1, rows=self.rows_per_ingest, elapsed_seconds=0.1, validation_seconds=0.0, insert_seconds=0.0
+        )
+
+    def analyze(self) -> None:
+        self.analyzed.append(self.ingested)
+        if len(self.analyzed) == self.stop_after:
+            self.scheduler.stop()
+
+
+def test_micro_batch_scheduler_analyzes_on_row_count_or_interval_and_survives_errors():
+    pipeline = FakeMicroBatchPipeline(rows_per_ingest=40, stop_after=3)
+    ticks = iter(range(1000))
+    scheduler = MicroBatchScheduler(
+        pipeline, interval_seconds=1000, max_rows=100, poll_seconds=0, clock=lambda: float(next(ticks))
+    )
+    pipeline.scheduler = scheduler
+
+    scheduler.run()
+
+    assert pipeline.analyzed == [4, 7, 10]
+    assert scheduler.batches == 3
+
+    pipeline = FakeMicroBatchPipeline(rows_per_ingest=10, stop_after=2)
+    ticks = iter(range(0, 1000, 30))
+    scheduler = MicroBatchScheduler(
+        pipeline, interval_seconds=60, max_rows=100, poll_seconds=0, clock=lambda: float(next(ticks))
+    )
+    pipeline.scheduler = scheduler
+
+    scheduler.run()
+
+    assert pipeline.analyzed == [2, 5]
+
+
 def test_detect_anomalies_builds_report_and_alerts_on_threshold():
     writer = InMemoryWriter(frame=_sample_frame())
     detectors = [
@@ -101,3 +306,319 @@ def test_detect_anomalies_builds_report_and_alerts_on_threshold():
     assert report.anomalies[0].score == pytest.approx(0.5)
     assert report.anomalies[1].severity == pytest.approx(0.9)
     assert use_case.is_alert(report) is True
+
+
+class SkippingRunner:
+    def run(self, detectors, features):
+        first, second = detectors
+        return [
+            DetectorOutcome(first.name, pd.Series([1.0, 0.0]), severity=0.5, seconds=0.2),
+            DetectorOutcome(second.name, None, severity=0.0, seconds=5.0, skip_reason="timeout"),
+        ]
+
+
+def test_detect_anomalies_reports_timings_and_skipped_detectors():
+    writer = InMemoryWriter(frame=_sample_frame())
+    detectors = [
+        FakeDetector("zscore", [0.0, 1.0], severity_value=0.2),
+        FakeDetector("dbscan", [1.0, 1.0], severity_value=0.9),
+    ]
+    use_case = DetectAnomalies(writer=writer, detectors=detectors, threshold=0.8, runner=SkippingRunner())
+
+    report = use_case.execute()
+
+    assert [anomaly.detector for anomaly in report.anomalies] == ["zscore"]
+    assert report.skipped == ("dbscan",)
+    assert report.timings == {"zscore": 0.2, "dbscan": 5.0}
+    assert use_case.is_alert(report) is False
+
+
+class CountingReadsWriter(InMemoryWriter):
+    def __init__(self, frame: pd.DataFrame) -> None:
+        super().__init__(frame=frame)
+        self.reads = 0
+
+    def read_latest_window(self) -> pd.DataFrame:
+        self.reads += 1
+        return super().read_latest_window()
+
+
+def test_window_snapshot_is_read_once_and_shared_between_stages():
+    writer = CountingReadsWriter(frame=_sample_frame().iloc[::-1])
+    snapshot = WindowSnapshot(reader=writer)
+    aggregator = ComputeAggregates(writer=writer, windows=("5m",), window_source=snapshot)
+    detector = DetectAnomalies(
+        writer=writer,
+        detectors=[FakeDetector("zscore", [0.0, 1.0], severity_value=0.2)],
+        threshold=0.8,
+        window_source=snapshot,
+    )
+
+    aggregates = {row["metric"]: row["value"] for row in aggregator.execute().as_dict()}
+    report = detector.execute()
+
+    assert writer.reads == 1
+    assert aggregates["count_last_5m"] == pytest.approx(2.0)
+    assert snapshot.frame()["event_time"].is_monotonic_increasing
+    assert report.window_start < report.window_end
+    stats = snapshot.stats()
+    assert (stats.reads, stats.hits) == (1, 2)
+    assert stats.bytes_saved == 2 * stats.bytes_read > 0
+
+    snapshot.reset()
+    snapshot.frame()
+    assert writer.reads == 2
+
+
+class RecordingWriter(InMemoryWriter):
+    def __init__(self, events: list[str]) -> None:
+        super().__init__(frame=_sample_frame())
+        self._events = events
+
+    def ingest_batch(self, batch: RecordBatch) -> None:
+        self._events.append(f"ingest {batch.dataframe['entity_id'].iloc[0]}")
+
+
+class CountingGenerator:
+    def __init__(self, total: int, events: list[str]) -> None:
+        self._total = total
+        self._events = events
+
+    def batches(self):
+        for idx in range(1, self._total + 1):
+            self._events.append(f"produced {idx}")
+            yield RecordBatch(dataframe=pd.DataFrame({"entity_id": [idx]}))
+
+
+def test_load_dataset_streams_batches_with_bounded_prefetch():
+    events: list[str] = []
+    loader = LoadSyntheticDataset(
+        generator=CountingGenerator(total=6, events=events),
+        writer=RecordingWriter(events),
+        max_in_flight_batches=1,
+    )
+
+    loader.execute()
+
+    ingested = [event for event in events if event.startswith("ingest")]
+    assert ingested == [f"ingest {idx}" for idx in range(1, 7)]
+    assert events.index("ingest 1") < events.index("produced 6")
+
+
+class SlowCheckpointedGenerator(CountingGenerator):
+    def __init__(self, total: int, events: list[str]) -> None:
+        super().__init__(total=total, events=events)
+        self.committed: list[int] = []
+
+    def commit(self, batch: RecordBatch) -> None:
+        self.committed.append(int(batch.dataframe["entity_id"].iloc[0]))
+
+
+class ConcurrentWriter(RecordingWriter):
+    def __init__(self, events: list[str], fail_on: int | None = None) -> None:
+        super().__init__(events)
+        self._fail_on = fail_on
+        self._active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def ingest_batch(self, batch: RecordBatch) -> None:
+        with self._lock:
+            self._active += 1
+            self.max_active = max(self.max_active, self._active)
+        try:
+            entity_id = int(batch.dataframe["entity_id"].iloc[0])
+            time.sleep(0.02 * (entity_id % 3))
+            if entity_id == self._fail_on:
+                raise RuntimeError(f"insert {entity_id} failed")
+            super().ingest_batch(batch)
+        finally:
+            with self._lock:
+                self._active -= 1
+
+
+def test_load_dataset_pipelines_concurrent_inserts_in_order():
+    events: list[str] = []
+    generator = SlowCheckpointedGenerator(total=8, events=events)
+    writer = ConcurrentWriter(events)
+    loader = LoadSyntheticDataset(generator=generator, writer=writer, max_in_flight_batches=2, insert_workers=3)
+
+    report = loader.execute()
+
+    assert report.batches == 8 and report.rows == 8
+    assert report.rows_per_second > 0
+    assert generator.committed == list(range(1, 9))
+    assert writer.max_active > 1
+
+
+def test_load_dataset_propagates_insert_errors_and_stops_committing():
+    events: list[str] = []
+    generator = SlowCheckpointedGenerator(total=8, events=events)
+    loader = LoadSyntheticDataset(
+        generator=generator,
+        writer=ConcurrentWriter(events, fail_on=4),
+        max_in_flight_batches=1,
+        insert_workers=2,
+    )
+
+    with pytest.raises(RuntimeError, match="insert 4 failed"):
+        loader.execute()
+
+    assert generator.committed == [1, 2, 3]
+
+
+class RowCountingWriter(InMemoryWriter):
+    def __init__(self) -> None:
+        super().__init__(frame=_sample_frame())
+        self.rows = 0
+
+    def ingest_batch(self, batch) -> None:
+        self.rows += batch.size
+
+
+def _dedup_loader(tmp_path, writer: RowCountingWriter, batch_format: str = "pandas") -> LoadSyntheticDataset:
+    config = SyntheticDatasetConfig(
+        row_count=2_000, batch_size=500, anomaly_ratio=0.01, seed=42, mode="vectorized", batch_format=batch_format
+    )
+    index = TimePartitionedDedupIndex(
+        partition_seconds=3600,
+        ttl_seconds=6 * 3600,
+        expected_items_per_partition=10_000,
+        false_positive_rate=0.001,
+        path=tmp_path / "dedup_index.npz",
+    )
+    checker = PandasDataQualityChecker(
+        dedup_keys=["tx_hash"], required_columns=["event_time", "tx_hash", "value"], dedup_index=index
+    )
+    return LoadSyntheticDataset(
+        generator=SyntheticDatasetGenerator(config=config), writer=writer, quality_checker=checker
+    )
+
+
+@pytest.mark.parametrize("batch_format", ["pandas", "arrow"])
+def test_load_dataset_skips_batches_loaded_in_previous_run(tmp_path, batch_format):
+    first_writer, second_writer = RowCountingWriter(), RowCountingWriter()
+
+    first = _dedup_loader(tmp_path, first_writer, batch_format).execute()
+    second = _dedup_loader(tmp_path, second_writer, batch_format).execute()
+
+    assert first.rows == first_writer.rows > 0
+    assert second.rows == second_writer.rows == 0
+    assert second.batches == 0
+
+
+def test_micro_batch_scheduler_ingests_source_without_checkpoint_once(tmp_path):
+    def run_daemon() -> tuple[RowCountingWriter, MicroBatchScheduler]:
+        writer = RowCountingWriter()
+        pipeline = RunPipeline(
+            loader=_dedup_loader(tmp_path, writer),
+            aggregator=ComputeAggregates(writer=writer, windows=("5m",)),
+            detector=DetectAnomalies(
+                writer=writer, detectors=[FakeDetector("zscore", [0.0, 1.0], severity_value=0.2)], threshold=0.8
+            ),
+            alert_sink=StdOutAlertSink(),
+            alerts_enabled=False,
+        )
+        scheduler = MicroBatchScheduler(pipeline, interval_seconds=0, max_rows=100_000, poll_seconds=0.01)
+        stopper = threading.Timer(0.3, scheduler.stop)
+        stopper.start()
+        scheduler.run()
+        stopper.join()
+        return writer, scheduler
+
+    writer, scheduler = run_daemon()
+    assert writer.rows > 0
+    assert scheduler.batches == 1
+    assert writer.persisted_report is not None
+
+    # перезапуск демона: всё уже в индексе дедупликации, новых строк нет — анализ не запускается
+    writer, scheduler = run_daemon()
+    assert writer.rows == 0
+    assert scheduler.batches == 0
+
+
+class TickingSource:
+    """Источник с чекпоинтом: каждый тик отдаёт следующую минуту событий, после `ticks` — останавливает демон."""
+
+    def __init__(self, ticks: int, rows: int = 200) -> None:
+        self._ticks = ticks
+        self._rows = rows
+        self._produced = 0
+        self._random = np.random.default_rng(0)
+        self.scheduler: MicroBatchScheduler | None = None
+
+    def batches(self):
+        if self._produced == self._ticks:
+            self.scheduler.stop()
+            return
+        start = self._produced * self._rows
+        self._produced += 1
+        yield RecordBatch(
+            dataframe=pd.DataFrame(
+                {
+                    "event_time": pd.Timestamp("2024-01-01") + pd.to_timedelta(np.arange(start, start + self._rows), "s"),
+                    "block_number": np.arange(start, start + self._rows),
+                    "chain_id": 1,
+                    "value": self._random.normal(100.0, 15.0, self._rows),
+                    "attribute": self._random.uniform(size=self._rows),
+                    "gas_used": self._random.normal(50_000.0, 5_000.0, self._rows),
+                    "calldata_size": self._random.integers(64, 4096, self._rows),
+                }
+            )
+        )
+
+    def commit(self, batch) -> None:
+        pass
+
+
+class EventStore(InMemoryWriter):
+    def __init__(self) -> None:
+        super().__init__(frame=pd.DataFrame())
+        self.fetched: list[int] = []
+
+    def ingest_batch(self, batch) -> None:
+        self._frame = pd.concat([self._frame, batch.dataframe], ignore_index=True)
+
+    def read_events_since(self, since):
+        frame = self._frame if since is None else self._frame[self._frame["event_time"] >= since]
+        self.fetched.append(len(frame))
+        return frame.reset_index(drop=True)
+
+
+class CountingForest(IsolationForestDetector):
+    def __init__(self) -> None:
+        super().__init__(contamination=0.01, random_state=0)
+        self.fits = 0
+
+    def fit(self, features):
+        self.fits += 1
+        return super().fit(features)
+
+
+def test_daemon_micro_batches_read_only_the_delta_and_reuse_fitted_models(tmp_path):
+    store = EventStore()
+    source = TickingSource(ticks=3)
+    forest = CountingForest()
+    watermarks = WatermarkWindowReader(store, JsonWatermarkStore(tmp_path / "watermarks.json"), overlap=timedelta(0))
+    snapshot = WindowSnapshot(reader=watermarks)
+    cached = CachedModelDetector(forest, DetectorModelCache(tmp_path / "models"), RetrainPolicy())
+    pipeline = RunPipeline(
+        loader=LoadSyntheticDataset(generator=source, writer=store),
+        aggregator=ComputeAggregates(writer=store, windows=("5m",), window_source=snapshot, delta=watermarks),
+        detector=DetectAnomalies(
+            writer=store, detectors=[cached], threshold=0.8, window_source=snapshot, delta=watermarks
+        ),
+        alert_sink=StdOutAlertSink(),
+        alerts_enabled=False,
+        window_snapshot=snapshot,
+        watermarks=watermarks,
+    )
+    scheduler = MicroBatchScheduler(pipeline, interval_seconds=0, max_rows=100_000, poll_seconds=0)
+    source.scheduler = scheduler
+
+    scheduler.run()
+
+    assert scheduler.batches == 3
+    # первый тик читает окно целиком, следующие — только строки после водяного знака (и строку на самом знаке)
+    assert store.fetched == [200, 201, 201]
+    assert forest.fits == 1